@@ -50,8 +50,8 @@ const CaretakerScreen = ({ navigation }) => {
                     });
                 }
             }
-            if (alertsRes?.data?.length > 0) {
-                setAlerts(alertsRes.data.map(a => ({
+            if (alertsRes?.data?.alerts?.length > 0) {
+                setAlerts(alertsRes.data.alerts.map(a => ({
                     id: a.id,
                     type: a.type === 'emergency' ? 'error' : a.type,
                     title: a.title,
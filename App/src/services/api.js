@@ -30,11 +30,19 @@ export const removeToken = async () => {
 
 // ─── Base Request Helper ────────────────────────────────────────
 
+// Last ETag and body per GET endpoint, for 304 Not Modified replies
+const etagCache = new Map();
+
+export const clearEtagCache = () => etagCache.clear();
+
 const request = async (endpoint, options = {}) => {
     const token = await getToken();
+    const isGet = !options.method || options.method === 'GET';
+    const cached = isGet ? etagCache.get(endpoint) : undefined;
     const headers = {
         'Content-Type': 'application/json',
         ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        ...(cached ? { 'If-None-Match': cached.etag } : {}),
         ...options.headers,
     };
 
@@ -42,8 +50,16 @@ const request = async (endpoint, options = {}) => {
 
     try {
         const response = await fetch(`${BASE_URL}${endpoint}`, config);
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
         const data = await response.json();
 
+        const etag = response.headers.get('ETag');
+        if (isGet && response.ok && etag) {
+            etagCache.set(endpoint, { etag, data });
+        }
+
         if (!response.ok) {
             throw { status: response.status, message: data.error || 'Request failed' };
         }
@@ -78,6 +94,7 @@ export const authAPI = {
 
     logout: async () => {
         await removeToken();
+        clearEtagCache();
     },
 };
 
@@ -148,7 +165,19 @@ export const dosesAPI = {
         }
     },
     today: () => request('/api/doses/today'),
-    sync: () => syncOfflineQueue(dosesAPI),
+    history: (cursor = null, limit = 50) =>
+        request(`/api/doses/history?limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`),
+    sync: () => syncOfflineQueue(syncAPI),
+};
+
+// ─── Sync API ───────────────────────────────────────────────────
+
+export const syncAPI = {
+    batch: (items) => request('/api/sync/batch', {
+        method: 'POST',
+        body: JSON.stringify({ items }),
+    }),
+    changes: (since = 0) => request(`/api/sync/changes?since=${since}`),
 };
 
 // ─── Dashboard API ──────────────────────────────────────────────
@@ -222,8 +251,11 @@ export const caretakerAPI = {
             body: JSON.stringify({ patient_email: patientEmail, relationship }),
         }),
     patientDetail: (patientId) => request(`/api/caretaker/patient/${patientId}`),
-    alerts: () => request('/api/caretaker/alerts'),
+    alerts: (cursor = null) =>
+        request(`/api/caretaker/alerts${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`),
     markRead: (alertId) => request(`/api/caretaker/alerts/${alertId}/read`, { method: 'PUT' }),
+    markAllRead: () => request('/api/caretaker/alerts/read-all', { method: 'PUT' }),
+    unreadCount: () => request('/api/caretaker/alerts/unread'),
     report: (patientId, period = 'weekly') =>
         request(`/api/caretaker/report/${patientId}?period=${period}`),
     emergencyCheck: (location = null) =>
@@ -231,10 +263,11 @@ export const caretakerAPI = {
             method: 'POST',
             body: JSON.stringify({ location }),
         }),
-    emergencyTrigger: (location = null, reason = 'manual') =>
+    // wait: send SMS + calls now and return each contact's delivery status
+    emergencyTrigger: (location = null, reason = 'manual', wait = false) =>
         request('/api/caretaker/emergency/trigger', {
             method: 'POST',
-            body: JSON.stringify({ location, reason }),
+            body: JSON.stringify({ location, reason, wait }),
         }),
     emergencyStatus: () => request('/api/caretaker/emergency/status'),
     addContact: (name, phone, relationship = 'family') =>
@@ -255,6 +288,12 @@ export const caretakerAPI = {
         }),
 };
 
+// ─── Notifications API (queued SMS / voice calls) ───────────────
+
+export const notificationsAPI = {
+    status: (jobIds) => request(`/api/notifications?ids=${jobIds.join(',')}`),
+};
+
 // ─── Health API ─────────────────────────────────────────────────
 
 export const healthAPI = {
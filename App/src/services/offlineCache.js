@@ -56,7 +56,17 @@ export const queueOfflineDose = async (doseLog) => {
     try {
         const raw = await AsyncStorage.getItem(CACHE_KEYS.OFFLINE_QUEUE);
         const queue = raw ? JSON.parse(raw) : [];
-        queue.push({ ...doseLog, queuedAt: Date.now() });
+        const now = new Date();
+        const pad = (n) => String(n).padStart(2, '0');
+        queue.push({
+            ...doseLog,
+            // Stable id so a replayed batch is not applied twice
+            id: `${now.getTime()}-${Math.random().toString(36).slice(2, 10)}`,
+            type: 'dose',
+            dose_date: `${now.getFullYear()}-${pad(now.getMonth() + 1)}-${pad(now.getDate())}`,
+            taken_at: now.toISOString().slice(0, 19),
+            queuedAt: now.getTime(),
+        });
         await AsyncStorage.setItem(CACHE_KEYS.OFFLINE_QUEUE, JSON.stringify(queue));
     } catch (e) {
         console.log('Queue write failed:', e);
@@ -76,19 +86,23 @@ export const clearOfflineQueue = async () => {
     await AsyncStorage.removeItem(CACHE_KEYS.OFFLINE_QUEUE);
 };
 
-export const syncOfflineQueue = async (dosesAPI) => {
+const SYNC_BATCH_SIZE = 200;
+
+export const syncOfflineQueue = async (syncAPI) => {
     const queue = await getOfflineQueue();
     if (queue.length === 0) return { synced: 0 };
 
     let synced = 0;
     const failed = [];
 
-    for (const dose of queue) {
+    // One request per batch; the server answers per item
+    for (let i = 0; i < queue.length; i += SYNC_BATCH_SIZE) {
+        const batch = queue.slice(i, i + SYNC_BATCH_SIZE);
         try {
-            await dosesAPI.log(dose.medicine_id, dose.scheduled_time, dose.status);
-            synced++;
+            const res = await syncAPI.batch(batch);
+            synced += res.data.results.filter((r) => r.code === 'applied' || r.code === 'duplicate').length;
         } catch (e) {
-            failed.push(dose);
+            failed.push(...batch);
         }
     }
 
@@ -10,12 +10,19 @@ Usage:
     3. python app.py
 """
 import os
+from functools import wraps
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 
 from config import Config
-from database.schema import init_db
+from database.schema import init_db, get_pool_stats
+from database import session as db_session, instrumentation as db_instrumentation
+from database.instrumentation import get_slow_queries
+from utils.cache import cache_stats
+from utils.auth_middleware import token_required
+from jobs.scheduler import start as start_scheduler
+from jobs.notifications import start as start_notification_workers
 
 # Import route blueprints
 from routes.auth_routes import auth_bp, bcrypt as auth_bcrypt
@@ -29,6 +36,8 @@ from routes.caretaker_routes import caretaker_bp
 from routes.health_routes import health_bp
 from routes.interaction_routes import interaction_bp
 from routes.qr_routes import qr_bp
+from routes.sync_routes import sync_bp
+from routes.notification_routes import notification_bp
 
 
 def create_app():
@@ -43,6 +52,10 @@ def create_app():
     # Initialize Bcrypt
     auth_bcrypt.init_app(app)
 
+    # One DB connection + transaction per request, with query timing headers
+    db_session.init_app(app)
+    db_instrumentation.init_app(app)
+
     # Register all blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(medicine_bp)
@@ -55,6 +68,8 @@ def create_app():
     app.register_blueprint(health_bp)
     app.register_blueprint(interaction_bp)
     app.register_blueprint(qr_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(notification_bp)
 
     # Health check endpoint
     @app.route('/')
@@ -67,7 +82,7 @@ def create_app():
                 'auth': '/api/auth/login, /api/auth/signup',
                 'medicines': '/api/medicines, /api/medicines/refills',
                 'reminders': '/api/reminders, /api/reminders/adaptive',
-                'doses': '/api/doses/log, /api/doses/today',
+                'doses': '/api/doses/log, /api/doses/today, /api/doses/history',
                 'dashboard': '/api/dashboard',
                 'analytics': '/api/analytics, /api/analytics/insights, /api/analytics/risk, /api/analytics/monthly',
                 'scanner': '/api/scanner/scan, /api/scanner/confirm, /api/scanner/confirm-batch, /api/scanner/validate',
@@ -75,9 +90,37 @@ def create_app():
                 'interactions': '/api/interactions/check, /api/interactions/check-new',
                 'caretaker': '/api/caretaker/patients, /api/caretaker/alerts, /api/caretaker/report/:id',
                 'health': '/api/health/log, /api/health/today',
+                'sync': '/api/sync/batch, /api/sync/changes',
+                'notifications': '/api/notifications?ids=, /api/notifications/:id',
             }
         })
 
+    # Connection pool / query / cache stats (ops / load testing). The slow query
+    # log holds other users' SQL and parameters, so these are off unless
+    # DB_DEBUG_ENDPOINTS is set, and always need a token.
+    def debug_endpoint(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not Config.DB_DEBUG_ENDPOINTS:
+                return jsonify({'success': False, 'error': 'Endpoint not found'}), 404
+            return f(*args, **kwargs)
+        return token_required(decorated)
+
+    @app.route('/api/db/pool')
+    @debug_endpoint
+    def db_pool_stats():
+        return jsonify({'success': True, 'data': get_pool_stats()})
+
+    @app.route('/api/db/slow-queries')
+    @debug_endpoint
+    def db_slow_queries():
+        return jsonify({'success': True, 'data': get_slow_queries()})
+
+    @app.route('/api/cache/stats')
+    @debug_endpoint
+    def two_tier_cache_stats():
+        return jsonify({'success': True, 'data': cache_stats()})
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(e):
@@ -103,6 +146,13 @@ if __name__ == '__main__':
         print("   The server will start anyway, but DB operations will fail.\n")
 
     app = create_app()
+    # The debug reloader runs this file twice: start background threads only in
+    # the child that serves requests (WSGI servers use `python -m jobs.scheduler`)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if Config.JOBS_ENABLED:
+            start_scheduler()
+        # Sends SMS / calls queued before a restart, too
+        start_notification_workers()
     print(f"\n✅ Server running at http://0.0.0.0:5001")
     print("📋 Visit http://localhost:5001 for API documentation\n")
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,124 @@
+"""
+Endpoint Benchmark
+==================
+Seeds a throwaway SQLite database (no MySQL needed), then times the main
+read/write endpoints through Flask's test client and reports latency plus
+the per-request query count from the X-DB-Queries header.
+
+Usage (from Backend/):
+    python -m benchmarks.endpoints
+    python -m benchmarks.endpoints --iterations 200 --medicines 8 --days 90
+
+Point it at MySQL instead with DB_ENGINE=mysql and the usual DB_* vars
+(it will write seed data into that database).
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+_tmpdir = None
+if os.getenv('DB_ENGINE', 'sqlite') == 'sqlite':
+    _tmpdir = tempfile.mkdtemp(prefix='meditrack-bench-')
+    os.environ['DB_ENGINE'] = 'sqlite'
+    os.environ.setdefault('SQLITE_PATH', os.path.join(_tmpdir, 'bench.db'))
+
+from datetime import date, timedelta  # noqa: E402
+
+from app import create_app  # noqa: E402
+from database.schema import init_db  # noqa: E402
+from models.user import create_user  # noqa: E402
+from models.medicine import create_medicine, generate_default_schedules  # noqa: E402
+from models.dose_log import log_dose  # noqa: E402
+from models.caretaker import link_caretaker_patient  # noqa: E402
+from utils.auth_middleware import generate_token  # noqa: E402
+
+FREQUENCIES = ['Once daily', 'Twice daily', 'Three times daily']
+
+
+def seed(medicines=6, days=30):
+    """Create one patient with `medicines` meds and `days` of dose history, plus a caretaker."""
+    stamp = int(time.time() * 1000)
+    patient_id = create_user('Bench Patient', f'patient{stamp}@bench.local', None, 'x', 'patient')
+    caretaker_id = create_user('Bench Caretaker', f'care{stamp}@bench.local', None, 'x', 'caretaker')
+    link_caretaker_patient(caretaker_id, patient_id)
+
+    schedule = []
+    for i in range(medicines):
+        freq = FREQUENCIES[i % len(FREQUENCIES)]
+        med_id = create_medicine(patient_id, f'Medicine {i}', f'{(i + 1) * 5}mg', frequency=freq)
+        schedule.append((med_id, generate_default_schedules(freq)))
+
+    today = date.today()
+    for day in range(days, 0, -1):
+        d = today - timedelta(days=day)
+        for n, (med_id, times) in enumerate(schedule):
+            for t in times:
+                status = 'missed' if (day + n) % 7 == 0 else 'taken'
+                log_dose(patient_id, med_id, t, status, d)
+
+    return {
+        'patient_id': patient_id,
+        'caretaker_id': caretaker_id,
+        'patient_token': generate_token(patient_id, 'patient@bench.local', 'patient'),
+        'caretaker_token': generate_token(caretaker_id, 'care@bench.local', 'caretaker'),
+        'first_medicine': schedule[0],
+    }
+
+
+def _cases(ctx):
+    pid = ctx['patient_id']
+    med_id, times = ctx['first_medicine']
+    p, c = ctx['patient_token'], ctx['caretaker_token']
+    return [
+        ('GET', '/api/dashboard', p, None),
+        ('GET', '/api/medicines', p, None),
+        ('GET', '/api/reminders', p, None),
+        ('GET', '/api/doses/today', p, None),
+        ('GET', '/api/analytics', p, None),
+        ('GET', '/api/analytics/insights', p, None),
+        ('GET', '/api/analytics/risk', p, None),
+        ('GET', '/api/analytics/monthly', p, None),
+        ('GET', '/api/caretaker/emergency/status', p, None),
+        ('GET', '/api/caretaker/patients', c, None),
+        ('GET', f'/api/caretaker/patient/{pid}', c, None),
+        ('GET', f'/api/caretaker/report/{pid}', c, None),
+        ('GET', '/api/caretaker/alerts', c, None),
+        ('POST', '/api/doses/log', p, {'medicine_id': med_id, 'scheduled_time': times[0], 'status': 'taken'}),
+    ]
+
+
+def run(iterations=100, medicines=6, days=30):
+    init_db()
+    ctx = seed(medicines, days)
+    client = create_app().test_client()
+
+    print(f"\n{'endpoint':<40} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+    print('-' * 68)
+    results = []
+    for method, path, token, body in _cases(ctx):
+        headers = {'Authorization': f'Bearer {token}'}
+        timings, queries = [], 0
+        for _ in range(iterations):
+            started = time.perf_counter()
+            resp = client.open(path, method=method, headers=headers, json=body)
+            timings.append((time.perf_counter() - started) * 1000)
+            if resp.status_code >= 400:
+                raise RuntimeError(f'{method} {path} -> {resp.status_code}: {resp.get_data(as_text=True)[:200]}')
+            queries = int(resp.headers.get('X-DB-Queries', 0))
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        results.append({'endpoint': f'{method} {path}', 'p50_ms': p50, 'p95_ms': p95, 'queries': queries})
+        print(f"{method + ' ' + path:<40} {p50:>8.2f} {p95:>8.2f} {queries:>8}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the main API endpoints.')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--medicines', type=int, default=6)
+    parser.add_argument('--days', type=int, default=30, help='days of seeded dose history')
+    args = parser.parse_args()
+    run(args.iterations, args.medicines, args.days)
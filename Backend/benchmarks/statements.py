@@ -0,0 +1,89 @@
+"""
+Prepared-Statement Cache Benchmark
+==================================
+Times the hot read functions with the per-connection statement cache off
+and on, against the same seeded data, and reports the per-call saving.
+
+Needs MySQL (SQLite has no server-side prepare):
+
+    DB_ENGINE=mysql python -m benchmarks.statements
+    DB_ENGINE=mysql python -m benchmarks.statements --iterations 2000
+
+Seeds a patient into the configured database, like benchmarks.endpoints.
+The two-tier cache (utils.cache) is switched off for the run, so every
+call reaches the database instead of timing cache hits.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.endpoints import seed
+from config import Config
+from database import schema
+from database.dialects import get_dialect
+from database.pool import ConnectionPool
+from database.schema import init_db
+from ml.adherence_model import get_risk_score, get_monthly_breakdown
+from models.dose_log import get_today_doses, get_adherence_stats, get_streak, get_medication_breakdown
+from models.emergency_alert import check_missed_doses, get_consecutive_misses
+from models.medicine import get_medicines_by_user
+from models.reminder import get_reminders
+from models.user import find_user_by_id
+
+HOT_FUNCTIONS = [
+    get_medicines_by_user, get_today_doses, get_adherence_stats, get_streak,
+    get_medication_breakdown, check_missed_doses, get_consecutive_misses,
+    get_reminders, find_user_by_id, get_risk_score, get_monthly_breakdown,
+]
+
+
+def _pool(statement_cache_size):
+    dialect = get_dialect()
+    # One connection, so every call hits the same statement cache
+    return ConnectionPool(
+        dialect.connect_kwargs(), size=1, max_overflow=0,
+        timeout=Config.DB_POOL_TIMEOUT, recycle=0, pre_ping=3600,
+        connect=dialect.connect, statement_cache_size=statement_cache_size,
+    )
+
+
+def _time_calls(func, user_id, iterations):
+    func(user_id)   # warm up (prepares the statement when caching)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(user_id)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(timings)
+
+
+def run(iterations=500):
+    if not get_dialect().server_side_prepare:
+        print('⚠️  Statement cache benchmark needs DB_ENGINE=mysql')
+        return []
+    init_db()
+    user_id = seed()['patient_id']
+    cache_ttl, Config.CACHE_TTL_SECONDS = Config.CACHE_TTL_SECONDS, 0
+
+    print(f"\n{'function':<28} {'plain µs':>10} {'prepared µs':>12} {'saved µs':>10}")
+    print('-' * 64)
+    results = []
+    for func in HOT_FUNCTIONS:
+        medians = {}
+        for label, cache_size in (('plain', 0), ('prepared', Config.DB_STATEMENT_CACHE_SIZE or 32)):
+            pool = schema._pool = _pool(cache_size)
+            medians[label] = _time_calls(func, user_id, iterations)
+            pool.dispose()
+        saved = medians['plain'] - medians['prepared']
+        results.append({'function': func.__name__, **medians, 'saved': saved})
+        print(f"{func.__name__:<28} {medians['plain']:>10.0f} {medians['prepared']:>12.0f} {saved:>10.0f}")
+    schema._pool = None
+    Config.CACHE_TTL_SECONDS = cache_ttl
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the prepared-statement cache.')
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+    run(args.iterations)
@@ -5,11 +5,69 @@ load_dotenv()
 
 
 class Config:
+    # Storage engine: 'mysql' (default) or 'sqlite' for single-node installs
+    DB_ENGINE = os.getenv('DB_ENGINE', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'meditrack.db')
+
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = int(os.getenv('DB_PORT', 3306))
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', 'meditrack_ai')
+
+    # Connection pool
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))           # secs to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))          # max connection lifetime (secs)
+    DB_POOL_PRE_PING = int(os.getenv('DB_POOL_PRE_PING', 30))          # ping on borrow after N secs idle
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 5))
+    DB_RETRY_BACKOFF = float(os.getenv('DB_RETRY_BACKOFF', 2))         # fail fast for N secs after a connect error
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 32))  # prepared statements per connection
+
+    # Read replicas (comma-separated host:port); empty = all reads on the primary
+    DB_REPLICA_HOSTS = os.getenv('DB_REPLICA_HOSTS', '')
+    DB_REPLICA_USER = os.getenv('DB_REPLICA_USER', '')
+    DB_REPLICA_PASSWORD = os.getenv('DB_REPLICA_PASSWORD', '')
+    DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))                    # secs behind before skipping
+    DB_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 5))
+    DB_READ_YOUR_WRITES_WINDOW = float(os.getenv('DB_READ_YOUR_WRITES_WINDOW', 10))   # secs a writer reads the primary
+
+    # Query instrumentation
+    DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 200))
+    DB_SLOW_QUERY_LOG_SIZE = int(os.getenv('DB_SLOW_QUERY_LOG_SIZE', 100))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 3))  # same SQL N+ times per request
+    DB_DEBUG_ENDPOINTS = os.getenv('DB_DEBUG_ENDPOINTS', 'false').lower() == 'true'  # /api/db/*, /api/cache/stats (need a token)
+
+    # dose_logs monthly partitions (MySQL) and background jobs
+    DOSE_LOGS_PARTITIONS_AHEAD = int(os.getenv('DOSE_LOGS_PARTITIONS_AHEAD', 3))     # empty months kept ready
+    DOSE_LOGS_RETENTION_MONTHS = int(os.getenv('DOSE_LOGS_RETENTION_MONTHS', 24))    # older months are archived (0 = keep)
+    DOSE_INSTANCES_DAYS_AHEAD = int(os.getenv('DOSE_INSTANCES_DAYS_AHEAD', 7))       # expected doses generated ahead
+    DOSE_INSTANCES_RETENTION_DAYS = int(os.getenv('DOSE_INSTANCES_RETENTION_DAYS', 35))  # older rows purged (0 = keep)
+    REMINDER_HORIZON_HOURS = int(os.getenv('REMINDER_HORIZON_HOURS', 72))            # reminders generated ahead
+    REMINDER_MISS_GRACE_MINUTES = int(os.getenv('REMINDER_MISS_GRACE_MINUTES', 60))  # past due this long = missed
+    SYNC_BATCH_MAX_ITEMS = int(os.getenv('SYNC_BATCH_MAX_ITEMS', 500))              # items per /api/sync/batch call
+    SYNC_RECEIPT_RETENTION_DAYS = int(os.getenv('SYNC_RECEIPT_RETENTION_DAYS', 30))  # how long replays are recognized
+    SYNC_CHANGES_PAGE_SIZE = int(os.getenv('SYNC_CHANGES_PAGE_SIZE', 500))          # changed rows per /api/sync/changes page
+
+    # Durable SMS / voice call queue (jobs.notifications)
+    NOTIFY_WORKERS = int(os.getenv('NOTIFY_WORKERS', 4))                            # sender threads per process (0 = enqueue only)
+    NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', 5))
+    NOTIFY_RETRY_BASE_SECONDS = float(os.getenv('NOTIFY_RETRY_BASE_SECONDS', 30))   # doubles per failed attempt
+    NOTIFY_LEASE_SECONDS = int(os.getenv('NOTIFY_LEASE_SECONDS', 120))              # a running job is retried after this
+    NOTIFY_RETENTION_DAYS = int(os.getenv('NOTIFY_RETENTION_DAYS', 30))             # finished jobs kept for polling
+    NOTIFY_FANOUT_THREADS = int(os.getenv('NOTIFY_FANOUT_THREADS', 16))             # concurrent sends for requests that wait
+    NOTIFY_DEADLINE_SECONDS = float(os.getenv('NOTIFY_DEADLINE_SECONDS', 8))        # a waiting request answers by then
+
+    # Two-tier per-user cache (utils.cache): in-process L1 in front of a shared L2
+    CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 300))                  # 0 disables the cache
+    CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 10000))
+    CACHE_L1_MAX_BYTES = int(os.getenv('CACHE_L1_MAX_BYTES', 64 * 1024 * 1024))    # per worker process
+    CACHE_WAIT_SECONDS = float(os.getenv('CACHE_WAIT_SECONDS', 5))                  # coalesced misses wait this long
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')                              # empty = in-process stand-in
+    CACHE_REDIS_TIMEOUT = float(os.getenv('CACHE_REDIS_TIMEOUT', 0.5))
+    CACHE_NAMESPACE = os.getenv('CACHE_NAMESPACE', 'meditrack:v1')                  # bump to drop every cached value
+    JOBS_ENABLED = os.getenv('JOBS_ENABLED', 'true').lower() == 'true'
     SECRET_KEY = os.getenv('SECRET_KEY', 'default-secret-key')
     JWT_EXPIRY_HOURS = int(os.getenv('JWT_EXPIRY_HOURS', 24))
 
@@ -17,6 +75,7 @@ class Config:
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '')
     TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '')
     TWILIO_NUMBER = os.getenv('TWILIO_NUMBER', '')
+    TWILIO_TIMEOUT_SECONDS = float(os.getenv('TWILIO_TIMEOUT_SECONDS', 10))         # per REST call
 
     @staticmethod
     def get_db_config():
@@ -0,0 +1,85 @@
+"""
+Change Feed
+===========
+Lets the app pull only what changed since its last sync instead of full
+medicine, reminder and dose lists (`GET /api/sync/changes?since=<cursor>`).
+
+- `users.change_seq` is a per-user counter, bumped inside every write
+  transaction that touches the user's medicines, reminders or dose logs.
+  The UPDATE holds the user's row lock until commit, so one user's
+  sequence numbers become visible in order.
+- `sync_changes` keeps one row per (user, entity, entity_id) with the
+  seq of its latest change and a `deleted` flag (a tombstone). It is
+  compacted by its key: re-saving a row moves it forward instead of
+  appending, so the table stays the size of the data it describes.
+
+A cursor is the highest seq the client has seen; `changes_since()` reads
+the rows above it on the (user_id, seq) index. Deleting a medicine
+tombstones only the medicine: clients drop its reminders and dose logs
+with it, as the server does.
+
+`change_seq` doubles as the user's data version for conditional GETs
+(utils.conditional); `bump_seq()` advances it for writes the feed does
+not carry.
+"""
+from database.dialects import get_dialect
+from utils.cache import invalidate
+
+ENTITIES = ('medicine', 'reminder', 'dose_log')
+
+
+def record_changes(cursor, user_id, entity, ids, deleted=False):
+    """
+    Give `ids` of `entity` the user's next seq numbers (run inside the
+    writer's transaction, on a tuple cursor). Returns the new top seq.
+    """
+    ids = list(dict.fromkeys(i for i in ids if i is not None))
+    if not ids:
+        return None
+    cursor.execute(
+        "UPDATE users SET change_seq = change_seq + %s WHERE id = %s", (len(ids), user_id)
+    )
+    cursor.execute("SELECT change_seq FROM users WHERE id = %s", (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    top = row[0]
+
+    dialect = get_dialect()
+    upsert = dialect.upsert(
+        ('user_id', 'entity', 'entity_id'),
+        [f"seq = {dialect.inserted('seq')}", f"deleted = {dialect.inserted('deleted')}"],
+    )
+    first = top - len(ids) + 1
+    cursor.executemany(
+        f"""INSERT INTO sync_changes (user_id, entity, entity_id, seq, deleted)
+            VALUES (%s, %s, %s, %s, %s)
+            {upsert}""",
+        [(user_id, entity, entity_id, first + n, deleted) for n, entity_id in enumerate(ids)]
+    )
+    invalidate(user_id, entity)
+    return top
+
+
+def bump_seq(cursor, user_id):
+    """Advance the user's seq for a write with no feed rows (e.g. a caretaker link)."""
+    cursor.execute("UPDATE users SET change_seq = change_seq + 1 WHERE id = %s", (user_id,))
+
+
+def current_seq(cursor, user_id):
+    """The user's latest seq (0 before any change)."""
+    cursor.execute("SELECT change_seq FROM users WHERE id = %s", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def changes_since(cursor, user_id, since, limit):
+    """[(seq, entity, entity_id, deleted)] above `since`, oldest first, at most `limit`."""
+    cursor.execute(
+        """SELECT seq, entity, entity_id, deleted FROM sync_changes
+           WHERE user_id = %s AND seq > %s
+           ORDER BY seq ASC
+           LIMIT %s""",
+        (user_id, since, limit)
+    )
+    return [(seq, entity, entity_id, bool(deleted)) for seq, entity, entity_id, deleted in cursor.fetchall()]
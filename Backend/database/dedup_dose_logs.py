@@ -0,0 +1,116 @@
+"""
+Dose Log Deduplication
+======================
+Collapses duplicate `dose_logs` rows for the same
+(user_id, medicine_id, dose_date, scheduled_time) so the unique dose key
+can be added. The most recent row (highest id) is kept, matching the
+"last re-log wins" semantics of `log_dose`.
+
+Built to run online against a large production table:
+- walks the table in user_id ranges through the (user_id, dose_date) index,
+- deletes in small batches, each in its own short transaction,
+- optionally sleeps between batches to leave headroom for live traffic,
+- prints progress (users scanned, rows removed, rate, ETA).
+
+Usage:
+    python -m database.dedup_dose_logs                  # dedup everything
+    python -m database.dedup_dose_logs --dry-run        # only count
+    python -m database.dedup_dose_logs --chunk-users 200 --batch 500 --sleep 0.1
+"""
+import argparse
+import time
+
+from database.schema import get_connection
+
+
+def _id_bounds(cursor):
+    cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM dose_logs")
+    lo, hi = cursor.fetchone()
+    return lo, hi
+
+
+def _duplicate_ids(cursor, user_lo, user_hi):
+    """Ids of every non-latest row in duplicate groups for users in [lo, hi)."""
+    cursor.execute(
+        """SELECT dl.id
+           FROM dose_logs dl
+           JOIN (
+               SELECT user_id, medicine_id, dose_date, scheduled_time, MAX(id) AS keep_id
+               FROM dose_logs
+               WHERE user_id >= %s AND user_id < %s
+               GROUP BY user_id, medicine_id, dose_date, scheduled_time
+               HAVING COUNT(*) > 1
+           ) dup ON dl.user_id = dup.user_id
+                AND dl.medicine_id = dup.medicine_id
+                AND dl.dose_date = dup.dose_date
+                AND dl.scheduled_time = dup.scheduled_time
+           WHERE dl.user_id >= %s AND dl.user_id < %s AND dl.id < dup.keep_id""",
+        (user_lo, user_hi, user_lo, user_hi)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def dedup_dose_logs(chunk_users=500, batch_size=1000, sleep=0.0, dry_run=False, progress=print):
+    """
+    Remove duplicate dose logs. Returns {'users_scanned', 'duplicates', 'deleted', 'seconds'}.
+    Safe to re-run; a clean table costs one index range scan per chunk.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    started = time.monotonic()
+    result = {'users_scanned': 0, 'duplicates': 0, 'deleted': 0, 'seconds': 0.0}
+
+    try:
+        lo, hi = _id_bounds(cursor)
+        conn.commit()
+        if lo is None:
+            return result
+
+        span = hi - lo + 1
+        user = lo
+        while user <= hi:
+            chunk_hi = user + chunk_users
+            ids = _duplicate_ids(cursor, user, chunk_hi)
+            conn.commit()  # end the read snapshot before deleting
+            result['duplicates'] += len(ids)
+
+            if not dry_run:
+                for i in range(0, len(ids), batch_size):
+                    batch = ids[i:i + batch_size]
+                    placeholders = ', '.join(['%s'] * len(batch))
+                    cursor.execute(f"DELETE FROM dose_logs WHERE id IN ({placeholders})", batch)
+                    conn.commit()
+                    result['deleted'] += cursor.rowcount
+                    if sleep:
+                        time.sleep(sleep)
+
+            result['users_scanned'] = min(chunk_hi, hi + 1) - lo
+            if progress:
+                elapsed = time.monotonic() - started
+                done = result['users_scanned'] / span
+                eta = (elapsed / done - elapsed) if done else 0
+                progress(
+                    f"  users {user}-{min(chunk_hi, hi + 1) - 1} | {done * 100:5.1f}% | "
+                    f"duplicates {result['duplicates']} | deleted {result['deleted']} | "
+                    f"{result['deleted'] / elapsed if elapsed else 0:.0f} rows/s | ETA {eta:.0f}s"
+                )
+            user = chunk_hi
+    finally:
+        cursor.close()
+        conn.close()
+
+    result['seconds'] = round(time.monotonic() - started, 2)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Collapse duplicate dose_logs rows.')
+    parser.add_argument('--chunk-users', type=int, default=500, help='user_id range scanned per step')
+    parser.add_argument('--batch', type=int, default=1000, help='rows deleted per transaction')
+    parser.add_argument('--sleep', type=float, default=0.0, help='pause between delete batches (secs)')
+    parser.add_argument('--dry-run', action='store_true', help='count duplicates without deleting')
+    args = parser.parse_args()
+
+    print("🧹 Deduplicating dose_logs...")
+    summary = dedup_dose_logs(args.chunk_users, args.batch, args.sleep, args.dry_run)
+    print(f"✅ Done: {summary}")
@@ -0,0 +1,270 @@
+"""
+Storage Dialects
+================
+The few SQL fragments and DDL/introspection steps that differ between
+MySQL and SQLite. Model code builds its queries from these helpers, so
+every model function runs on either engine:
+
+    d = get_dialect()
+    cursor.execute(f"SELECT ... WHERE dose_date = {d.today()}")
+
+Select the engine with DB_ENGINE=mysql (default) or DB_ENGINE=sqlite.
+"""
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from config import Config
+
+
+class MySQLDialect:
+    name = 'mysql'
+    server_side_prepare = True
+
+    # ─── Query fragments ─────────────────────────────────────
+
+    def today(self):
+        return 'CURDATE()'
+
+    def time_now(self):
+        return 'TIME(NOW())'
+
+    def group_concat(self, expr, order_by=None):
+        if order_by:
+            return f'GROUP_CONCAT({expr} ORDER BY {order_by})'
+        return f'GROUP_CONCAT({expr})'
+
+    def greatest(self, *exprs):
+        return f"GREATEST({', '.join(exprs)})"
+
+    def combine_datetime(self, date_expr, time_expr):
+        """DATETIME from a DATE and a TIME expression."""
+        return f'TIMESTAMP({date_expr}, {time_expr})'
+
+    def inserted(self, column):
+        """The value the conflicting INSERT tried to write."""
+        return f'VALUES({column})'
+
+    def upsert(self, conflict_cols, assignments, returning_id=False):
+        """Tail of an INSERT that updates the existing row on a unique-key clash."""
+        sets = list(assignments)
+        if returning_id:
+            # Makes cursor.lastrowid the existing row's id on the UPDATE path
+            sets.insert(0, 'id = LAST_INSERT_ID(id)')
+        return 'ON DUPLICATE KEY UPDATE ' + ', '.join(sets)
+
+    def skip_duplicates(self, table, conflict_cols):
+        """Tail of an INSERT (or INSERT ... SELECT) into `table` that leaves clashing rows untouched."""
+        # Qualified: an INSERT ... SELECT may read other tables with the same column
+        return f'ON DUPLICATE KEY UPDATE {table}.{conflict_cols[0]} = {table}.{conflict_cols[0]}'
+
+    # ─── Connections ─────────────────────────────────────────
+
+    def connect_kwargs(self):
+        cfg = Config.get_db_config()
+        cfg['connection_timeout'] = Config.DB_CONNECT_TIMEOUT
+        # Pooled connections are reused, so never leave unread rows behind
+        cfg['buffered'] = True
+        return cfg
+
+    def connect(self, **kwargs):
+        return mysql.connector.connect(**kwargs)
+
+    def connect_direct(self):
+        """Non-pooled connection for migrations; creates the database on first run."""
+        cfg = self.connect_kwargs()
+        try:
+            return mysql.connector.connect(**cfg)
+        except mysql.connector.errors.ProgrammingError as e:
+            if e.errno != errorcode.ER_BAD_DB_ERROR:
+                raise
+        server_cfg = {k: v for k, v in cfg.items() if k != 'database'}
+        conn = mysql.connector.connect(**server_cfg)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {Config.DB_NAME}")
+        cursor.close()
+        conn.close()
+        return mysql.connector.connect(**cfg)
+
+    def is_missing_table(self, error):
+        return (isinstance(error, mysql.connector.errors.ProgrammingError)
+                and error.errno == errorcode.ER_NO_SUCH_TABLE)
+
+    def is_duplicate_key(self, error):
+        return (isinstance(error, mysql.connector.errors.IntegrityError)
+                and error.errno == errorcode.ER_DUP_ENTRY)
+
+    @contextmanager
+    def advisory_lock(self, conn, name, timeout):
+        """Cross-process named lock (GET_LOCK). Yields False if not acquired."""
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        got = cursor.fetchone()[0] == 1
+        try:
+            yield got
+        finally:
+            if got:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                cursor.fetchall()
+            cursor.close()
+
+    # ─── DDL / introspection ─────────────────────────────────
+
+    def translate_ddl(self, sql):
+        return sql
+
+    def table_exists(self, cursor, table):
+        cursor.execute(
+            """SELECT 1 FROM information_schema.tables
+               WHERE table_schema = DATABASE() AND table_name = %s""",
+            (table,)
+        )
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute(
+            """SELECT 1 FROM information_schema.columns
+               WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s""",
+            (table, column)
+        )
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(
+            """SELECT 1 FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+               LIMIT 1""",
+            (table, name)
+        )
+        return cursor.fetchone() is not None
+
+    def add_column_sql(self, table, column, definition):
+        return f"ALTER TABLE {table} ADD COLUMN {column} {definition}, ALGORITHM=INPLACE, LOCK=NONE"
+
+    def modify_column_sql(self, table, column, definition):
+        return f"ALTER TABLE {table} MODIFY COLUMN {column} {definition}"
+
+    def create_index_sql(self, table, name, columns, unique=False):
+        """Online index build: concurrent reads and writes keep running."""
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        return f"ALTER TABLE {table} ADD {kind} {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE"
+
+    def drop_index_sql(self, table, name):
+        return f"ALTER TABLE {table} DROP INDEX {name}, ALGORITHM=INPLACE, LOCK=NONE"
+
+
+class SQLiteDialect(MySQLDialect):
+    name = 'sqlite'
+    server_side_prepare = False   # sqlite3 caches compiled statements itself
+
+    _DDL_RULES = [
+        (re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        (re.compile(r'\bENUM\s*\([^)]*\)', re.I), 'TEXT'),
+        (re.compile(r'\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b', re.I), ''),
+        (re.compile(r'\bUNIQUE\s+KEY\s+\w+\s*\(', re.I), 'UNIQUE ('),
+    ]
+
+    def today(self):
+        return "date('now', 'localtime')"
+
+    def time_now(self):
+        return "time('now', 'localtime')"
+
+    def group_concat(self, expr, order_by=None):
+        # ORDER BY inside aggregates needs SQLite 3.44+
+        if order_by and sqlite3.sqlite_version_info >= (3, 44, 0):
+            return f'GROUP_CONCAT({expr} ORDER BY {order_by})'
+        return f'GROUP_CONCAT({expr})'
+
+    def greatest(self, *exprs):
+        return f"MAX({', '.join(exprs)})"
+
+    def combine_datetime(self, date_expr, time_expr):
+        return f"datetime({date_expr} || ' ' || {time_expr})"
+
+    def inserted(self, column):
+        return f'excluded.{column}'
+
+    def upsert(self, conflict_cols, assignments, returning_id=False):
+        clause = f"ON CONFLICT ({', '.join(conflict_cols)}) DO UPDATE SET " + ', '.join(assignments)
+        if returning_id:
+            clause += ' RETURNING id'
+        return clause
+
+    def skip_duplicates(self, table, conflict_cols):
+        return f"ON CONFLICT ({', '.join(conflict_cols)}) DO NOTHING"
+
+    def connect_kwargs(self):
+        return {'path': Config.SQLITE_PATH}
+
+    def connect(self, **kwargs):
+        from database.sqlite_backend import connect
+        return connect(**kwargs)
+
+    def connect_direct(self):
+        return self.connect(**self.connect_kwargs())
+
+    def is_missing_table(self, error):
+        return isinstance(error, sqlite3.OperationalError) and 'no such table' in str(error)
+
+    def is_duplicate_key(self, error):
+        return isinstance(error, sqlite3.IntegrityError) and 'UNIQUE constraint failed' in str(error)
+
+    @contextmanager
+    def advisory_lock(self, conn, name, timeout):
+        # Single-node engine: SQLite's own write lock serializes DDL
+        yield True
+
+    def translate_ddl(self, sql):
+        for pattern, replacement in self._DDL_RULES:
+            sql = pattern.sub(replacement, sql)
+        return sql
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, name)
+        )
+        return cursor.fetchone() is not None
+
+    def add_column_sql(self, table, column, definition):
+        return f"ALTER TABLE {table} ADD COLUMN {column} {self.translate_ddl(definition)}"
+
+    def modify_column_sql(self, table, column, definition):
+        # SQLite columns are dynamically typed; ENUM/width changes need no DDL
+        return None
+
+    def create_index_sql(self, table, name, columns, unique=False):
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        return f"CREATE {kind} IF NOT EXISTS {name} ON {table} {columns}"
+
+    def drop_index_sql(self, table, name):
+        return f"DROP INDEX IF EXISTS {name}"
+
+
+_dialect = None
+
+
+def get_dialect():
+    """The dialect for the configured DB_ENGINE (singleton)."""
+    global _dialect
+    if _dialect is None:
+        engine = Config.DB_ENGINE.lower()
+        if engine == 'sqlite':
+            _dialect = SQLiteDialect()
+        elif engine == 'mysql':
+            _dialect = MySQLDialect()
+        else:
+            raise ValueError(f"Unsupported DB_ENGINE '{Config.DB_ENGINE}' (use mysql or sqlite)")
+    return _dialect
@@ -0,0 +1,183 @@
+"""
+Expected Dose Instances
+=======================
+`dose_instances` holds one row per (medicine, date, scheduled time) a
+patient is expected to take, generated ahead of time from
+`medicine_schedules`:
+
+- `status` is 'pending' until `log_dose` marks it 'taken' or 'missed'
+  (`record_dose()`, in the writer's transaction),
+- `due_at` is the scheduled moment, so "missed so far today" and "today's
+  doses" are range reads on the (user_id, due_at, status) index instead
+  of re-deriving them from schedules and dose logs.
+
+Medicine create/update/delete re-sync the medicine's pending instances
+(`sync_medicines()`); the daily `dose_instance_materialization` job keeps
+DOSE_INSTANCES_DAYS_AHEAD days generated for every active medicine and
+purges rows older than DOSE_INSTANCES_RETENTION_DAYS. dose_logs stays
+the source of truth for history.
+
+Usage:
+    python -m database.dose_instances     # materialize ahead for everyone
+"""
+import time
+from datetime import date, datetime, timedelta
+
+from config import Config
+from database.dialects import get_dialect
+from database.schema import get_connection
+from utils.helpers import to_time
+
+COLUMNS = ('user_id', 'medicine_id', 'dose_date', 'scheduled_time', 'due_at')
+
+
+def due_at(dose_date, scheduled_time):
+    """The datetime a dose is due, None if the schedule time is unparseable."""
+    t = to_time(scheduled_time)
+    return datetime.combine(dose_date, t) if t is not None else None
+
+
+def _insert_sql():
+    dialect = get_dialect()
+    # Existing rows keep their status; only the due time is refreshed
+    upsert = dialect.upsert(
+        ('medicine_id', 'dose_date', 'scheduled_time'),
+        [f"due_at = {dialect.inserted('due_at')}"],
+    )
+    return f"""INSERT INTO dose_instances ({', '.join(COLUMNS)})
+               VALUES ({', '.join(['%s'] * len(COLUMNS))})
+               {upsert}"""
+
+
+def _insert(cursor, schedules, start, days):
+    """schedules: [(user_id, medicine_id, time)]. Returns rows written."""
+    rows = []
+    for offset in range(days):
+        d = start + timedelta(days=offset)
+        for user_id, medicine_id, scheduled_time in schedules:
+            due = due_at(d, scheduled_time)
+            if due is not None:
+                rows.append((user_id, medicine_id, d, due.time(), due))
+    if rows:
+        cursor.executemany(_insert_sql(), rows)
+    return len(rows)
+
+
+def sync_medicines(cursor, user_id, medicine_ids, today=None):
+    """
+    Regenerate the medicines' pending instances from today on after a schedule
+    change (run inside the writer's transaction). Logged instances are kept.
+    """
+    today = today or date.today()
+    ids = ', '.join(['%s'] * len(medicine_ids))
+    cursor.execute(
+        f"""DELETE FROM dose_instances
+            WHERE user_id = %s AND medicine_id IN ({ids}) AND dose_date >= %s AND status = 'pending'""",
+        (user_id, *medicine_ids, today)
+    )
+    cursor.execute(
+        f"""SELECT m.user_id, m.id, ms.time
+            FROM medicines m
+            JOIN medicine_schedules ms ON m.id = ms.medicine_id
+            WHERE m.id IN ({ids}) AND m.user_id = %s AND m.is_active = TRUE""",
+        (*medicine_ids, user_id)
+    )
+    return _insert(cursor, cursor.fetchall(), today, Config.DOSE_INSTANCES_DAYS_AHEAD + 1)
+
+
+def record_dose(cursor, user_id, medicine_id, dose_date, scheduled_time, status, taken_at, dose_log_id):
+    """Mark the matching instance taken/missed/snoozed (run inside log_dose's transaction)."""
+    record_doses(cursor, [(user_id, medicine_id, dose_date, scheduled_time, status, taken_at, dose_log_id)])
+
+
+def record_doses(cursor, doses):
+    """
+    Mark many instances at once from [(user_id, medicine_id, dose_date,
+    scheduled_time, status, taken_at, dose_log_id)]. Doses outside the
+    generated window or schedule (late logs, ad-hoc times) get a row too.
+    """
+    rows = []
+    for user_id, medicine_id, dose_date, scheduled_time, status, taken_at, dose_log_id in doses:
+        due = due_at(dose_date, scheduled_time)
+        if due is not None:
+            rows.append((user_id, medicine_id, dose_date, due.time(), due, status, taken_at, dose_log_id))
+    if not rows:
+        return
+    dialect = get_dialect()
+    upsert = dialect.upsert(
+        ('medicine_id', 'dose_date', 'scheduled_time'),
+        [f'{c} = {dialect.inserted(c)}' for c in ('status', 'taken_at', 'dose_log_id')],
+    )
+    cursor.executemany(
+        f"""INSERT INTO dose_instances
+            ({', '.join(COLUMNS)}, status, taken_at, dose_log_id)
+            VALUES ({', '.join(['%s'] * (len(COLUMNS) + 3))})
+            {upsert}""",
+        rows
+    )
+
+
+def apply_dose_logs(cursor, since, user_lo, user_hi):
+    """Copy dose_logs statuses from `since` on onto the instances of a user_id range."""
+    cursor.execute(
+        """SELECT id, user_id, medicine_id, dose_date, scheduled_time, status, taken_at
+           FROM dose_logs
+           WHERE user_id >= %s AND user_id < %s AND dose_date >= %s""",
+        (user_lo, user_hi, since)
+    )
+    record_doses(cursor, [
+        (user_id, medicine_id, d, to_time(scheduled_time), status, taken_at, log_id)
+        for log_id, user_id, medicine_id, d, scheduled_time, status, taken_at in cursor.fetchall()
+    ])
+
+
+def materialize(days_ahead=None, chunk_users=500, today=None, apply_logs=False):
+    """
+    Generate instances from today through `days_ahead` for every active
+    medicine and purge expired rows, one user_id range per transaction.
+    Returns {'rows', 'purged', 'seconds'}.
+    """
+    days_ahead = Config.DOSE_INSTANCES_DAYS_AHEAD if days_ahead is None else days_ahead
+    today = today or date.today()
+    started = time.monotonic()
+    result = {'rows': 0, 'purged': 0, 'seconds': 0.0}
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM medicines WHERE is_active = TRUE")
+        lo, hi = cursor.fetchone()
+        conn.commit()
+        user = lo
+        while user is not None and user <= hi:
+            chunk_hi = user + chunk_users
+            cursor.execute(
+                """SELECT m.user_id, m.id, ms.time
+                   FROM medicines m
+                   JOIN medicine_schedules ms ON m.id = ms.medicine_id
+                   WHERE m.user_id >= %s AND m.user_id < %s AND m.is_active = TRUE""",
+                (user, chunk_hi)
+            )
+            result['rows'] += _insert(cursor, cursor.fetchall(), today, days_ahead + 1)
+            if apply_logs:
+                apply_dose_logs(cursor, today, user, chunk_hi)
+            conn.commit()
+            user = chunk_hi
+
+        if Config.DOSE_INSTANCES_RETENTION_DAYS > 0:
+            cursor.execute(
+                "DELETE FROM dose_instances WHERE dose_date < %s",
+                (today - timedelta(days=Config.DOSE_INSTANCES_RETENTION_DAYS),)
+            )
+            result['purged'] = max(cursor.rowcount, 0)
+            conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    result['seconds'] = round(time.monotonic() - started, 2)
+    return result
+
+
+if __name__ == '__main__':
+    print("🗓️  Materializing dose instances...")
+    print(f"✅ Done: {materialize(apply_logs=True)}")
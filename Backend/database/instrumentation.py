@@ -0,0 +1,147 @@
+"""
+Per-Request SQL Instrumentation
+===============================
+Every cursor handed out by the request session is wrapped so the request
+records how much database work it did:
+
+- statement count and total DB time,
+- time spent acquiring the pooled connection,
+- the slowest statement (parameters redacted),
+- N+1 candidates: the same SQL text executed repeatedly in one request.
+
+The numbers go out as `Server-Timing` / `X-DB-*` response headers, slow
+statements land in a rolling in-process log (see /api/db/slow-queries,
+enabled with DB_DEBUG_ENDPOINTS).
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import has_request_context, request
+
+from config import Config
+
+_WS_RE = re.compile(r'\s+')
+
+_slow_log = deque(maxlen=Config.DB_SLOW_QUERY_LOG_SIZE)
+_slow_lock = threading.Lock()
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement always has the same key."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    return _WS_RE.sub(' ', sql).strip()
+
+
+def redact_params(params):
+    """Keep parameter shape, drop values (PHI must not reach the logs)."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(v).__name__ for v in params]
+    return type(params).__name__
+
+
+class QueryStats:
+    """Counters for one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.acquire_ms = 0.0
+        self.slowest = None
+        self.statements = Counter()
+
+    def record(self, sql, params, elapsed_ms):
+        text = normalize_sql(sql)
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[text] += 1
+        if self.slowest is None or elapsed_ms > self.slowest['ms']:
+            self.slowest = {'sql': text[:500], 'params': redact_params(params), 'ms': round(elapsed_ms, 2)}
+        if elapsed_ms >= Config.DB_SLOW_QUERY_MS:
+            _log_slow(text, params, elapsed_ms)
+
+    def n_plus_one(self, threshold=None):
+        """Statements repeated at least `threshold` times in this request."""
+        threshold = threshold or Config.DB_N_PLUS_ONE_THRESHOLD
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute()/executemany()."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._stats.record(operation, params, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._stats.record(operation, None, (time.perf_counter() - started) * 1000)
+
+
+def _log_slow(sql, params, elapsed_ms):
+    entry = {
+        'at': datetime.now().isoformat(timespec='seconds'),
+        'ms': round(elapsed_ms, 2),
+        'sql': sql[:1000],
+        'params': redact_params(params),
+        'endpoint': request.endpoint if has_request_context() else None,
+    }
+    with _slow_lock:
+        _slow_log.append(entry)
+    print(f"🐢 Slow query ({entry['ms']}ms) on {entry['endpoint']}: {entry['sql'][:200]}")
+
+
+def get_slow_queries():
+    """Most recent slow statements, newest first."""
+    with _slow_lock:
+        return list(reversed(_slow_log))
+
+
+def init_app(app):
+    """Attach DB timing headers to every response that touched the database."""
+    from database.session import current_session
+
+    @app.after_request
+    def _db_timing_headers(response):
+        session = current_session(create=False)
+        stats = session.stats if session is not None else None
+        if stats is None or not stats.count:
+            return response
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", '
+            f'db-acquire;dur={stats.acquire_ms:.1f}'
+        )
+        response.headers['X-DB-Queries'] = str(stats.count)
+        if stats.slowest:
+            response.headers['X-DB-Slowest-Ms'] = str(stats.slowest['ms'])
+
+        repeated = stats.n_plus_one()
+        if repeated:
+            response.headers['X-DB-N-Plus-One'] = str(len(repeated))
+            for sql, n in repeated:
+                print(f"⚠️  Possible N+1 on {request.endpoint}: {n}x {sql[:160]}")
+        return response
@@ -0,0 +1,249 @@
+"""
+Schema Migrations
+=================
+Versioned, ordered migrations tracked in a `schema_version` table.
+
+Migration files live in `database/migrations/` and are named
+`NNNN_description.py`. Each one defines:
+
+    DESCRIPTION = 'Short summary'
+
+    def upgrade(ops):
+        ops.execute("CREATE TABLE ...")
+        ops.add_column('medicines', 'qr_code', 'VARCHAR(255) NULL')
+        ops.create_index('dose_logs', 'idx_dose_date', '(dose_date)')
+
+MySQL DDL commits implicitly, so a migration cannot be rolled back half
+way. The `ops` helpers check the catalog (information_schema /
+sqlite_master) first, which keeps every migration safe to re-run after a
+crash. `ops.dialect` tells a migration which engine it is running on.
+
+On boot, `migrate()` costs a single `SELECT MAX(version)` when the schema
+is already at head.
+
+Usage:
+    python -m database.migrate            # upgrade to head
+    python -m database.migrate status     # show applied / pending
+"""
+import importlib
+import pkgutil
+import re
+import sys
+import time
+
+from database.dialects import get_dialect
+
+MIGRATIONS_PACKAGE = 'database.migrations'
+LOCK_NAME = 'meditrack_schema_migrate'
+LOCK_TIMEOUT = 60
+
+_FILE_RE = re.compile(r'^(\d{4})_(\w+)$')
+
+
+class Migration:
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.description = getattr(module, 'DESCRIPTION', name.replace('_', ' '))
+
+    def upgrade(self, ops):
+        self.module.upgrade(ops)
+
+
+class MigrationOps:
+    """Idempotent DDL helpers handed to each migration's `upgrade()`."""
+
+    def __init__(self, conn, dialect):
+        self.conn = conn
+        self.dialect = dialect
+        self.cursor = conn.cursor()
+
+    def execute(self, sql, params=None):
+        """Run a statement; CREATE TABLE DDL is translated for the engine."""
+        self.cursor.execute(self.dialect.translate_ddl(sql), params or ())
+
+    def fetchall(self, sql, params=None):
+        self.cursor.execute(sql, params or ())
+        return self.cursor.fetchall()
+
+    def table_exists(self, table):
+        return self.dialect.table_exists(self.cursor, table)
+
+    def column_exists(self, table, column):
+        return self.dialect.column_exists(self.cursor, table, column)
+
+    def index_exists(self, table, name):
+        return self.dialect.index_exists(self.cursor, table, name)
+
+    def add_column(self, table, column, definition):
+        if not self.column_exists(table, column):
+            self.cursor.execute(self.dialect.add_column_sql(table, column, definition))
+
+    def modify_column(self, table, column, definition):
+        sql = self.dialect.modify_column_sql(table, column, definition)
+        if sql:
+            self.cursor.execute(sql)
+
+    def create_index(self, table, name, columns, unique=False):
+        """Online index build: concurrent reads and writes keep running."""
+        if not self.index_exists(table, name):
+            self.cursor.execute(self.dialect.create_index_sql(table, name, columns, unique))
+
+    def drop_index(self, table, name):
+        if self.index_exists(table, name):
+            self.cursor.execute(self.dialect.drop_index_sql(table, name))
+
+    def close(self):
+        self.cursor.close()
+
+
+def load_migrations():
+    """All migration modules, ordered by version."""
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = _FILE_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f'{MIGRATIONS_PACKAGE}.{info.name}')
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    migrations.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'Duplicate migration versions in {MIGRATIONS_PACKAGE}: {versions}')
+    return migrations
+
+
+def head_version():
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(conn):
+    """Highest applied version, or 0 when `schema_version` does not exist yet."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+        return (row[0] or 0) if row else 0
+    except Exception as e:
+        if not get_dialect().is_missing_table(e):
+            raise
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
+
+
+def _ensure_version_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INT DEFAULT 0
+        )
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def _applied_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM schema_version")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def migrate(target=None, verbose=True):
+    """Apply pending migrations up to `target` (default: head). Returns applied versions."""
+    migrations = load_migrations()
+    head = migrations[-1].version if migrations else 0
+    target = head if target is None else target
+
+    dialect = get_dialect()
+    conn = dialect.connect_direct()
+    try:
+        # Fast path: one query when nothing is pending
+        if current_version(conn) >= target:
+            if verbose:
+                print(f"✅ Database schema at version {target} (head)")
+            return []
+
+        def run():
+            _ensure_version_table(conn)
+            applied = _applied_versions(conn)
+            done = []
+            for m in migrations:
+                if m.version > target or m.version in applied:
+                    continue
+                if verbose:
+                    print(f"📦 Applying migration {m.version:04d}_{m.name}...")
+                started = time.monotonic()
+                ops = MigrationOps(conn, dialect)
+                try:
+                    m.upgrade(ops)
+                    conn.commit()
+                finally:
+                    ops.close()
+                duration_ms = int((time.monotonic() - started) * 1000)
+
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description, duration_ms) VALUES (%s, %s, %s)",
+                    (m.version, m.description[:255], duration_ms)
+                )
+                conn.commit()
+                cursor.close()
+                done.append(m.version)
+            return done
+
+        # Serialize migrations across worker processes
+        with dialect.advisory_lock(conn, LOCK_NAME, LOCK_TIMEOUT) as got:
+            if not got:
+                raise RuntimeError('Timed out waiting for another process to finish migrating')
+            done = run()
+        if verbose:
+            print(f"✅ Database schema migrated to version {target} ({len(done)} applied)")
+        return done
+    finally:
+        conn.close()
+
+
+def status():
+    """List every migration with its applied timestamp (or None if pending)."""
+    migrations = load_migrations()
+    dialect = get_dialect()
+    conn = dialect.connect_direct()
+    try:
+        rows = {}
+        cursor = conn.cursor()
+        if dialect.table_exists(cursor, 'schema_version'):
+            cursor.execute("SELECT version, applied_at FROM schema_version")
+            rows = dict(cursor.fetchall())
+        cursor.close()
+    finally:
+        conn.close()
+    return [
+        {'version': m.version, 'name': m.name, 'description': m.description,
+         'applied_at': str(rows[m.version]) if m.version in rows else None}
+        for m in migrations
+    ]
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    if command == 'status':
+        for row in status():
+            state = row['applied_at'] or 'pending'
+            print(f"{row['version']:04d}  {row['name']:<40} {state}")
+    elif command == 'upgrade':
+        target = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        migrate(target)
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,193 @@
+"""
+Baseline schema: all core tables, plus the columns and ENUM values that
+older deployments used to receive through speculative ALTERs at boot.
+"""
+DESCRIPTION = 'Baseline tables'
+
+TABLES = [
+    # Users table
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(150) UNIQUE NOT NULL,
+        phone VARCHAR(20) NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        role ENUM('patient', 'caretaker', 'admin') DEFAULT 'patient',
+        avatar_url VARCHAR(500) NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+
+    # Medicines table (enhanced with QR, refill tracking)
+    """
+    CREATE TABLE IF NOT EXISTS medicines (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        name VARCHAR(200) NOT NULL,
+        dosage VARCHAR(50) NOT NULL,
+        type VARCHAR(50) DEFAULT 'Oral Tablet',
+        quantity VARCHAR(50) DEFAULT '30 Tabs',
+        frequency VARCHAR(50) DEFAULT 'Once daily',
+        instruction VARCHAR(255) DEFAULT '',
+        notes TEXT,
+        color VARCHAR(10) DEFAULT '#4CAF50',
+        icon VARCHAR(20) DEFAULT 'pill',
+        pill_count INT DEFAULT 1,
+        pills_remaining INT DEFAULT 30,
+        refill_date DATE NULL,
+        qr_code VARCHAR(255) NULL,
+        duration VARCHAR(50) DEFAULT '30 days',
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+
+    # Medicine schedules table
+    """
+    CREATE TABLE IF NOT EXISTS medicine_schedules (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        medicine_id INT NOT NULL,
+        time VARCHAR(10) NOT NULL,
+        day_of_week VARCHAR(10) DEFAULT 'daily',
+        FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
+    )
+    """,
+
+    # Reminders table
+    """
+    CREATE TABLE IF NOT EXISTS reminders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        medicine_id INT NOT NULL,
+        scheduled_time DATETIME NOT NULL,
+        status ENUM('upcoming', 'snoozed', 'completed', 'missed') DEFAULT 'upcoming',
+        snooze_until DATETIME NULL,
+        voice_enabled BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
+    )
+    """,
+
+    # Dose logs table
+    """
+    CREATE TABLE IF NOT EXISTS dose_logs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        medicine_id INT NOT NULL,
+        scheduled_time VARCHAR(10) NOT NULL,
+        taken_at TIMESTAMP NULL,
+        status ENUM('taken', 'missed', 'snoozed', 'pending') DEFAULT 'pending',
+        dose_date DATE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
+    )
+    """,
+
+    # Caretaker-patient relationships
+    """
+    CREATE TABLE IF NOT EXISTS caretaker_patients (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        caretaker_id INT NOT NULL,
+        patient_id INT NOT NULL,
+        relationship VARCHAR(50) DEFAULT 'family',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (caretaker_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (patient_id) REFERENCES users(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_pair (caretaker_id, patient_id)
+    )
+    """,
+
+    # Caretaker contacts (manually entered name + phone)
+    """
+    CREATE TABLE IF NOT EXISTS caretaker_contacts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        phone VARCHAR(20) NOT NULL,
+        relationship VARCHAR(50) DEFAULT 'family',
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+
+    # Alerts table
+    """
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        caretaker_id INT NULL,
+        type ENUM('error', 'info', 'success', 'warning', 'emergency') DEFAULT 'info',
+        title VARCHAR(200) NOT NULL,
+        description TEXT,
+        is_read BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+
+    # Health insights table
+    """
+    CREATE TABLE IF NOT EXISTS health_insights (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        steps INT DEFAULT 0,
+        sleep_hours INT DEFAULT 0,
+        sleep_mins INT DEFAULT 0,
+        insight_date DATE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_date (user_id, insight_date)
+    )
+    """,
+
+    # Reminder behavior tracking (for smart scheduling)
+    """
+    CREATE TABLE IF NOT EXISTS reminder_behavior (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        medicine_id INT NOT NULL,
+        miss_count INT DEFAULT 0,
+        snooze_count INT DEFAULT 0,
+        avg_delay_mins FLOAT DEFAULT 0,
+        total_events INT DEFAULT 0,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE,
+        UNIQUE KEY unique_user_med (user_id, medicine_id)
+    )
+    """,
+
+    # Drug interactions reference table
+    """
+    CREATE TABLE IF NOT EXISTS drug_interactions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        drug_a VARCHAR(100) NOT NULL,
+        drug_b VARCHAR(100) NOT NULL,
+        severity ENUM('mild', 'moderate', 'severe') DEFAULT 'mild',
+        description TEXT
+    )
+    """,
+]
+
+
+def upgrade(ops):
+    for table_sql in TABLES:
+        ops.execute(table_sql)
+
+    # Databases created before these columns existed
+    ops.add_column('users', 'phone', 'VARCHAR(20) NULL')
+    ops.add_column('medicines', 'pills_remaining', 'INT DEFAULT 30')
+    ops.add_column('medicines', 'refill_date', 'DATE NULL')
+    ops.add_column('medicines', 'qr_code', 'VARCHAR(255) NULL')
+    ops.add_column('medicines', 'duration', "VARCHAR(50) DEFAULT '30 days'")
+
+    # Widen ENUMs (appending values is a metadata-only change)
+    ops.modify_column('users', 'role', "ENUM('patient', 'caretaker', 'admin') DEFAULT 'patient'")
+    ops.modify_column('alerts', 'type', "ENUM('error', 'info', 'success', 'warning', 'emergency') DEFAULT 'info'")
@@ -0,0 +1,22 @@
+"""
+Indexes for the hot dashboard, analytics and alert queries.
+Built online (ALGORITHM=INPLACE, LOCK=NONE) so writes keep flowing.
+"""
+DESCRIPTION = 'Performance indexes'
+
+INDEXES = [
+    ('dose_logs', 'idx_dose_date', '(dose_date)'),
+    ('dose_logs', 'idx_dose_user_date', '(user_id, dose_date)'),
+    ('dose_logs', 'idx_dose_status', '(status)'),
+    ('reminders', 'idx_reminder_status', '(status)'),
+    ('reminders', 'idx_reminder_user_status', '(user_id, status)'),
+    ('alerts', 'idx_alerts_user_read', '(user_id, is_read)'),
+    ('alerts', 'idx_alerts_caretaker', '(caretaker_id)'),
+    ('medicines', 'idx_medicines_active', '(user_id, is_active)'),
+    ('medicines', 'idx_medicines_qr', '(qr_code)'),
+]
+
+
+def upgrade(ops):
+    for table, name, cols in INDEXES:
+        ops.create_index(table, name, cols)
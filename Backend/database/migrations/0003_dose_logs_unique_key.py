@@ -0,0 +1,21 @@
+"""
+Unique dose key on dose_logs so `log_dose`'s ON DUPLICATE KEY UPDATE
+actually upserts. Existing duplicates are collapsed first (keeping the
+latest row); on large tables run `python -m database.dedup_dose_logs`
+ahead of the deploy so this step finds nothing to do.
+"""
+from database.dedup_dose_logs import dedup_dose_logs
+
+DESCRIPTION = 'Unique (user_id, medicine_id, dose_date, scheduled_time) on dose_logs'
+
+
+def upgrade(ops):
+    if ops.index_exists('dose_logs', 'uq_dose_logs_dose'):
+        return
+    summary = dedup_dose_logs(progress=None)
+    if summary['deleted']:
+        print(f"   removed {summary['deleted']} duplicate dose log(s)")
+    ops.create_index(
+        'dose_logs', 'uq_dose_logs_dose',
+        '(user_id, medicine_id, dose_date, scheduled_time)', unique=True
+    )
@@ -0,0 +1,47 @@
+"""
+Monthly RANGE partitioning of dose_logs on dose_date (MySQL only).
+
+MySQL requires every unique key of a partitioned table to include the
+partitioning column and does not allow foreign keys on it, so this:
+
+- drops the dose_logs foreign keys (the model layer already deletes a
+  medicine's dose logs itself, see models.medicine.delete_medicine),
+- widens the primary key to (id, dose_date),
+- partitions by month from the oldest dose to DOSE_LOGS_PARTITIONS_AHEAD
+  months ahead, plus a catch-all `pmax`.
+
+The PARTITION BY step rebuilds the table and blocks writes while it runs;
+on a large production table run it in a maintenance window.
+SQLite has no table partitioning, so this is a no-op there.
+"""
+from datetime import date
+
+from config import Config
+from database.partitions import (
+    MAX_PARTITION, TABLE, add_months, list_partitions, month_start, partition_definitions,
+)
+
+DESCRIPTION = 'Partition dose_logs by month on dose_date'
+
+
+def upgrade(ops):
+    if ops.dialect.name != 'mysql' or list_partitions(ops.cursor):
+        return
+
+    for (name,) in ops.fetchall(
+        """SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+             AND CONSTRAINT_TYPE = 'FOREIGN KEY'""",
+        (TABLE,)
+    ):
+        ops.execute(f"ALTER TABLE {TABLE} DROP FOREIGN KEY {name}")
+
+    ops.execute(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, dose_date)")
+
+    (oldest,), = ops.fetchall(f"SELECT MIN(dose_date) FROM {TABLE}")
+    this_month = month_start(date.today())
+    first = month_start(oldest) if oldest else this_month
+    last = add_months(this_month, Config.DOSE_LOGS_PARTITIONS_AHEAD)
+    parts = partition_definitions(first, last)
+    parts.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    ops.execute(f"ALTER TABLE {TABLE} PARTITION BY RANGE COLUMNS (dose_date) ({', '.join(parts)})")
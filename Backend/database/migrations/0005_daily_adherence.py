@@ -0,0 +1,31 @@
+"""
+daily_adherence rollup (see database.rollups), backfilled from dose_logs
+when first created. On large tables run `python -m database.rollups`
+after the deploy to rebuild it in small transactions instead.
+"""
+from database.rollups import backfill_daily_adherence
+
+DESCRIPTION = 'daily_adherence rollup keyed by (user_id, dose_date, medicine_id)'
+
+
+def upgrade(ops):
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS daily_adherence (
+            user_id INT NOT NULL,
+            dose_date DATE NOT NULL,
+            medicine_id INT NOT NULL,
+            total INT NOT NULL DEFAULT 0,
+            taken INT NOT NULL DEFAULT 0,
+            missed INT NOT NULL DEFAULT 0,
+            morning_total INT NOT NULL DEFAULT 0,
+            morning_taken INT NOT NULL DEFAULT 0,
+            evening_total INT NOT NULL DEFAULT 0,
+            evening_taken INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, dose_date, medicine_id)
+        )
+    """)
+    ops.conn.commit()
+    if not ops.fetchall("SELECT 1 FROM daily_adherence LIMIT 1"):
+        summary = backfill_daily_adherence(progress=None)
+        if summary['rows']:
+            print(f"   rolled up {summary['rows']} day(s) of dose logs")
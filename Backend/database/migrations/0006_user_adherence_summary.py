@@ -0,0 +1,30 @@
+"""
+user_adherence_summary: one row per user for the dashboard and caretaker
+screens (see database.rollups). Rows are built on first read, so no
+backfill is needed.
+"""
+DESCRIPTION = 'user_adherence_summary row per user'
+
+
+def upgrade(ops):
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS user_adherence_summary (
+            user_id INT PRIMARY KEY,
+            summary_date DATE NOT NULL,
+            current_streak INT NOT NULL DEFAULT 0,
+            longest_streak INT NOT NULL DEFAULT 0,
+            closed_streak INT NOT NULL DEFAULT 0,
+            closed_longest INT NOT NULL DEFAULT 0,
+            total_7d INT NOT NULL DEFAULT 0,
+            taken_7d INT NOT NULL DEFAULT 0,
+            missed_7d INT NOT NULL DEFAULT 0,
+            total_30d INT NOT NULL DEFAULT 0,
+            taken_30d INT NOT NULL DEFAULT 0,
+            missed_30d INT NOT NULL DEFAULT 0,
+            doses_today INT NOT NULL DEFAULT 0,
+            taken_today INT NOT NULL DEFAULT 0,
+            today_schedule TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    ops.create_index('user_adherence_summary', 'idx_summary_date', '(summary_date)')
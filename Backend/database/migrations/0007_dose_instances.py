@@ -0,0 +1,31 @@
+"""
+dose_instances: one expected dose per (medicine, date, scheduled time)
+(see database.dose_instances). Generated for the coming days with
+today's dose logs applied, so missed-dose checks work right after deploy.
+"""
+from database.dose_instances import materialize
+
+DESCRIPTION = 'dose_instances table of expected doses'
+
+
+def upgrade(ops):
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS dose_instances (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            medicine_id INT NOT NULL,
+            dose_date DATE NOT NULL,
+            scheduled_time VARCHAR(10) NOT NULL,
+            due_at DATETIME NOT NULL,
+            status ENUM('pending', 'taken', 'missed') NOT NULL DEFAULT 'pending',
+            taken_at DATETIME NULL,
+            dose_log_id INT NULL,
+            UNIQUE KEY uq_dose_instance (medicine_id, dose_date, scheduled_time)
+        )
+    """)
+    ops.create_index('dose_instances', 'idx_instances_user_due', '(user_id, due_at, status)')
+    ops.conn.commit()
+    if not ops.fetchall("SELECT 1 FROM dose_instances LIMIT 1"):
+        summary = materialize(apply_logs=True)
+        if summary['rows']:
+            print(f"   generated {summary['rows']} dose instance(s)")
@@ -0,0 +1,98 @@
+"""
+Native TIME columns for schedule and dose times.
+
+`medicine_schedules.time`, `dose_logs.scheduled_time` and
+`dose_instances.scheduled_time` were VARCHAR(10) holding a mix of '08:00'
+and legacy '8:00 PM' values. This:
+
+- refuses to run while any row's time cannot be parsed: nothing is
+  changed and the offending ids are listed, to be fixed by hand,
+- rewrites every value to 'HH:MM:SS'. A legacy row that clashes with
+  an already-normalized one (same medicine time, same dose) is dropped
+  in its favour,
+- converts the columns to TIME on MySQL (SQLite keeps the normalized
+  text, which orders and compares the same way),
+- indexes medicine_schedules on (time, medicine_id) so time-window
+  lookups are range scans,
+- adds 'snoozed' to dose_instances.status to match dose_logs.
+
+daily_adherence is rebuilt and summaries dropped (rebuilt on next read)
+when any dose log changed, since the morning/evening buckets compare
+the normalized times.
+"""
+from database.rollups import backfill_daily_adherence
+from utils.helpers import to_time
+
+DESCRIPTION = 'TIME columns for schedule and dose times'
+
+# (table, time column, columns identifying a row besides the time)
+COLUMNS = [
+    ('medicine_schedules', 'time', ('medicine_id',)),
+    ('dose_logs', 'scheduled_time', ('user_id', 'medicine_id', 'dose_date')),
+    ('dose_instances', 'scheduled_time', ('medicine_id', 'dose_date')),
+]
+
+
+def _unparseable(ops, table, column):
+    """{value: [ids]} of the rows whose time to_time() cannot read."""
+    bad = {}
+    for (value,) in ops.fetchall(f"SELECT DISTINCT {column} FROM {table}"):
+        if to_time(value) is None:
+            bad[value] = [row[0] for row in ops.fetchall(
+                f"SELECT id FROM {table} WHERE {column} = %s ORDER BY id", (value,))]
+    return bad
+
+
+def _normalize(ops, table, column, key):
+    """Rewrite one column's values to 'HH:MM:SS'. Returns rows changed or deleted."""
+    changed = 0
+    for (value,) in ops.fetchall(f"SELECT DISTINCT {column} FROM {table}"):
+        canonical = to_time(value).isoformat()
+        if canonical == value:
+            continue
+        # Derived table so MySQL allows reading the table it deletes from
+        match = ' AND '.join(f'legacy.{c} = norm.{c}' for c in key)
+        ops.execute(
+            f"""DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM (
+                        SELECT legacy.id FROM {table} legacy
+                        JOIN {table} norm ON {match}
+                        WHERE legacy.{column} = %s AND norm.{column} = %s
+                    ) AS clash
+                )""",
+            (value, canonical)
+        )
+        changed += max(ops.cursor.rowcount, 0)
+        ops.execute(f"UPDATE {table} SET {column} = %s WHERE {column} = %s", (canonical, value))
+        changed += max(ops.cursor.rowcount, 0)
+    return changed
+
+
+def upgrade(ops):
+    # Dose history and schedules are medical records: never drop them for their format
+    problems = []
+    for table, column, _ in COLUMNS:
+        for value, ids in _unparseable(ops, table, column).items():
+            problems.append(f"{table}.{column} = {value!r}: id {', '.join(map(str, ids))}")
+    if problems:
+        for problem in problems:
+            print(f"   ❌ {problem}")
+        raise RuntimeError(
+            f'{len(problems)} unparseable time value(s); fix them (HH:MM or h:MM AM/PM) and re-run the migration'
+        )
+
+    changed = {table: _normalize(ops, table, column, key) for table, column, key in COLUMNS}
+    ops.conn.commit()
+
+    for table, column, _ in COLUMNS:
+        ops.modify_column(table, column, 'TIME NOT NULL')
+    ops.modify_column(
+        'dose_instances', 'status',
+        "ENUM('pending', 'taken', 'missed', 'snoozed') NOT NULL DEFAULT 'pending'"
+    )
+    ops.create_index('medicine_schedules', 'idx_schedules_time', '(time, medicine_id)')
+
+    if changed['dose_logs']:
+        ops.execute("DELETE FROM user_adherence_summary")
+        ops.conn.commit()
+        backfill_daily_adherence(progress=None)
@@ -0,0 +1,20 @@
+"""
+sync_receipts: one row per applied /api/sync/batch item, keyed by the
+client's item id, so a replayed batch returns the original results
+instead of applying the items again (see models.sync).
+"""
+DESCRIPTION = 'sync_receipts for idempotent batch sync'
+
+
+def upgrade(ops):
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS sync_receipts (
+            user_id INT NOT NULL,
+            client_id VARCHAR(64) NOT NULL,
+            code VARCHAR(20) NOT NULL,
+            result TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, client_id)
+        )
+    """)
+    ops.create_index('sync_receipts', 'idx_sync_receipts_created', '(created_at)')
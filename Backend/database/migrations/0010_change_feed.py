@@ -0,0 +1,53 @@
+"""
+Change feed for delta sync (see database.change_feed):
+
+- users.change_seq, the per-user change counter,
+- sync_changes, one row per (user, entity, entity_id) with the seq of its
+  latest change, indexed on (user_id, seq) for `since` reads.
+
+Existing medicines, reminders and dose logs are numbered 1..n per user,
+so a client starting from cursor 0 receives everything it already has.
+"""
+DESCRIPTION = 'sync_changes change feed and users.change_seq'
+
+# (entity, table): backfill order, so a first sync sees medicines before their rows
+ENTITY_TABLES = [
+    ('medicine', 'medicines'),
+    ('reminder', 'reminders'),
+    ('dose_log', 'dose_logs'),
+]
+
+
+def upgrade(ops):
+    ops.add_column('users', 'change_seq', 'BIGINT NOT NULL DEFAULT 0')
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS sync_changes (
+            user_id INT NOT NULL,
+            entity VARCHAR(20) NOT NULL,
+            entity_id INT NOT NULL,
+            seq BIGINT NOT NULL,
+            deleted BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (user_id, entity, entity_id)
+        )
+    """)
+    ops.create_index('sync_changes', 'idx_sync_changes_seq', '(user_id, seq)')
+
+    (already,) = ops.fetchall("SELECT COUNT(*) FROM sync_changes")[0]
+    if already:
+        return
+    rows = ' UNION ALL '.join(
+        f"SELECT user_id, '{entity}' AS entity, id AS entity_id, {n} AS ord FROM {table}"
+        for n, (entity, table) in enumerate(ENTITY_TABLES)
+    )
+    ops.execute(f"""
+        INSERT INTO sync_changes (user_id, entity, entity_id, seq, deleted)
+        SELECT user_id, entity, entity_id,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY ord, entity_id), FALSE
+        FROM ({rows}) AS existing
+    """)
+    ops.execute("""
+        UPDATE users SET change_seq = (
+            SELECT COUNT(*) FROM sync_changes WHERE sync_changes.user_id = users.id
+        )
+    """)
+    ops.conn.commit()
@@ -0,0 +1,30 @@
+"""
+Indexes for keyset-paginated lists: each page is an index range read
+past the previous page's last (sort key, id), however deep it is.
+
+- alerts: one index per side of the user/caretaker UNION,
+- reminders: upcoming/snoozed lists in scheduled_time order per status,
+- dose_logs: the user's dose history by date and time.
+
+The (user_id, status) and (caretaker_id) indexes they extend are dropped.
+"""
+DESCRIPTION = 'Keyset pagination indexes for alerts, reminders and dose history'
+
+INDEXES = [
+    ('alerts', 'idx_alerts_user_created', '(user_id, created_at, id)'),
+    ('alerts', 'idx_alerts_caretaker_created', '(caretaker_id, created_at, id)'),
+    ('reminders', 'idx_reminders_user_status_time', '(user_id, status, scheduled_time, id)'),
+    ('dose_logs', 'idx_dose_user_history', '(user_id, dose_date, scheduled_time, id)'),
+]
+
+REPLACED = [
+    ('alerts', 'idx_alerts_caretaker'),
+    ('reminders', 'idx_reminder_user_status'),
+]
+
+
+def upgrade(ops):
+    for table, name, cols in INDEXES:
+        ops.create_index(table, name, cols)
+    for table, name in REPLACED:
+        ops.drop_index(table, name)
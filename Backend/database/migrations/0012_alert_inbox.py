@@ -0,0 +1,44 @@
+"""
+Per-recipient alert inbox (see models.alert):
+
+- alert_deliveries, one row per (recipient, alert) with its own read flag;
+  the primary key serves the newest-first inbox page,
+- users.unread_alerts, the recipient's unread count for the badge.
+
+Existing alerts are delivered to the user who raised them and to their
+caretaker, the same recipients the old `user_id OR caretaker_id` read saw.
+Nothing reads alerts by caretaker_id any more, so that index is dropped.
+"""
+DESCRIPTION = 'alert_deliveries inbox and users.unread_alerts'
+
+
+def upgrade(ops):
+    ops.add_column('users', 'unread_alerts', 'INT NOT NULL DEFAULT 0')
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS alert_deliveries (
+            recipient_id INT NOT NULL,
+            alert_id INT NOT NULL,
+            is_read BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (recipient_id, alert_id),
+            FOREIGN KEY (alert_id) REFERENCES alerts(id) ON DELETE CASCADE
+        )
+    """)
+    ops.drop_index('alerts', 'idx_alerts_caretaker_created')
+
+    (already,) = ops.fetchall("SELECT COUNT(*) FROM alert_deliveries")[0]
+    if already:
+        return
+    ops.execute("""
+        INSERT INTO alert_deliveries (recipient_id, alert_id, is_read)
+        SELECT user_id, id, is_read FROM alerts
+        UNION
+        SELECT caretaker_id, id, is_read FROM alerts
+        WHERE caretaker_id IS NOT NULL AND caretaker_id <> user_id
+    """)
+    ops.execute("""
+        UPDATE users SET unread_alerts = (
+            SELECT COUNT(*) FROM alert_deliveries
+            WHERE alert_deliveries.recipient_id = users.id AND alert_deliveries.is_read = FALSE
+        )
+    """)
+    ops.conn.commit()
@@ -0,0 +1,23 @@
+"""
+Unique (medicine_id, scheduled_time) on reminders, so the reminder
+horizon job (database.reminder_horizon) can re-run its INSERT ... SELECT
+and skip slots that already have a reminder. Existing duplicates are
+collapsed first, keeping the oldest row.
+"""
+DESCRIPTION = 'Unique (medicine_id, scheduled_time) on reminders'
+
+
+def upgrade(ops):
+    if ops.index_exists('reminders', 'uq_reminders_slot'):
+        return
+    ops.execute("""
+        DELETE FROM reminders WHERE id IN (
+            SELECT id FROM (
+                SELECT r.id FROM reminders r
+                JOIN reminders k ON k.medicine_id = r.medicine_id
+                                AND k.scheduled_time = r.scheduled_time AND k.id < r.id
+            ) AS duplicates
+        )
+    """)
+    ops.conn.commit()
+    ops.create_index('reminders', 'uq_reminders_slot', '(medicine_id, scheduled_time)', unique=True)
@@ -0,0 +1,12 @@
+"""
+(status, scheduled_time) index on reminders for the missed-reminder
+sweep (models.reminder.sweep_missed_reminders), which reads the oldest
+past-due 'upcoming' and 'snoozed' rows across all users. It supersedes
+the (status) index from 0002.
+"""
+DESCRIPTION = 'reminders (status, scheduled_time) index for the missed sweep'
+
+
+def upgrade(ops):
+    ops.create_index('reminders', 'idx_reminders_status_time', '(status, scheduled_time)')
+    ops.drop_index('reminders', 'idx_reminder_status')
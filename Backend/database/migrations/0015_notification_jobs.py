@@ -0,0 +1,28 @@
+"""
+notification_jobs: the durable queue for Twilio SMS and voice calls
+(see jobs.notifications). Workers claim due rows on (status, run_after);
+clients poll their own jobs by id.
+"""
+DESCRIPTION = 'notification_jobs queue for SMS and voice calls'
+
+
+def upgrade(ops):
+    ops.execute("""
+        CREATE TABLE IF NOT EXISTS notification_jobs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            kind ENUM('sms', 'call') NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            body TEXT NOT NULL,
+            status ENUM('queued', 'running', 'sent', 'failed') NOT NULL DEFAULT 'queued',
+            attempts INT NOT NULL DEFAULT 0,
+            run_after DATETIME NOT NULL,
+            sid VARCHAR(64) NULL,
+            last_error TEXT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """)
+    ops.create_index('notification_jobs', 'idx_notification_jobs_due', '(status, run_after)')
+    ops.create_index('notification_jobs', 'idx_notification_jobs_finished', '(finished_at)')
@@ -0,0 +1,11 @@
+"""
+reminders.sweep_token: the missed-reminder sweep
+(models.reminder.sweep_missed_reminders) stamps the rows its UPDATE moves
+with a per-chunk token and reads exactly those back, so a reminder that
+/miss or another sweep moved in between is not counted twice.
+"""
+DESCRIPTION = 'reminders.sweep_token for the missed sweep'
+
+
+def upgrade(ops):
+    ops.add_column('reminders', 'sweep_token', 'VARCHAR(32) NULL')
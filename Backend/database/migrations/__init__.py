@@ -0,0 +1 @@
+# Ordered schema migrations (NNNN_name.py), applied by database.migrate
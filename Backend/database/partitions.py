@@ -0,0 +1,178 @@
+"""
+dose_logs Partitioning
+======================
+On MySQL, `dose_logs` is RANGE COLUMNS partitioned by month on `dose_date`
+(migration 0004). Analytics only read the last 7-90 days, so a
+`dose_date >= X` filter prunes every query to the few hot partitions
+instead of walking years of history in one B-tree.
+
+- `ensure_future_partitions()` keeps DOSE_LOGS_PARTITIONS_AHEAD empty
+  months ready by splitting the catch-all `pmax` partition.
+- `archive_old_partitions()` detaches months older than
+  DOSE_LOGS_RETENTION_MONTHS with EXCHANGE PARTITION (a metadata swap)
+  into standalone `dose_logs_archive_YYYYMM` tables, then drops the empty
+  partition. The archive tables can be dumped and dropped at leisure.
+
+Both run daily from the job scheduler (see jobs/scheduler.py) and are
+no-ops on SQLite or on an unpartitioned table.
+
+Usage:
+    python -m database.partitions            # status
+    python -m database.partitions maintain   # create ahead + archive old
+"""
+import sys
+from datetime import date
+
+from config import Config
+from database.dialects import get_dialect
+
+TABLE = 'dose_logs'
+MAX_PARTITION = 'pmax'
+
+
+def month_start(d):
+    return d.replace(day=1)
+
+
+def add_months(d, months):
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return month.strftime('p%Y%m')
+
+
+def partition_definitions(first_month, last_month):
+    """`PARTITION pYYYYMM VALUES LESS THAN (...)` for each month in [first, last]."""
+    parts = []
+    month = month_start(first_month)
+    while month <= last_month:
+        upper = add_months(month, 1)
+        parts.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ('{upper.isoformat()}')")
+        month = upper
+    return parts
+
+
+def list_partitions(cursor):
+    """[(name, upper bound date or None for MAXVALUE, approx rows)] in order; [] if unpartitioned."""
+    cursor.execute(
+        """SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+           FROM information_schema.PARTITIONS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+           ORDER BY PARTITION_ORDINAL_POSITION""",
+        (TABLE,)
+    )
+    parts = []
+    for name, description, rows in cursor.fetchall():
+        bound = None if description == 'MAXVALUE' else date.fromisoformat(description.strip("'"))
+        parts.append((name, bound, rows or 0))
+    return parts
+
+
+def ensure_future_partitions(conn, months_ahead=None, today=None):
+    """Split `pmax` so every month up to `months_ahead` ahead has its own partition."""
+    months_ahead = Config.DOSE_LOGS_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    today = today or date.today()
+    cursor = conn.cursor()
+    try:
+        parts = list_partitions(cursor)
+        if not parts:
+            return []
+        bounds = [bound for _, bound, _ in parts if bound is not None]
+        next_month = max(bounds) if bounds else month_start(today)
+        last_month = add_months(month_start(today), months_ahead)
+        new_parts = partition_definitions(next_month, last_month)
+        if not new_parts:
+            return []
+        new_parts.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(new_parts)})"
+        )
+        created = [p.split()[1] for p in new_parts[:-1]]
+        print(f"🗂️  Created {TABLE} partitions: {', '.join(created)}")
+        return created
+    finally:
+        cursor.close()
+
+
+def archive_old_partitions(conn, retention_months=None, today=None):
+    """Detach months older than the retention window into dose_logs_archive_YYYYMM tables."""
+    retention_months = Config.DOSE_LOGS_RETENTION_MONTHS if retention_months is None else retention_months
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    dialect = get_dialect()
+    cursor = conn.cursor()
+    archived = []
+    try:
+        parts = list_partitions(cursor)
+        # Always leave at least one bounded partition in place
+        old = [(name, bound) for name, bound, _ in parts if bound is not None and bound <= cutoff]
+        bounded = [p for p in parts if p[1] is not None]
+        if len(old) >= len(bounded):
+            old = old[:len(bounded) - 1]
+
+        for name, _ in old:
+            archive = f"{TABLE}_archive_{name[1:]}"
+            if dialect.table_exists(cursor, archive):
+                # A previous run swapped the rows out but died before the DROP
+                cursor.execute(f"SELECT 1 FROM {TABLE} PARTITION ({name}) LIMIT 1")
+                if cursor.fetchone() is not None:
+                    print(f"⚠️  {archive} already exists and {name} is not empty, skipping")
+                    continue
+            else:
+                cursor.execute(f"CREATE TABLE {archive} LIKE {TABLE}")
+                cursor.execute(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+                cursor.execute(f"ALTER TABLE {TABLE} EXCHANGE PARTITION {name} WITH TABLE {archive}")
+            cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+            archived.append(archive)
+            print(f"🧊 Archived {TABLE} partition {name} to {archive}")
+        return archived
+    finally:
+        cursor.close()
+
+
+def maintain():
+    """Create upcoming partitions and archive expired ones (no-op unless MySQL + partitioned)."""
+    dialect = get_dialect()
+    if dialect.name != 'mysql':
+        return {'created': [], 'archived': []}
+    conn = dialect.connect_direct()
+    try:
+        return {
+            'created': ensure_future_partitions(conn),
+            'archived': archive_old_partitions(conn),
+        }
+    finally:
+        conn.close()
+
+
+def status():
+    dialect = get_dialect()
+    if dialect.name != 'mysql':
+        return []
+    conn = dialect.connect_direct()
+    try:
+        cursor = conn.cursor()
+        parts = list_partitions(cursor)
+        cursor.close()
+        return parts
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'maintain':
+        result = maintain()
+        print(f"✅ {len(result['created'])} partition(s) created, {len(result['archived'])} archived")
+    elif command == 'status':
+        parts = status()
+        if not parts:
+            print(f"{TABLE} is not partitioned")
+        for name, bound, rows in parts:
+            print(f"{name:<10} < {bound or 'MAXVALUE'!s:<12} ~{rows} rows")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,264 @@
+"""
+MySQL Connection Pool
+=====================
+Keeps warm connections to the database so each model call skips the
+TCP + TLS + auth handshake to the cloud MySQL host.
+
+- `size` connections are kept idle between requests, up to `max_overflow`
+  extra ones are opened under load and closed again when returned.
+- Idle connections are pinged on borrow (after `pre_ping` seconds idle)
+  and replaced once they are older than `recycle` seconds.
+- When the server is unreachable the pool fails fast for `retry_backoff`
+  seconds instead of making every request wait on a connect timeout.
+- Each connection carries an LRU of up to `statement_cache_size` prepared
+  statements, used by `conn.cursor(prepared=True)` (see
+  database.statement_cache).
+"""
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import errors
+
+from database.statement_cache import PreparedCursor, StatementCache
+
+
+class PooledConnection:
+    """Thin proxy around a raw connection. `close()` hands it back to the pool."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def cursor(self, *args, prepared=None, **kwargs):
+        """`prepared=True` runs statements through the connection's statement cache."""
+        if prepared:
+            cache = self._pool._statement_cache(self._raw)
+            if cache is not None:
+                return PreparedCursor(cache, dictionary=kwargs.get('dictionary', False))
+        return self._raw.cursor(*args, **kwargs)
+
+    def close(self):
+        """Return the connection to the pool (safe to call twice)."""
+        if self._returned:
+            return
+        self._returned = True
+        self._pool._release(self._raw, self._created_at)
+
+    def discard(self):
+        """Drop a broken connection instead of returning it to the pool."""
+        if self._returned:
+            return
+        self._returned = True
+        self._pool._release(self._raw, self._created_at, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe LIFO pool of MySQL connections."""
+
+    def __init__(self, db_config, size=5, max_overflow=10, timeout=5.0,
+                 recycle=1800, pre_ping=30, retry_backoff=2.0, connect=None,
+                 statement_cache_size=0):
+        self._db_config = dict(db_config)
+        self.size = max(1, int(size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.pre_ping = float(pre_ping)
+        self.retry_backoff = float(retry_backoff)
+        self._connect_fn = connect or mysql.connector.connect
+        self.statement_cache_size = max(0, int(statement_cache_size))
+        self._statement_caches = {}   # id(raw) -> StatementCache
+
+        self._idle = deque()        # (raw, created_at, last_used)
+        self._checked_out = 0
+        self._opening = 0
+        self._cond = threading.Condition()
+        self._down_until = 0.0
+        self._last_error = None
+
+        self._stats = {
+            'created': 0,
+            'recycled': 0,
+            'failed_checks': 0,
+            'connect_errors': 0,
+            'fast_failures': 0,
+            'borrows': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    # ─── Public API ──────────────────────────────────────────
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, opening a new one if below capacity."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    if self._total() < self.size + self.max_overflow:
+                        self._opening += 1
+                        open_new = True
+                    else:
+                        open_new = False
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats['timeouts'] += 1
+                            raise errors.PoolError(
+                                f'Connection pool exhausted ({self.size + self.max_overflow} in use)'
+                            )
+                        self._stats['waits'] += 1
+                        self._cond.wait(remaining)
+                        continue
+                else:
+                    self._checked_out += 1
+
+            if entry is None and open_new:
+                try:
+                    raw, created_at = self._open()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._checked_out += 1
+                    self._stats['borrows'] += 1
+                return PooledConnection(self, raw, created_at)
+
+            raw, created_at, last_used = entry
+            if self._is_usable(raw, created_at, last_used):
+                with self._cond:
+                    self._stats['borrows'] += 1
+                return PooledConnection(self, raw, created_at)
+
+            # Stale or dead — drop it and loop to get another one
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+            self._close_quietly(raw)
+
+    def stats(self):
+        """Snapshot of pool usage counters."""
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'overflow': max(0, self._total() - self.size),
+                'healthy': time.monotonic() >= self._down_until,
+            })
+            if self.statement_cache_size:
+                caches = list(self._statement_caches.values())
+                data['statements'] = {
+                    'cached': sum(len(c) for c in caches),
+                    'hits': sum(c.hits for c in caches),
+                    'misses': sum(c.misses for c in caches),
+                    'evictions': sum(c.evictions for c in caches),
+                }
+        return data
+
+    def dispose(self):
+        """Close all idle connections (checked-out ones close on return)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for raw, _, _ in idle:
+            self._close_quietly(raw)
+
+    # ─── Internals ───────────────────────────────────────────
+
+    def _total(self):
+        return len(self._idle) + self._checked_out + self._opening
+
+    def _statement_cache(self, raw):
+        if not self.statement_cache_size:
+            return None
+        with self._cond:
+            cache = self._statement_caches.get(id(raw))
+            if cache is None:
+                cache = self._statement_caches[id(raw)] = StatementCache(raw, self.statement_cache_size)
+        return cache
+
+    def _open(self):
+        now = time.monotonic()
+        if now < self._down_until and self._last_error is not None:
+            with self._cond:
+                self._stats['fast_failures'] += 1
+            raise self._last_error
+        try:
+            raw = self._connect_fn(**self._db_config)
+        except errors.Error as e:
+            with self._cond:
+                self._stats['connect_errors'] += 1
+                self._last_error = e
+                self._down_until = time.monotonic() + self.retry_backoff
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+            self._down_until = 0.0
+            self._last_error = None
+        return raw, time.monotonic()
+
+    def _is_usable(self, raw, created_at, last_used):
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if now - last_used >= self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats['failed_checks'] += 1
+                return False
+        return True
+
+    def _release(self, raw, created_at, discard=False):
+        if not discard:
+            try:
+                # Never hand an open transaction to the next borrower
+                if raw.in_transaction:
+                    raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._checked_out -= 1
+            keep = not discard and len(self._idle) < self.size
+            if keep:
+                self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(raw)
+
+    def _close_quietly(self, raw):
+        with self._cond:
+            self._statement_caches.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
@@ -0,0 +1,179 @@
+"""
+Reminder Horizon
+================
+Keeps `reminders` generated REMINDER_HORIZON_HOURS ahead for every active
+medicine, so the app reads tomorrow's reminders from the server instead
+of rebuilding them from schedules on the device.
+
+- Rows are expanded from `medicine_schedules` with one INSERT ... SELECT
+  per user_id range (schedules x the window's dates), not row by row.
+- The (medicine_id, scheduled_time) unique key makes every run
+  idempotent: slots that already have a reminder are skipped, whatever
+  their status.
+- New reminders go through the change feed, so synced clients pull them.
+
+Medicine create/update call `sync_medicines()` in the writer's
+transaction: future 'upcoming' reminders whose time left the schedule (or
+whose medicine was deactivated) are removed and the window is filled in.
+`log_dose`/`log_doses` call `close_reminders()` so a logged dose closes its
+reminder before the missed-reminder sweep gets to it.
+The hourly `reminder_materialization` job rolls the window forward.
+
+Usage:
+    python -m database.reminder_horizon     # materialize ahead for everyone
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from config import Config
+from database.change_feed import record_changes
+from database.dialects import get_dialect
+from database.schema import get_connection
+
+
+def _window(now=None, hours_ahead=None):
+    """[start, end) of the horizon, to the second."""
+    hours_ahead = Config.REMINDER_HORIZON_HOURS if hours_ahead is None else hours_ahead
+    start = (now or datetime.now()).replace(microsecond=0)
+    return start, start + timedelta(hours=hours_ahead)
+
+
+def _generate(cursor, start, end, user_range=None, medicine_ids=None):
+    """
+    Insert the missing reminders in [start, end) for the active medicines of
+    a user_id range or of `medicine_ids`, and record them in the change feed.
+    Returns the number of reminders created.
+    """
+    if user_range:
+        scope, reminder_scope, params = 'm.user_id >= %s AND m.user_id < %s', \
+            'user_id >= %s AND user_id < %s', list(user_range)
+    else:
+        ids = ', '.join(['%s'] * len(medicine_ids))
+        scope, reminder_scope, params = f'm.id IN ({ids})', f'medicine_id IN ({ids})', list(medicine_ids)
+
+    days = [start.date() + timedelta(days=n) for n in range((end.date() - start.date()).days + 1)]
+    dialect = get_dialect()
+    slot = dialect.combine_datetime('d.dose_date', 'ms.time')
+
+    # New rows are the statement's scope and window minus what was there before,
+    # not a global id bracket: another writer's concurrent insert can only be
+    # picked up if it is in this scope, and then it is in its owner's feed
+    in_window = f"""SELECT user_id, id FROM reminders
+                    WHERE {reminder_scope} AND scheduled_time >= %s AND scheduled_time < %s"""
+    cursor.execute(in_window, (*params, start, end))
+    before = {reminder_id for _, reminder_id in cursor.fetchall()}
+    cursor.execute(
+        f"""INSERT INTO reminders (user_id, medicine_id, scheduled_time, status)
+            SELECT m.user_id, m.id, {slot}, 'upcoming'
+            FROM medicines m
+            JOIN medicine_schedules ms ON ms.medicine_id = m.id
+            CROSS JOIN ({' UNION ALL '.join(['SELECT %s AS dose_date'] * len(days))}) AS d
+            WHERE {scope} AND m.is_active = TRUE AND {slot} >= %s AND {slot} < %s
+            {dialect.skip_duplicates('reminders', ('medicine_id', 'scheduled_time'))}""",
+        (*days, *params, start, end)
+    )
+    cursor.execute(in_window, (*params, start, end))
+    created = defaultdict(list)
+    for user_id, reminder_id in cursor.fetchall():
+        if reminder_id not in before:
+            created[user_id].append(reminder_id)
+    for user_id, reminder_ids in created.items():
+        record_changes(cursor, user_id, 'reminder', reminder_ids)
+    return sum(len(ids) for ids in created.values())
+
+
+def sync_medicines(cursor, user_id, medicine_ids, now=None):
+    """
+    Bring the medicines' future reminders in line with their schedules after
+    a create/update (run inside the writer's transaction, on a tuple cursor).
+    """
+    if not medicine_ids:
+        return 0
+    start, end = _window(now)
+    ids = ', '.join(['%s'] * len(medicine_ids))
+    cursor.execute(
+        f"""SELECT r.id FROM reminders r
+            WHERE r.user_id = %s AND r.medicine_id IN ({ids})
+              AND r.status = 'upcoming' AND r.scheduled_time >= %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM medicine_schedules ms
+                  JOIN medicines m ON m.id = ms.medicine_id
+                  WHERE ms.medicine_id = r.medicine_id AND m.is_active = TRUE
+                    AND ms.time = TIME(r.scheduled_time)
+              )""",
+        (user_id, *medicine_ids, start)
+    )
+    stale = [row[0] for row in cursor.fetchall()]
+    if stale:
+        cursor.execute(
+            f"DELETE FROM reminders WHERE id IN ({', '.join(['%s'] * len(stale))})", stale
+        )
+        record_changes(cursor, user_id, 'reminder', stale, deleted=True)
+    return _generate(cursor, start, end, medicine_ids=medicine_ids)
+
+
+def close_reminders(cursor, user_id, doses):
+    """
+    Close the open reminders of logged doses (run inside the dose log's
+    transaction): [(medicine_id, dose_date, scheduled_time, status)], taken
+    doses complete their reminder and missed ones mark it missed.
+    """
+    slots = {'completed': set(), 'missed': set()}
+    for medicine_id, dose_date, scheduled_time, status in doses:
+        if status in ('taken', 'missed'):
+            slots['completed' if status == 'taken' else 'missed'].add(
+                (medicine_id, datetime.combine(dose_date, scheduled_time)))
+    for status, keys in slots.items():
+        if not keys:
+            continue
+        match = ' OR '.join(['(medicine_id = %s AND scheduled_time = %s)'] * len(keys))
+        params = [value for key in sorted(keys) for value in key]
+        cursor.execute(
+            f"""SELECT id FROM reminders
+                WHERE user_id = %s AND status IN ('upcoming', 'snoozed') AND ({match})""",
+            (user_id, *params)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if ids:
+            cursor.execute(
+                f"UPDATE reminders SET status = %s WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                (status, *ids)
+            )
+            record_changes(cursor, user_id, 'reminder', ids)
+
+
+def materialize(hours_ahead=None, chunk_users=500, now=None):
+    """
+    Generate reminders from now through `hours_ahead` for every active
+    medicine, one user_id range per transaction.
+    Returns {'rows', 'seconds', 'per_second'}.
+    """
+    start, end = _window(now, hours_ahead)
+    started = time.monotonic()
+    result = {'rows': 0, 'seconds': 0.0, 'per_second': 0.0}
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM medicines WHERE is_active = TRUE")
+        lo, hi = cursor.fetchone()
+        conn.commit()
+        user = lo
+        while user is not None and user <= hi:
+            chunk_hi = user + chunk_users
+            result['rows'] += _generate(cursor, start, end, user_range=(user, chunk_hi))
+            conn.commit()
+            user = chunk_hi
+    finally:
+        cursor.close()
+        conn.close()
+
+    seconds = time.monotonic() - started
+    result['seconds'] = round(seconds, 2)
+    result['per_second'] = round(result['rows'] / seconds, 1) if seconds > 0 else 0.0
+    return result
+
+
+if __name__ == '__main__':
+    print(f"⏰ Materializing reminders {Config.REMINDER_HORIZON_HOURS}h ahead...")
+    print(f"✅ Done: {materialize()}")
@@ -0,0 +1,309 @@
+"""
+Adherence Rollups
+=================
+`daily_adherence` holds one row per (user_id, dose_date, medicine_id) with
+the dose counts the analytics screens need, so they read one row per day
+and medicine instead of re-aggregating raw `dose_logs`:
+
+- total / taken / missed doses,
+- morning (scheduled before 12:00) and evening (17:00 or later) totals
+  and taken counts, for the time-of-day insights.
+
+`log_dose` refreshes the affected row in its own transaction via
+`refresh_daily_adherence()`. The row is recomputed from the handful of
+dose logs behind it, so re-logging a dose with a new status stays exact.
+
+`user_adherence_summary` is one row per user for the dashboard and
+caretaker screens: current / longest streak, rolling 7- and 30-day
+counts, today's scheduled and taken doses, today's schedule for the next
+dose. `refresh_adherence_summary()` keeps it current:
+
+- a dose logged for today folds today's counts onto `closed_streak` /
+  `closed_longest` (the streaks through yesterday) and re-sums at most
+  30 days of rollup rows,
+- when the day changes, the previous days are folded into
+  `closed_streak` (the `adherence_day_close` job does this for everyone),
+- a dose logged for an earlier day rebuilds the row from the user's
+  daily_adherence history.
+
+A day with dose logs extends the streak only when every logged dose was
+taken; days without logs neither extend nor break it.
+
+Backfill / repair (idempotent, one short transaction per user_id range;
+rebuilds existing summaries too):
+    python -m database.rollups
+    python -m database.rollups --chunk-users 200 --sleep 0.1
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from database.dialects import get_dialect
+from database.schema import get_connection
+
+COUNT_COLUMNS = (
+    'total', 'taken', 'missed',
+    'morning_total', 'morning_taken', 'evening_total', 'evening_taken',
+)
+
+_AGGREGATES = """
+    COUNT(*),
+    SUM(CASE WHEN status = 'taken' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN status = 'missed' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN scheduled_time < '12:00:00' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN scheduled_time < '12:00:00' AND status = 'taken' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN scheduled_time >= '17:00:00' THEN 1 ELSE 0 END),
+    SUM(CASE WHEN scheduled_time >= '17:00:00' AND status = 'taken' THEN 1 ELSE 0 END)
+"""
+
+
+def _rollup_sql(where):
+    dialect = get_dialect()
+    upsert = dialect.upsert(
+        ('user_id', 'dose_date', 'medicine_id'),
+        [f'{col} = {dialect.inserted(col)}' for col in COUNT_COLUMNS],
+    )
+    return f"""
+        INSERT INTO daily_adherence (user_id, dose_date, medicine_id, {', '.join(COUNT_COLUMNS)})
+        SELECT user_id, dose_date, medicine_id, {_AGGREGATES}
+        FROM dose_logs
+        WHERE {where}
+        GROUP BY user_id, dose_date, medicine_id
+        {upsert}
+    """
+
+
+def refresh_daily_adherence(cursor, user_id, medicine_id, dose_date):
+    """Recompute one rollup row from dose_logs (run inside the writer's transaction)."""
+    cursor.execute(
+        _rollup_sql('user_id = %s AND medicine_id = %s AND dose_date = %s'),
+        (user_id, medicine_id, dose_date)
+    )
+
+
+def refresh_daily_adherence_days(cursor, user_id, dose_dates):
+    """Recompute a user's rollup rows for several days in one statement (batch writers)."""
+    dose_dates = sorted(set(dose_dates))
+    cursor.execute(
+        _rollup_sql(f"user_id = %s AND dose_date IN ({', '.join(['%s'] * len(dose_dates))})"),
+        (user_id, *dose_dates)
+    )
+
+
+SUMMARY_COLUMNS = (
+    'summary_date', 'current_streak', 'longest_streak', 'closed_streak', 'closed_longest',
+    'total_7d', 'taken_7d', 'missed_7d', 'total_30d', 'taken_30d', 'missed_30d',
+    'doses_today', 'taken_today', 'today_schedule',
+)
+
+
+def _fold_day(streak, longest, total, taken):
+    if not total:
+        return streak, longest
+    streak = streak + 1 if taken == total else 0
+    return streak, max(longest, streak)
+
+
+def _daily_totals(cursor, user_id, since=None, until=None):
+    """[(dose_date, total, taken, missed)] per day, oldest first."""
+    sql = """SELECT dose_date, SUM(total), SUM(taken), SUM(missed)
+             FROM daily_adherence WHERE user_id = %s"""
+    params = [user_id]
+    if since is not None:
+        sql += " AND dose_date >= %s"
+        params.append(since)
+    if until is not None:
+        sql += " AND dose_date <= %s"
+        params.append(until)
+    cursor.execute(sql + " GROUP BY dose_date ORDER BY dose_date", params)
+    return [(d, int(t or 0), int(tk or 0), int(m or 0)) for d, t, tk, m in cursor.fetchall()]
+
+
+def _today_schedule(cursor, user_id):
+    cursor.execute(
+        """SELECT SUBSTR(ms.time, 1, 5), m.name, m.dosage, m.instruction
+           FROM medicines m
+           JOIN medicine_schedules ms ON m.id = ms.medicine_id
+           WHERE m.user_id = %s AND m.is_active = TRUE
+           ORDER BY ms.time""",
+        (user_id,)
+    )
+    slots = [
+        {'time': hhmm, 'medicine': name, 'dosage': dosage, 'instruction': instruction or ''}
+        for hhmm, name, dosage, instruction in cursor.fetchall()
+    ]
+    return len(slots), slots
+
+
+def _write_summary(cursor, user_id, today, closed, closed_longest):
+    days = _daily_totals(cursor, user_id, since=today - timedelta(days=29))
+    week_start = today - timedelta(days=6)
+    week = [d for d in days if d[0] >= week_start]
+    today_total, today_taken = next(((t, tk) for d, t, tk, _ in days if d == today), (0, 0))
+    current, longest = _fold_day(closed, closed_longest, today_total, today_taken)
+    doses_today, slots = _today_schedule(cursor, user_id)
+
+    summary = {
+        'summary_date': today,
+        'current_streak': current,
+        'longest_streak': longest,
+        'closed_streak': closed,
+        'closed_longest': closed_longest,
+        'total_7d': sum(d[1] for d in week),
+        'taken_7d': sum(d[2] for d in week),
+        'missed_7d': sum(d[3] for d in week),
+        'total_30d': sum(d[1] for d in days),
+        'taken_30d': sum(d[2] for d in days),
+        'missed_30d': sum(d[3] for d in days),
+        'doses_today': doses_today,
+        'taken_today': today_taken,
+        'today_schedule': json.dumps(slots),
+    }
+    dialect = get_dialect()
+    upsert = dialect.upsert(('user_id',), [f'{c} = {dialect.inserted(c)}' for c in SUMMARY_COLUMNS])
+    cursor.execute(
+        f"""INSERT INTO user_adherence_summary (user_id, {', '.join(SUMMARY_COLUMNS)})
+            VALUES (%s, {', '.join(['%s'] * len(SUMMARY_COLUMNS))})
+            {upsert}""",
+        [user_id] + [summary[c] for c in SUMMARY_COLUMNS]
+    )
+    summary['user_id'] = user_id
+    return summary
+
+
+def rebuild_adherence_summary(cursor, user_id, today=None):
+    """Recompute a user's summary from their whole daily_adherence history."""
+    today = today or date.today()
+    closed = closed_longest = 0
+    for _, total, taken, _ in _daily_totals(cursor, user_id, until=today - timedelta(days=1)):
+        closed, closed_longest = _fold_day(closed, closed_longest, total, taken)
+    return _write_summary(cursor, user_id, today, closed, closed_longest)
+
+
+def refresh_adherence_summary(cursor, user_id, dose_date=None, today=None):
+    """
+    Bring a user's summary up to date after a dose (dose_date) or schedule change.
+    Runs on the caller's (plain, tuple-row) cursor and transaction; returns the summary.
+    """
+    today = today or date.today()
+    cursor.execute(
+        """SELECT summary_date, current_streak, closed_streak, closed_longest
+           FROM user_adherence_summary WHERE user_id = %s""",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return rebuild_adherence_summary(cursor, user_id, today)
+
+    summary_date, current, closed, closed_longest = row
+    if summary_date > today or (dose_date is not None and dose_date < today and dose_date <= summary_date):
+        # A day already folded into the streak changed: recount it
+        return rebuild_adherence_summary(cursor, user_id, today)
+
+    if summary_date < today:
+        # The summary's day has closed: its streak is final, fold in any later days
+        closed, closed_longest = current, max(closed_longest, current)
+        for _, total, taken, _ in _daily_totals(
+                cursor, user_id, since=summary_date + timedelta(days=1), until=today - timedelta(days=1)):
+            closed, closed_longest = _fold_day(closed, closed_longest, total, taken)
+    return _write_summary(cursor, user_id, today, closed, closed_longest)
+
+
+def close_adherence_days(batch_size=500):
+    """Roll every summary still dated before today over to today. Returns rows rolled."""
+    today = date.today()
+    rolled = 0
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(
+                "SELECT user_id FROM user_adherence_summary WHERE summary_date < %s LIMIT %s",
+                (today, batch_size)
+            )
+            user_ids = [r[0] for r in cursor.fetchall()]
+            if not user_ids:
+                break
+            for user_id in user_ids:
+                refresh_adherence_summary(cursor, user_id, today=today)
+            conn.commit()
+            rolled += len(user_ids)
+    finally:
+        cursor.close()
+        conn.close()
+    return rolled
+
+
+def backfill_daily_adherence(chunk_users=500, sleep=0.0, progress=print):
+    """
+    Rebuild daily_adherence from dose_logs, one user_id range per transaction,
+    and rebuild the range's existing user_adherence_summary rows from it
+    (users without one get it on first read).
+    Returns {'users_scanned', 'rows', 'summaries', 'seconds'}.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    started = time.monotonic()
+    result = {'users_scanned': 0, 'rows': 0, 'summaries': 0, 'seconds': 0.0}
+
+    try:
+        cursor.execute("SELECT MIN(user_id), MAX(user_id) FROM dose_logs")
+        lo, hi = cursor.fetchone()
+        # Migration 0005 backfills before the summary table exists
+        summaries = get_dialect().table_exists(cursor, 'user_adherence_summary')
+        conn.commit()
+        if lo is None:
+            return result
+
+        span = hi - lo + 1
+        user = lo
+        while user <= hi:
+            chunk_hi = user + chunk_users
+            # Replace the range so rows for deleted dose logs go away too
+            cursor.execute(
+                "DELETE FROM daily_adherence WHERE user_id >= %s AND user_id < %s",
+                (user, chunk_hi)
+            )
+            cursor.execute(_rollup_sql('user_id >= %s AND user_id < %s'), (user, chunk_hi))
+            result['rows'] += max(cursor.rowcount, 0)
+            if summaries:
+                # Streaks and 7/30-day counts were folded from the old rollup rows
+                cursor.execute(
+                    "SELECT user_id FROM user_adherence_summary WHERE user_id >= %s AND user_id < %s",
+                    (user, chunk_hi)
+                )
+                for (user_id,) in cursor.fetchall():
+                    rebuild_adherence_summary(cursor, user_id)
+                    result['summaries'] += 1
+            conn.commit()
+
+            result['users_scanned'] = min(chunk_hi, hi + 1) - lo
+            if progress:
+                elapsed = time.monotonic() - started
+                done = result['users_scanned'] / span
+                eta = (elapsed / done - elapsed) if done else 0
+                progress(
+                    f"  users {user}-{min(chunk_hi, hi + 1) - 1} | {done * 100:5.1f}% | "
+                    f"rollup rows {result['rows']} | summaries {result['summaries']} | ETA {eta:.0f}s"
+                )
+            if sleep:
+                time.sleep(sleep)
+            user = chunk_hi
+    finally:
+        cursor.close()
+        conn.close()
+
+    result['seconds'] = round(time.monotonic() - started, 2)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill the daily_adherence rollup (and summaries) from dose_logs.')
+    parser.add_argument('--chunk-users', type=int, default=500, help='user_id range rebuilt per transaction')
+    parser.add_argument('--sleep', type=float, default=0.0, help='pause between ranges (secs)')
+    args = parser.parse_args()
+
+    print("📊 Backfilling daily_adherence...")
+    summary = backfill_daily_adherence(args.chunk_users, args.sleep)
+    print(f"✅ Done: {summary}")
@@ -0,0 +1,274 @@
+"""
+Read-Replica Routing
+====================
+Sends read-only model functions to MySQL replicas so analytics and
+dashboard reads stop competing with writes on the primary.
+
+    @request_cached
+    @replica_read
+    def get_adherence_stats(user_id, days=7): ...
+
+Inside a `@replica_read` call, `get_connection()` returns a replica
+connection when it is safe to do so, otherwise the primary:
+
+- replicas lagging more than DB_REPLICA_MAX_LAG seconds (or with broken
+  replication, or unreachable) are skipped, falling back to the primary,
+- a user who wrote in the last DB_READ_YOUR_WRITES_WINDOW seconds reads
+  from the primary (read-your-writes), as does a request that has
+  already written. The last-write marker lives in the cache's shared
+  tier (CACHE_REDIS_URL), so every worker process sees it; if that tier
+  cannot be read, the user reads from the primary,
+- healthy replicas are used round-robin.
+
+Configure with DB_REPLICA_HOSTS=host:port[,host:port...]. Replicas share
+DB_USER / DB_PASSWORD / DB_NAME unless DB_REPLICA_USER / DB_REPLICA_PASSWORD
+are set. To try it locally, run two MySQL instances (e.g. ports 3306 and
+3307) with 3307 replicating from 3306 and set DB_REPLICA_HOSTS=127.0.0.1:3307.
+An instance that is not configured as a replica reports no lag and is
+treated as an up-to-date copy.
+"""
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from functools import wraps
+
+from mysql.connector import errors
+
+from config import Config
+from database.dialects import get_dialect
+from database.pool import ConnectionPool
+
+_read_intent = contextvars.ContextVar('db_read_intent', default=False)
+_primary_only = contextvars.ContextVar('db_primary_only', default=False)
+
+
+def replica_read(func):
+    """Mark a model function as read-only so it may run on a replica."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _read_intent.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_intent.reset(token)
+    return wrapper
+
+
+def wants_replica():
+    """True while inside a `@replica_read` call, outside `primary_reads()`."""
+    return _read_intent.get() and not _primary_only.get()
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Send every read in the block to the primary, `@replica_read` or not."""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+class Replica:
+    def __init__(self, host, port, pool):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.lag = None
+        self.checked_at = 0.0
+        self.healthy = False
+        self.reads = 0
+
+    @property
+    def name(self):
+        return f'{self.host}:{self.port}'
+
+
+class ReplicaRouter:
+    """Picks a healthy, caught-up replica for reads, or None for the primary."""
+
+    def __init__(self, replicas, max_lag=5.0, check_interval=5.0, sticky_window=10.0):
+        self.replicas = replicas
+        self.max_lag = float(max_lag)
+        self.check_interval = float(check_interval)
+        # A replica passed as fresh may be max_lag behind as of its last lag check
+        self.sticky_window = max(float(sticky_window), self.max_lag + self.check_interval)
+        self._rr = itertools.cycle(range(len(replicas))) if replicas else None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._recent_writes = {}
+        self._stats = {'replica_reads': 0, 'primary_fallbacks': 0, 'sticky_reads': 0, 'marker_errors': 0}
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    # ─── Read-your-writes ────────────────────────────────────
+
+    def note_write(self, user_id):
+        if user_id is None or not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[user_id] = now
+            if len(self._recent_writes) > 10000:
+                cutoff = now - self.sticky_window
+                self._recent_writes = {u: t for u, t in self._recent_writes.items() if t >= cutoff}
+        try:
+            self._shared().set(self._marker_key(user_id), b'1', self.sticky_window)
+        except Exception as e:
+            self._count('marker_errors')
+            print(f"⚠️  Could not share last write of user {user_id}: {e}")
+
+    def is_sticky(self, user_id):
+        if user_id is None:
+            return False
+        with self._lock:
+            wrote_at = self._recent_writes.get(user_id)
+        if wrote_at is not None and time.monotonic() - wrote_at < self.sticky_window:
+            return True
+        # The write may have gone through another worker process
+        try:
+            return self._shared().get_many([self._marker_key(user_id)])[0] is not None
+        except Exception:
+            self._count('marker_errors')
+            return True
+
+    def _shared(self):
+        from utils.cache import get_cache
+        return get_cache().shared
+
+    def _marker_key(self, user_id):
+        return f'{Config.CACHE_NAMESPACE}:wrote:{user_id}'
+
+    # ─── Routing ─────────────────────────────────────────────
+
+    def acquire_read(self, user_id=None):
+        """A pooled replica connection, or None when the primary should serve the read."""
+        if not self.enabled:
+            return None
+        if self.is_sticky(user_id):
+            self._count('sticky_reads')
+            return None
+
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[next(self._rr)]
+            if not self._is_fresh(replica):
+                continue
+            try:
+                conn = replica.pool.acquire()
+            except errors.Error:
+                replica.healthy = False
+                continue
+            with self._lock:
+                replica.reads += 1
+                self._stats['replica_reads'] += 1
+            return conn
+
+        self._count('primary_fallbacks')
+        return None
+
+    def _is_fresh(self, replica):
+        if time.monotonic() - replica.checked_at >= self.check_interval:
+            # One thread refreshes; the others use the last known lag
+            if self._check_lock.acquire(blocking=False):
+                try:
+                    self._check_lag(replica)
+                finally:
+                    self._check_lock.release()
+        return replica.healthy and replica.lag is not None and replica.lag <= self.max_lag
+
+    def _check_lag(self, replica):
+        replica.checked_at = time.monotonic()
+        try:
+            conn = replica.pool.acquire()
+        except errors.Error:
+            replica.healthy, replica.lag = False, None
+            return
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except errors.ProgrammingError:
+                cursor.execute("SHOW SLAVE STATUS")   # MySQL < 8.0.22 / MariaDB
+            row = cursor.fetchone()
+            if row is None:
+                lag = 0.0   # not a replica: a standalone, up-to-date copy
+            else:
+                value = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+                lag = None if value is None else float(value)   # NULL = replication stopped
+            replica.lag = lag
+            replica.healthy = lag is not None
+        except errors.Error:
+            replica.healthy, replica.lag = False, None
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data['replicas'] = [
+            {'name': r.name, 'healthy': r.healthy, 'lag': r.lag, 'reads': r.reads,
+             'pool': r.pool.stats()}
+            for r in self.replicas
+        ]
+        return data
+
+
+def _parse_hosts(value):
+    hosts = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        hosts.append((host, int(port) if port else Config.DB_PORT))
+    return hosts
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Process-wide replica router (disabled when no replicas are configured)."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                replicas = []
+                dialect = get_dialect()
+                if dialect.name == 'mysql':
+                    for host, port in _parse_hosts(Config.DB_REPLICA_HOSTS):
+                        cfg = dialect.connect_kwargs()
+                        cfg.update({'host': host, 'port': port})
+                        if Config.DB_REPLICA_USER:
+                            cfg['user'] = Config.DB_REPLICA_USER
+                            cfg['password'] = Config.DB_REPLICA_PASSWORD
+                        pool = ConnectionPool(
+                            cfg,
+                            size=Config.DB_POOL_SIZE,
+                            max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                            timeout=Config.DB_POOL_TIMEOUT,
+                            recycle=Config.DB_POOL_RECYCLE,
+                            pre_ping=Config.DB_POOL_PRE_PING,
+                            retry_backoff=Config.DB_RETRY_BACKOFF,
+                            connect=dialect.connect,
+                            statement_cache_size=Config.DB_STATEMENT_CACHE_SIZE,
+                        )
+                        replicas.append(Replica(host, port, pool))
+                _router = ReplicaRouter(
+                    replicas,
+                    max_lag=Config.DB_REPLICA_MAX_LAG,
+                    check_interval=Config.DB_REPLICA_LAG_CHECK_INTERVAL,
+                    sticky_window=Config.DB_READ_YOUR_WRITES_WINDOW,
+                )
+    return _router
@@ -0,0 +1,215 @@
+"""
+Request-Scoped Database Session (Unit of Work)
+==============================================
+Inside a Flask request every `get_connection()` call returns the same
+pooled connection, so one HTTP request = one connection + one transaction.
+
+- Model code keeps its usual `conn.commit()` / `conn.close()` calls:
+  `commit()` only marks the unit of work as "to be committed", `close()`
+  is a no-op. The real COMMIT runs once in `after_request`, the
+  connection goes back to the pool in `teardown_request`.
+- Requests that fail with an exception or a 5xx response are rolled back.
+- Read-only model functions decorated with `@request_cached` run at most
+  once per request for the same arguments. Any commit/rollback in the
+  request clears those cached results.
+- `@replica_read` functions get a second, replica connection when the
+  router allows it (see database.router); a request that has written, or
+  whose user wrote moments ago, stays on the primary.
+- `after_commit(callback)` defers work that must only see committed data
+  (cache invalidation) until the COMMIT has run.
+
+Outside a request (CLI scripts, background threads) nothing changes:
+`get_connection()` hands out a plain pooled connection.
+"""
+import copy
+import time
+from functools import wraps
+
+from flask import g, has_request_context, jsonify, request
+
+from database.instrumentation import InstrumentedCursor, QueryStats
+
+_SESSION_KEY = '_db_session'
+
+
+class SessionConnection:
+    """Connection proxy handed to model code during a request."""
+
+    def __init__(self, session, conn):
+        self._session = session
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._session.stats)
+
+    def commit(self):
+        """Defer the COMMIT to the end of the request."""
+        self._session.wants_commit = True
+        self._session.wrote = True
+        self._session.invalidate()
+
+    def rollback(self):
+        """Roll back the whole request transaction."""
+        self._conn.rollback()
+        self._session.wants_commit = False
+        self._session.invalidate()
+
+    def close(self):
+        """Released by the session at request teardown."""
+        pass
+
+
+class RequestSession:
+    """One connection + one transaction + a read cache for a single request."""
+
+    def __init__(self):
+        self._conn = None
+        self._proxy = None
+        self._replica_conn = None
+        self._replica_proxy = None
+        self.wants_commit = False
+        self.wrote = False
+        self.memo = {}
+        self.stats = QueryStats()
+        self.on_commit = []
+
+    def connection(self, read_only=False):
+        if read_only and not self.wrote:
+            replica = self._replica()
+            if replica is not None:
+                return replica
+        if self._conn is None:
+            from database.schema import get_pool
+            started = time.perf_counter()
+            self._conn = get_pool().acquire()
+            self.stats.acquire_ms += (time.perf_counter() - started) * 1000
+            self._proxy = SessionConnection(self, self._conn)
+        return self._proxy
+
+    def _replica(self):
+        if self._replica_proxy is None:
+            from database.router import get_router
+            router = get_router()
+            if not router.enabled:
+                return None
+            started = time.perf_counter()
+            conn = router.acquire_read(getattr(request, 'user_id', None))
+            self.stats.acquire_ms += (time.perf_counter() - started) * 1000
+            if conn is None:
+                return None
+            self._replica_conn = conn
+            self._replica_proxy = SessionConnection(self, conn)
+        return self._replica_proxy
+
+    def invalidate(self):
+        self.memo.clear()
+
+    def commit(self):
+        if self._conn is not None and self.wants_commit:
+            from database.router import get_router
+            router = get_router()
+            user_id = getattr(request, 'user_id', None)
+            # Marked before and after the COMMIT, so no other worker reads a replica in between
+            router.note_write(user_id)
+            self._conn.commit()
+            router.note_write(user_id)
+            for callback in self.on_commit:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"⚠️  After-commit callback failed: {e}")
+        self.on_commit = []
+        self.wants_commit = False
+
+    def rollback(self):
+        if self._conn is not None:
+            try:
+                self._conn.rollback()
+            except Exception:
+                pass
+        self.on_commit = []
+        self.wants_commit = False
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._proxy = None
+        if self._replica_conn is not None:
+            self._replica_conn.close()   # the pool rolls back the read snapshot
+            self._replica_conn = None
+            self._replica_proxy = None
+        self.memo.clear()
+
+
+def current_session(create=True):
+    """The request's session, or None outside a request context."""
+    if not has_request_context():
+        return None
+    session = g.get(_SESSION_KEY)
+    if session is None and create:
+        session = RequestSession()
+        setattr(g, _SESSION_KEY, session)
+    return session
+
+
+def after_commit(callback):
+    """Run `callback` once the request's transaction commits; right away outside a request."""
+    session = current_session(create=False)
+    if session is None:
+        callback()
+    else:
+        session.on_commit.append(callback)
+
+
+def request_cached(func):
+    """Memoize a read-only model function for the rest of the request."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        session = current_session()
+        if session is None:
+            return func(*args, **kwargs)
+        try:
+            key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        if key not in session.memo:
+            session.memo[key] = func(*args, **kwargs)
+        # Callers often decorate the result dicts, so hand out copies
+        return copy.deepcopy(session.memo[key])
+    return wrapper
+
+
+def init_app(app):
+    """Commit/rollback and release the request session around each request."""
+
+    @app.after_request
+    def _commit_session(response):
+        session = current_session(create=False)
+        if session is None:
+            return response
+        if response.status_code >= 500:
+            session.rollback()
+            return response
+        try:
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"❌ Request transaction failed to commit: {e}")
+            response = jsonify({'success': False, 'error': 'Internal server error'})
+            response.status_code = 500
+        return response
+
+    @app.teardown_request
+    def _close_session(exc):
+        session = g.pop(_SESSION_KEY, None)
+        if session is None:
+            return
+        if exc is not None:
+            session.rollback()
+        session.close()
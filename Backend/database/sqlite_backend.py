@@ -0,0 +1,149 @@
+"""
+SQLite Storage Backend
+======================
+Lets the backend run without a database server (small clinics, local
+benchmarks). The classes below mimic the slice of the mysql.connector API
+the models use: `conn.cursor(dictionary=True)`, `%s` placeholders,
+`lastrowid`, `rowcount`, `commit()` / `rollback()` / `close()`.
+
+Connections are opened in WAL mode with pragmas tuned for a single-node
+web workload (concurrent readers, one writer, fsync on checkpoint only).
+"""
+import re
+import sqlite3
+from datetime import date, datetime, time as dtime
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -20000",       # ~20MB page cache
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",     # 256MB
+)
+
+_PLACEHOLDER_RE = re.compile(r'%s')
+_RETURNING_RE = re.compile(r'\bRETURNING\s+\w+\s*$', re.IGNORECASE)
+
+
+def _parse_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+
+def _parse_datetime(value):
+    text = value.decode()
+    if len(text) == 10:
+        return datetime.fromisoformat(text)
+    return datetime.fromisoformat(text.replace('T', ' ')[:26])
+
+
+def _parse_time(value):
+    return dtime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda dt: dt.isoformat(sep=' '))
+sqlite3.register_adapter(dtime, lambda t: t.isoformat())
+sqlite3.register_converter('DATE', _parse_date)
+sqlite3.register_converter('DATETIME', _parse_datetime)
+sqlite3.register_converter('TIMESTAMP', _parse_datetime)
+sqlite3.register_converter('TIME', _parse_time)
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self.lastrowid = None
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        sql = _PLACEHOLDER_RE.sub('?', operation)
+        self._cursor.execute(sql, tuple(params) if params is not None else ())
+        self.lastrowid = self._cursor.lastrowid
+        # Upserts end with RETURNING id so lastrowid is right on the UPDATE path too
+        if _RETURNING_RE.search(sql):
+            row = self._cursor.fetchone()
+            self._cursor.fetchall()
+            if row is not None:
+                self.lastrowid = row[0]
+        return None
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        sql = _PLACEHOLDER_RE.sub('?', operation)
+        self._cursor.executemany(sql, [tuple(p) for p in seq_params])
+        self.lastrowid = self._cursor.lastrowid
+        return None
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._convert(r) for r in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._convert(r) for r in self._cursor.fetchmany(size)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """mysql.connector-style connection over sqlite3."""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,   # the pool hands it to one thread at a time
+        )
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+
+    def cursor(self, dictionary=False, buffered=None, prepared=None):
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1").fetchall()
+
+    def is_connected(self):
+        try:
+            self.ping()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(path, **_ignored):
+    return SQLiteConnection(path)
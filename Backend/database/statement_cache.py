@@ -0,0 +1,135 @@
+"""
+Prepared-Statement Cache
+========================
+Hot model queries are prepared once per pooled connection and re-executed
+with new parameters, so MySQL skips parsing and planning them on every
+call. Opt in per cursor:
+
+    cursor = conn.cursor(dictionary=True, prepared=True)
+    cursor.execute("SELECT ... WHERE user_id = %s", (user_id,))
+
+Each connection keeps an LRU of up to DB_STATEMENT_CACHE_SIZE statements
+(0 disables it); the least recently used one is deallocated on the server
+when a new statement would exceed the limit. Keep
+pool size * cache size well under the server's max_prepared_stmt_count.
+
+Results are read eagerly, so a prepared cursor behaves like the buffered
+cursors the rest of the code uses. On SQLite the cursor flag is ignored;
+sqlite3 keeps its own per-connection statement cache (`cached_statements`).
+"""
+from collections import OrderedDict
+
+from mysql.connector import errors
+
+
+class StatementCache:
+    """LRU of server-side prepared statements for one connection."""
+
+    def __init__(self, conn, capacity):
+        self._conn = conn
+        self.capacity = capacity
+        self._entries = OrderedDict()   # (sql, dictionary) -> (prepared cursor, sql)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, sql, dictionary=False):
+        key = (sql, dictionary)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        cursor = self._conn.cursor(prepared=True, dictionary=dictionary, buffered=False)
+        # The connector only reuses its statement for the identical str object,
+        # so always execute with the one stored here
+        entry = (cursor, sql)
+        self._entries[key] = entry
+        while len(self._entries) > self.capacity:
+            _, (old, _) = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._close_quietly(old)
+        return entry
+
+    def evict(self, sql, dictionary=False):
+        entry = self._entries.pop((sql, dictionary), None)
+        if entry is not None:
+            self._close_quietly(entry[0])
+
+    def clear(self):
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for cursor, _ in entries:
+            self._close_quietly(cursor)
+
+    @staticmethod
+    def _close_quietly(cursor):
+        try:
+            cursor.close()   # sends COM_STMT_CLOSE
+        except Exception:
+            pass
+
+
+class PreparedCursor:
+    """Cursor facade that runs every statement through the connection's StatementCache."""
+
+    def __init__(self, cache, dictionary=False):
+        self._cache = cache
+        self._dictionary = dictionary
+        self._rows = []
+        self._pos = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        cursor, sql = self._cache.get(operation, self._dictionary)
+        try:
+            cursor.execute(sql, tuple(params) if isinstance(params, list) else params)
+            self._rows = cursor.fetchall() if cursor.with_rows else []
+        except errors.Error:
+            # Drop the statement; a failed prepare leaves the cursor unusable
+            self._cache.evict(operation, self._dictionary)
+            raise
+        self._pos = 0
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self.description = cursor.description
+        return None
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        rowcount = 0
+        for params in seq_params:
+            self.execute(operation, params)
+            rowcount += max(self.rowcount, 0)
+        self.rowcount = rowcount
+        return None
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        """The prepared statement stays cached on the connection."""
+        self._rows = []
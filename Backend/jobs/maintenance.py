@@ -0,0 +1,64 @@
+"""
+Maintenance Jobs
+================
+Housekeeping that keeps the hot tables small (see jobs.scheduler).
+"""
+from database import dose_instances, partitions, reminder_horizon
+from database.rollups import close_adherence_days
+from jobs.notifications import purge_finished_jobs
+from jobs.scheduler import periodic
+from models.reminder import sweep_missed_reminders
+from models.sync import purge_sync_receipts
+
+
+@periodic('partition_maintenance', hours=24)
+def partition_maintenance():
+    """Pre-create next months' dose_logs partitions and archive expired ones."""
+    partitions.maintain()
+
+
+@periodic('adherence_day_close', minutes=15)
+def adherence_day_close():
+    """Roll user_adherence_summary rows over once the day has changed."""
+    rolled = close_adherence_days()
+    if rolled:
+        print(f"📅 Rolled {rolled} adherence summaries over to today")
+
+
+@periodic('dose_instance_materialization', hours=24)
+def dose_instance_materialization():
+    """Generate the coming days' expected doses and purge expired ones."""
+    result = dose_instances.materialize()
+    print(f"🗓️  Dose instances: {result['rows']} generated, {result['purged']} purged")
+
+
+@periodic('reminder_materialization', hours=1)
+def reminder_materialization():
+    """Roll the REMINDER_HORIZON_HOURS window of reminders forward."""
+    result = reminder_horizon.materialize()
+    print(f"⏰ Reminders: {result['rows']} generated in {result['seconds']}s ({result['per_second']}/s)")
+
+
+@periodic('missed_reminder_sweep', minutes=10)
+def missed_reminder_sweep():
+    """Expire reminders left upcoming past REMINDER_MISS_GRACE_MINUTES to 'missed'."""
+    result = sweep_missed_reminders()
+    if result['missed'] or result['completed']:
+        print(f"⌛ Marked {result['missed']} reminders missed ({result['events']} behavior events), "
+              f"{result['completed']} completed by dose logs")
+
+
+@periodic('sync_receipt_cleanup', hours=24)
+def sync_receipt_cleanup():
+    """Forget /api/sync/batch receipts older than SYNC_RECEIPT_RETENTION_DAYS."""
+    deleted = purge_sync_receipts()
+    if deleted:
+        print(f"🧹 Purged {deleted} sync receipts")
+
+
+@periodic('notification_job_cleanup', hours=24)
+def notification_job_cleanup():
+    """Forget sent/failed SMS and call jobs older than NOTIFY_RETENTION_DAYS."""
+    deleted = purge_finished_jobs()
+    if deleted:
+        print(f"🧹 Purged {deleted} notification jobs")
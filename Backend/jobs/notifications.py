@@ -0,0 +1,345 @@
+"""
+Notification Job Queue
+======================
+Twilio SMS and voice calls go through a durable queue instead of being
+sent inside the HTTP request:
+
+- `enqueue_many()` inserts `notification_jobs` rows in the caller's
+  transaction and, once it commits, wakes this process' worker pool;
+  the route answers with the job ids straight away.
+- NOTIFY_WORKERS threads per process claim due jobs with a
+  compare-and-set UPDATE (on `attempts`), so any number of processes can
+  share the table, then store the Twilio SID or the error.
+- A failed send is retried up to NOTIFY_MAX_ATTEMPTS times, waiting
+  NOTIFY_RETRY_BASE_SECONDS doubled per attempt; after that the job is
+  'failed'.
+- Nothing lives only in memory: queued jobs are picked up whenever a pool
+  starts, and a job left 'running' by a process that died is claimed
+  again once its NOTIFY_LEASE_SECONDS lease runs out (so delivery is
+  at-least-once).
+
+Clients poll `GET /api/notifications?ids=...` for per-job status.
+
+A request that must report delivery (an emergency the patient is waiting
+on) calls `deliver_now()` instead: every SMS and call is sent at once from
+a bounded fan-out pool, and the request waits at most
+NOTIFY_DEADLINE_SECONDS. Sends still in flight then are reported
+'pending' and finish in the background; failures are left queued for
+the workers to retry. Its job rows are committed before the sends and
+their outcomes after, each on a connection of their own, so a request
+that later rolls back cannot lose a text that went out. All senders
+share one keep-alive Twilio client (utils.twilio_service).
+
+Usage:
+    python -m jobs.notifications           # run a worker pool in the foreground
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for
+from datetime import datetime, timedelta
+
+from config import Config
+from database.schema import get_connection, get_pool
+from database.session import after_commit
+
+POLL_SECONDS = 5          # idle workers look for due retries this often
+CLAIM_BATCH = 10          # due jobs read per claim attempt
+MAX_BACKOFF_SECONDS = 3600
+PERMANENT_ERRORS = ('Twilio not configured',)
+
+_pool = None
+_fanout = None
+_pool_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+def enqueue(user_id, kind, phone, body):
+    """Queue one 'sms' or 'call' for `phone`. Returns the job id."""
+    return enqueue_many(user_id, [(kind, phone, body)])[0]
+
+
+def enqueue_many(user_id, messages, leased=False):
+    """
+    Queue [(kind, phone, body)] on behalf of the user. Returns the job ids in
+    order. `leased` jobs start out 'running' on their first attempt, for a
+    caller that sends them itself (deliver_now); they are committed at once
+    on a connection of their own, so a send never happens without its row.
+    """
+    if not messages:
+        return []
+    conn = get_pool().acquire() if leased else get_connection()
+    cursor = conn.cursor()
+    now = _now()
+    status, attempts, run_after = ('running', 1, now + timedelta(seconds=Config.NOTIFY_LEASE_SECONDS)) \
+        if leased else ('queued', 0, now)
+    job_ids = []
+    for kind, phone, body in messages:
+        # One INSERT per job: lastrowid of a multi-row INSERT only gives the first id
+        cursor.execute(
+            """INSERT INTO notification_jobs (user_id, kind, phone, body, status, attempts, run_after)
+               VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+            (user_id, kind, phone, body, status, attempts, run_after)
+        )
+        job_ids.append(cursor.lastrowid)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    if not leased:
+        # Workers only see the rows once the request's transaction has committed
+        after_commit(wake)
+    return job_ids
+
+
+def deliver_now(user_id, messages, deadline=None):
+    """
+    Send [(kind, phone, body)] concurrently and wait up to `deadline` seconds
+    (NOTIFY_DEADLINE_SECONDS) in total. Returns one
+    {'job_id', 'status', 'sid', 'error'} per message, in order; status is
+    'sent', 'failed', 'queued' (will be retried) or 'pending' (still in
+    flight at the deadline, finishes in the background).
+    """
+    deadline = Config.NOTIFY_DEADLINE_SECONDS if deadline is None else deadline
+    job_ids = enqueue_many(user_id, messages, leased=True)
+    jobs = [{'id': job_id, 'kind': kind, 'phone': phone, 'body': body, 'attempts': 1}
+            for job_id, (kind, phone, body) in zip(job_ids, messages)]
+    futures = [_fanout_executor().submit(_send, job) for job in jobs]
+    wait_for(futures, timeout=deadline)
+
+    outcomes = []
+    for job, future in zip(jobs, futures):
+        if future.done():
+            result = future.result()
+            outcomes.append({'job_id': job['id'], 'status': _finish(job, result),
+                             'sid': result.get('sid'), 'error': result.get('error')})
+        else:
+            future.add_done_callback(lambda f, job=job: _finish_late(job, f))
+            outcomes.append({'job_id': job['id'], 'status': 'pending', 'sid': None,
+                             'error': f'No answer within {deadline:g}s'})
+    if any(o['status'] in ('queued', 'pending') for o in outcomes):
+        # Retries (and re-sends of lost pending ones) need a pool in some process
+        after_commit(start)
+    return outcomes
+
+
+def notify(user_id, messages, wait=False):
+    """
+    Queue [(kind, phone, body)], or with `wait` deliver them now within the
+    deadline. Returns deliver_now()-style outcomes either way.
+    """
+    if wait:
+        return deliver_now(user_id, messages)
+    return [{'job_id': job_id, 'status': 'queued', 'sid': None, 'error': None}
+            for job_id in enqueue_many(user_id, messages)]
+
+
+def get_jobs(user_id, job_ids):
+    """Status of the user's jobs among `job_ids`, in id order."""
+    if not job_ids:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        f"""SELECT id, kind, phone, status, attempts, sid, last_error, run_after, created_at, finished_at
+            FROM notification_jobs
+            WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(job_ids))})
+            ORDER BY id""",
+        (user_id, *job_ids)
+    )
+    jobs = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    for job in jobs:
+        # run_after is the next retry while queued, the lease expiry while running
+        job['next_attempt_at'] = str(job.pop('run_after')) if job['status'] == 'queued' else None
+        for key in ('created_at', 'finished_at'):
+            if job.get(key):
+                job[key] = str(job[key])
+    return jobs
+
+
+def purge_finished_jobs(days=None):
+    """Delete sent/failed jobs finished more than `days` (NOTIFY_RETENTION_DAYS) ago."""
+    days = Config.NOTIFY_RETENTION_DAYS if days is None else days
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM notification_jobs WHERE finished_at < %s",
+        (_now() - timedelta(days=days),)
+    )
+    conn.commit()
+    deleted = cursor.rowcount
+    cursor.close()
+    conn.close()
+    return deleted
+
+
+def _claim():
+    """Lease one due job (queued, or running with an expired lease). None when idle."""
+    now = _now()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """SELECT id, kind, phone, body, status, attempts FROM notification_jobs
+               WHERE status IN ('queued', 'running') AND run_after <= %s
+               ORDER BY run_after, id
+               LIMIT %s""",
+            (now, CLAIM_BATCH)
+        )
+        for job in cursor.fetchall():
+            cursor.execute(
+                """UPDATE notification_jobs
+                   SET status = 'running', attempts = attempts + 1, run_after = %s
+                   WHERE id = %s AND status = %s AND attempts = %s""",
+                (now + timedelta(seconds=Config.NOTIFY_LEASE_SECONDS), job['id'], job['status'], job['attempts'])
+            )
+            won = cursor.rowcount == 1
+            conn.commit()
+            if won:
+                job['attempts'] += 1
+                return job
+        conn.commit()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _finish(job, result):
+    """Store a send's outcome, unless another worker has re-leased the job meanwhile."""
+    now = _now()
+    error = result.get('error')
+    if result['success']:
+        status, run_after = 'sent', now
+    elif job['attempts'] >= Config.NOTIFY_MAX_ATTEMPTS or error in PERMANENT_ERRORS:
+        status, run_after = 'failed', now
+    else:
+        delay = min(Config.NOTIFY_RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1), MAX_BACKOFF_SECONDS)
+        status, run_after = 'queued', now + timedelta(seconds=delay)
+
+    # Own transaction, also inside a request: the send happened whatever the request does next
+    conn = get_pool().acquire()
+    cursor = conn.cursor()
+    cursor.execute(
+        """UPDATE notification_jobs
+           SET status = %s, run_after = %s, sid = %s, last_error = %s, finished_at = %s
+           WHERE id = %s AND status = 'running' AND attempts = %s""",
+        (status, run_after, result.get('sid'), error, now if status in ('sent', 'failed') else None,
+         job['id'], job['attempts'])
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return status
+
+
+def _finish_late(job, future):
+    """Record a send that outlived deliver_now's deadline."""
+    try:
+        _finish(job, future.result())
+    except Exception as e:
+        # The lease runs out and a worker sends it again
+        print(f"❌ Notification job {job['id']} could not be saved: {e}")
+
+
+def _send(job):
+    from utils.twilio_service import send_sms, make_call
+    sender = send_sms if job['kind'] == 'sms' else make_call
+    try:
+        return sender(job['phone'], job['body'])
+    except Exception as e:
+        return {'success': False, 'sid': None, 'error': str(e)}
+
+
+class WorkerPool:
+    """NOTIFY_WORKERS daemon threads draining notification_jobs."""
+
+    def __init__(self, size):
+        self.size = size
+        self._wake = threading.Event()
+        self._threads = []
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        for n in range(self.size):
+            thread = threading.Thread(target=self._run, name=f'notify-worker-{n}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                job = _claim()
+            except Exception as e:
+                # DB unavailable: back off and try again
+                print(f"⚠️  Notification worker could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                continue
+            try:
+                status = _finish(job, _send(job))
+            except Exception as e:
+                # The lease runs out and the job is claimed again
+                print(f"❌ Notification job {job['id']} could not be saved: {e}")
+                continue
+            if status == 'sent':
+                self.sent += 1
+            elif status == 'failed':
+                self.failed += 1
+                print(f"❌ Notification job {job['id']} ({job['kind']}) failed after {job['attempts']} attempt(s)")
+            else:
+                self.retried += 1
+
+    def stats(self):
+        return {'workers': self.size, 'sent': self.sent, 'failed': self.failed, 'retried': self.retried}
+
+
+def start():
+    """Start this process' worker pool once (no-op when NOTIFY_WORKERS is 0)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None and Config.NOTIFY_WORKERS > 0:
+            _pool = WorkerPool(Config.NOTIFY_WORKERS).start()
+            print(f"📨 Notification workers started ({Config.NOTIFY_WORKERS})")
+    return _pool
+
+
+def _fanout_executor():
+    """Bounded thread pool shared by every deliver_now() call in this process."""
+    global _fanout
+    with _pool_lock:
+        if _fanout is None:
+            _fanout = ThreadPoolExecutor(max_workers=max(1, Config.NOTIFY_FANOUT_THREADS),
+                                         thread_name_prefix='notify-fanout')
+    return _fanout
+
+
+def wake():
+    """Nudge the pool (starting it on first use) to pick up new jobs now."""
+    pool = start()
+    if pool is not None:
+        pool.wake()
+
+
+def pool_stats():
+    return _pool.stats() if _pool is not None else None
+
+
+if __name__ == '__main__':
+    import time
+    if start() is None:
+        print("⚠️  NOTIFY_WORKERS is 0, nothing to run")
+    else:
+        while True:
+            time.sleep(3600)
@@ -0,0 +1,147 @@
+"""
+Periodic Job Scheduler
+======================
+Runs maintenance jobs on a fixed interval from a daemon thread:
+
+    @periodic('partition_maintenance', hours=24)
+    def partition_maintenance():
+        ...
+
+`python app.py` starts it in the process that serves requests. Under a
+WSGI server (gunicorn etc.) nothing in the app starts it: run
+`python -m jobs.scheduler` as its own process, which also runs the
+notification workers (jobs.notifications). On MySQL a named advisory
+lock (GET_LOCK) makes sure only one process runs a given job at a time,
+the others skip that round; SQLite has no such lock, so run a single
+scheduler there.
+
+Usage:
+    python -m jobs.scheduler               # run the scheduler (and notification workers) in the foreground
+    python -m jobs.scheduler list          # registered jobs
+    python -m jobs.scheduler run <job>     # run one job now
+"""
+import importlib
+import sys
+import threading
+import time
+import traceback
+
+from database.dialects import get_dialect
+
+JOB_MODULES = ['jobs.maintenance']
+TICK_SECONDS = 5
+
+_jobs = {}
+_thread = None
+_thread_lock = threading.Lock()
+
+
+class Job:
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = 0.0          # due immediately after start
+        self.last_run = None
+        self.last_duration_ms = None
+        self.last_error = None
+        self.runs = 0
+
+
+def periodic(name, seconds=0, minutes=0, hours=0):
+    """Register a function to run every `interval`."""
+    interval = seconds + minutes * 60 + hours * 3600
+
+    def decorator(func):
+        _jobs[name] = Job(name, interval, func)
+        return func
+    return decorator
+
+
+def load_jobs():
+    for module in JOB_MODULES:
+        importlib.import_module(module)
+    return _jobs
+
+
+def run_job(name):
+    """Run one job now under its advisory lock. Returns False if another process holds it."""
+    from database.schema import get_pool
+    job = load_jobs()[name]
+    conn = get_pool().acquire()
+    try:
+        with get_dialect().advisory_lock(conn, f'meditrack_job_{name}', 0) as got:
+            if not got:
+                return False
+            started = time.monotonic()
+            try:
+                job.func()
+                job.last_error = None
+            except Exception as e:
+                job.last_error = str(e)
+                print(f"❌ Job {name} failed: {e}")
+                traceback.print_exc()
+            finally:
+                job.runs += 1
+                job.last_run = time.time()
+                job.last_duration_ms = int((time.monotonic() - started) * 1000)
+            return True
+    finally:
+        conn.close()
+
+
+def _loop():
+    while True:
+        now = time.monotonic()
+        for job in list(_jobs.values()):
+            if now >= job.next_run:
+                job.next_run = now + job.interval
+                try:
+                    run_job(job.name)
+                except Exception as e:
+                    # Lock connection unavailable (DB down): try again next interval
+                    print(f"⚠️  Job {job.name} skipped: {e}")
+        time.sleep(TICK_SECONDS)
+
+
+def start():
+    """Start the scheduler thread once per process."""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            load_jobs()
+            _thread = threading.Thread(target=_loop, name='job-scheduler', daemon=True)
+            _thread.start()
+            print(f"⏱️  Job scheduler started ({', '.join(_jobs)})")
+    return _thread
+
+
+def job_stats():
+    return [
+        {'name': j.name, 'interval': j.interval, 'runs': j.runs, 'last_run': j.last_run,
+         'last_duration_ms': j.last_duration_ms, 'last_error': j.last_error}
+        for j in _jobs.values()
+    ]
+
+
+def main(argv):
+    command = argv[0] if argv else 'serve'
+    if command == 'list':
+        for job in load_jobs().values():
+            print(f"{job.name:<30} every {job.interval}s")
+    elif command == 'run' and len(argv) > 1:
+        ran = run_job(argv[1])
+        print('✅ Done' if ran else '⏭️  Another process is running this job')
+    elif command == 'serve':
+        from jobs.notifications import start as start_notification_workers
+        start_notification_workers()
+        start().join()
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    # Job modules register with jobs.scheduler, not with this __main__ copy
+    from jobs import scheduler
+    scheduler.main(sys.argv[1:])
@@ -5,6 +5,8 @@ Predicts missed dose risk, identifies risk factors, trend analysis.
 import random
 from datetime import datetime, timedelta, date
 from database.schema import get_connection
+from database.session import request_cached
+from database.router import replica_read
 
 try:
     import numpy as np
@@ -14,18 +16,22 @@ except ImportError:
     ML_AVAILABLE = False
 
 
+@request_cached
+@replica_read
 def get_risk_score(user_id):
     """
     Calculate predictive risk score for next 24h missed dose probability.
     Returns risk percentage + risk factors.
     """
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
 
     # Get last 30 days of dose data
     start = date.today() - timedelta(days=30)
     cursor.execute("""
-        SELECT status, dose_date, scheduled_time
+        SELECT status, dose_date,
+               CASE WHEN scheduled_time < '12:00:00' THEN 'morning'
+                    WHEN scheduled_time >= '17:00:00' THEN 'evening' END AS part_of_day
         FROM dose_logs WHERE user_id = %s AND dose_date >= %s
         ORDER BY dose_date DESC
     """, (user_id, start))
@@ -83,10 +89,8 @@ def get_risk_score(user_id):
         risk_factors.append('Adherence trend is declining')
 
     # Time-of-day patterns
-    evening_missed = sum(1 for l in logs
-                         if l['status'] == 'missed' and l.get('scheduled_time', '12:00') >= '17:00')
-    morning_missed = sum(1 for l in logs
-                         if l['status'] == 'missed' and l.get('scheduled_time', '12:00') < '12:00')
+    evening_missed = sum(1 for l in logs if l['status'] == 'missed' and l['part_of_day'] == 'evening')
+    morning_missed = sum(1 for l in logs if l['status'] == 'missed' and l['part_of_day'] == 'morning')
     if evening_missed > morning_missed and evening_missed > 2:
         risk_factors.append('Evening doses are most frequently missed')
     elif morning_missed > 2:
@@ -111,17 +115,17 @@ def get_risk_score(user_id):
     }
 
 
+@request_cached
+@replica_read
 def get_monthly_breakdown(user_id):
     """Get daily adherence for past 30 days."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
     start = date.today() - timedelta(days=29)
 
     cursor.execute("""
-        SELECT dose_date,
-               COUNT(*) as total,
-               SUM(CASE WHEN status = 'taken' THEN 1 ELSE 0 END) as taken
-        FROM dose_logs
+        SELECT dose_date, SUM(total) as total, SUM(taken) as taken
+        FROM daily_adherence
         WHERE user_id = %s AND dose_date >= %s
         GROUP BY dose_date ORDER BY dose_date ASC
     """, (user_id, start))
@@ -134,7 +138,7 @@ def get_monthly_breakdown(user_id):
         d = row['dose_date']
         if isinstance(d, str):
             d = datetime.strptime(d, '%Y-%m-%d').date()
-        t = row['total'] or 1
+        t = int(row['total'] or 0) or 1
         tk = int(row['taken'] or 0)
         daily.append({
             'date': str(d),
@@ -3,25 +3,35 @@ Enhanced AI Insights Generator.
 Analyzes adherence patterns, time-of-day trends, and generates natural language recommendations.
 """
 from database.schema import get_connection
+from database.session import request_cached
+from database.router import replica_read
 from datetime import date, timedelta
 
 
+@request_cached
+@replica_read
 def generate_insight(user_id):
     """Generate personalized AI insight based on adherence patterns."""
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
 
-    # Get last 14 days of dose data
+    # Last 14 days of per-medicine daily counts
     start_date = date.today() - timedelta(days=14)
     cursor.execute("""
-        SELECT dl.status, dl.dose_date, dl.scheduled_time,
-               m.name as medicine_name
-        FROM dose_logs dl
-        JOIN medicines m ON dl.medicine_id = m.id
-        WHERE dl.user_id = %s AND dl.dose_date >= %s
-        ORDER BY dl.dose_date DESC
+        SELECT m.name as medicine_name,
+               SUM(da.total) as total, SUM(da.taken) as taken, SUM(da.missed) as missed,
+               SUM(da.morning_total) as morning_total, SUM(da.morning_taken) as morning_taken,
+               SUM(da.evening_total) as evening_total, SUM(da.evening_taken) as evening_taken
+        FROM daily_adherence da
+        JOIN medicines m ON da.medicine_id = m.id
+        WHERE da.user_id = %s AND da.dose_date >= %s
+        GROUP BY m.name
     """, (user_id, start_date))
-    logs = cursor.fetchall()
+    rows = cursor.fetchall()
+    for r in rows:
+        for key in r:
+            if key != 'medicine_name':
+                r[key] = int(r[key] or 0)  # MySQL SUM() returns Decimal
 
     # Get behavior data
     cursor.execute("""
@@ -35,7 +45,8 @@ def generate_insight(user_id):
     cursor.close()
     conn.close()
 
-    if not logs:
+    total = sum(r['total'] for r in rows)
+    if not total:
         return {
             'aiInsight': "Welcome to MediTrack AI! Start logging your doses to receive personalized insights and recommendations.",
             'tips': [
@@ -45,28 +56,20 @@ def generate_insight(user_id):
             ],
         }
 
-    total = len(logs)
-    taken = sum(1 for l in logs if l['status'] == 'taken')
-    missed = sum(1 for l in logs if l['status'] == 'missed')
+    taken = sum(r['taken'] for r in rows)
+    missed = sum(r['missed'] for r in rows)
     pct = round(taken / total * 100, 1) if total else 0
 
     # Time-of-day analysis
-    morning_logs = [l for l in logs if l.get('scheduled_time', '') < '12:00']
-    evening_logs = [l for l in logs if l.get('scheduled_time', '') >= '17:00']
-    morning_taken = sum(1 for l in morning_logs if l['status'] == 'taken')
-    evening_taken = sum(1 for l in evening_logs if l['status'] == 'taken')
-    morning_rate = round(morning_taken / max(len(morning_logs), 1) * 100)
-    evening_rate = round(evening_taken / max(len(evening_logs), 1) * 100)
+    morning_total = sum(r['morning_total'] for r in rows)
+    evening_total = sum(r['evening_total'] for r in rows)
+    morning_taken = sum(r['morning_taken'] for r in rows)
+    evening_taken = sum(r['evening_taken'] for r in rows)
+    morning_rate = round(morning_taken / max(morning_total, 1) * 100)
+    evening_rate = round(evening_taken / max(evening_total, 1) * 100)
 
     # Medicine-specific analysis
-    med_stats = {}
-    for l in logs:
-        mn = l.get('medicine_name', 'Unknown')
-        if mn not in med_stats:
-            med_stats[mn] = {'taken': 0, 'total': 0}
-        med_stats[mn]['total'] += 1
-        if l['status'] == 'taken':
-            med_stats[mn]['taken'] += 1
+    med_stats = {r['medicine_name'] or 'Unknown': {'taken': r['taken'], 'total': r['total']} for r in rows}
 
     worst_med = None
     worst_rate = 100
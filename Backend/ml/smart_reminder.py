@@ -4,47 +4,76 @@ Adaptive scheduling based on user behavior patterns.
 Escalation alerts and emergency triggers.
 """
 from database.schema import get_connection
-from models.alert import create_alert
+from database.dialects import get_dialect
+from database.session import request_cached
+from models.alert import create_alert, broadcast_alert
+from utils.cache import cached, invalidate
 from datetime import datetime, timedelta
 
 
 def track_behavior(user_id, medicine_id, event_type, delay_mins=0):
     """Track reminder behavior (miss, snooze, late take)."""
+    track_behaviors([(user_id, medicine_id, event_type, delay_mins)])
+
+
+def track_behaviors(events):
+    """
+    Track many reminder events [(user_id, medicine_id, event_type, delay_mins)]
+    with one multi-row upsert, then raise the escalation alerts any
+    (user, medicine) crossed.
+    """
+    totals = {}
+    for user_id, medicine_id, event_type, delay_mins in events:
+        t = totals.setdefault((user_id, medicine_id), {'miss': 0, 'snooze': 0, 'events': 0, 'delay': 0})
+        t['miss'] += event_type == 'miss'
+        t['snooze'] += event_type == 'snooze'
+        t['events'] += 1
+        t['delay'] += delay_mins or 0
+    if not totals:
+        return
+
     conn = get_connection()
     cursor = conn.cursor()
-
-    # Upsert behavior record
-    cursor.execute("""
+    dialect = get_dialect()
+    user_ids = sorted({u for u, _ in totals})
+    medicine_ids = sorted({m for _, m in totals})
+
+    cursor.execute(f"""
+        SELECT user_id, medicine_id, miss_count FROM reminder_behavior
+        WHERE user_id IN ({', '.join(['%s'] * len(user_ids))})
+          AND medicine_id IN ({', '.join(['%s'] * len(medicine_ids))})
+    """, (*user_ids, *medicine_ids))
+    before = {(u, m): misses or 0 for u, m, misses in cursor.fetchall()}
+
+    # Upsert behavior records; total_events is assigned last because MySQL
+    # applies the assignments in order and avg_delay_mins needs the old count
+    new = dialect.inserted
+    upsert = dialect.upsert(('user_id', 'medicine_id'), [
+        f"miss_count = miss_count + {new('miss_count')}",
+        f"snooze_count = snooze_count + {new('snooze_count')}",
+        f"avg_delay_mins = (avg_delay_mins * total_events + {new('avg_delay_mins')} * {new('total_events')})"
+        f" / (total_events + {new('total_events')})",
+        f"total_events = total_events + {new('total_events')}",
+        "last_updated = CURRENT_TIMESTAMP",
+    ])
+    cursor.executemany(f"""
         INSERT INTO reminder_behavior (user_id, medicine_id, miss_count, snooze_count, avg_delay_mins, total_events)
-        VALUES (%s, %s, %s, %s, %s, 1)
-        ON DUPLICATE KEY UPDATE
-            miss_count = miss_count + IF(%s = 'miss', 1, 0),
-            snooze_count = snooze_count + IF(%s = 'snooze', 1, 0),
-            avg_delay_mins = (avg_delay_mins * total_events + %s) / (total_events + 1),
-            total_events = total_events + 1,
-            last_updated = CURRENT_TIMESTAMP
-    """, (
-        user_id, medicine_id,
-        1 if event_type == 'miss' else 0,
-        1 if event_type == 'snooze' else 0,
-        delay_mins,
-        event_type, event_type, delay_mins,
-    ))
+        VALUES (%s, %s, %s, %s, %s, %s)
+        {upsert}
+    """, [
+        (u, m, t['miss'], t['snooze'], t['delay'] / t['events'], t['events'])
+        for (u, m), t in totals.items()
+    ])
     conn.commit()
+    for user_id in user_ids:
+        invalidate(user_id, 'behavior')
 
-    # Check for escalation
-    cursor.execute("""
-        SELECT miss_count, snooze_count FROM reminder_behavior
-        WHERE user_id = %s AND medicine_id = %s
-    """, (user_id, medicine_id))
-    row = cursor.fetchone()
-
-    if row:
-        miss_count = row[0] or 0
-        snooze_count = row[1] or 0
+    for (user_id, medicine_id), t in totals.items():
+        old_count = before.get((user_id, medicine_id), 0)
+        miss_count = old_count + t['miss']
 
-        # Escalation: 3+ consecutive misses
-        if miss_count >= 3 and miss_count % 3 == 0:
+        # Escalation: every 3rd miss
+        if miss_count // 3 > old_count // 3:
             create_alert(
                 user_id=user_id,
                 alert_type='error',
@@ -53,26 +82,28 @@ def track_behavior(user_id, medicine_id, event_type, delay_mins=0):
                 caretaker_id=None,
             )
 
-        # Emergency: 5+ consecutive misses
-        if miss_count >= 5 and miss_count % 5 == 0:
+        # Emergency: every 5th miss
+        if miss_count // 5 > old_count // 5:
             # Notify caretakers
             cursor.execute("""
                 SELECT caretaker_id FROM caretaker_patients WHERE patient_id = %s
             """, (user_id,))
             caretakers = cursor.fetchall()
-            for (ct_id,) in caretakers:
-                create_alert(
+            if caretakers:
+                broadcast_alert(
                     user_id=user_id,
                     alert_type='error',
                     title='Emergency: Non-Compliance Alert',
                     description=f'Patient has missed {miss_count} doses of medication. Immediate attention needed.',
-                    caretaker_id=ct_id,
+                    caretaker_ids=[ct_id for (ct_id,) in caretakers],
                 )
 
     cursor.close()
     conn.close()
 
 
+@request_cached
+@cached(tags=('behavior', 'medicine'))
 def get_adaptive_schedule(user_id):
     """Generate adaptive schedule suggestions based on behavior."""
     conn = get_connection()
@@ -80,7 +111,7 @@ def get_adaptive_schedule(user_id):
 
     cursor.execute("""
         SELECT rb.*, m.name as medicine_name, m.frequency,
-               GROUP_CONCAT(ms.time) as schedule_times
+               GROUP_CONCAT(SUBSTR(ms.time, 1, 5)) as schedule_times
         FROM reminder_behavior rb
         JOIN medicines m ON rb.medicine_id = m.id
         LEFT JOIN medicine_schedules ms ON m.id = ms.medicine_id
@@ -1,52 +1,123 @@
 from database.schema import get_connection
-from utils.helpers import format_time_ago
+from database.dialects import get_dialect
+from database.session import request_cached
+from utils.helpers import format_time_ago, encode_cursor, decode_cursor
 
 
 def create_alert(user_id, alert_type, title, description, caretaker_id=None):
-    """Create a new alert."""
+    """Create a new alert for the user (and their caretaker, if given)."""
+    return broadcast_alert(user_id, alert_type, title, description,
+                           [caretaker_id] if caretaker_id else [])
+
+
+def broadcast_alert(user_id, alert_type, title, description, caretaker_ids):
+    """
+    Create one alert about `user_id` and deliver it to them and to every
+    caretaker in `caretaker_ids`: one row in alerts, one multi-row insert
+    into the recipients' inboxes and one update of their unread counters.
+    """
+    recipients = sorted({user_id, *caretaker_ids})
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
         """INSERT INTO alerts (user_id, caretaker_id, type, title, description)
            VALUES (%s, %s, %s, %s, %s)""",
-        (user_id, caretaker_id, alert_type, title, description)
+        (user_id, caretaker_ids[0] if len(caretaker_ids) == 1 else None, alert_type, title, description)
     )
-    conn.commit()
     alert_id = cursor.lastrowid
+    cursor.execute(
+        f"INSERT INTO alert_deliveries (recipient_id, alert_id) VALUES {', '.join(['(%s, %s)'] * len(recipients))}",
+        [value for recipient in recipients for value in (recipient, alert_id)]
+    )
+    cursor.execute(
+        f"UPDATE users SET unread_alerts = unread_alerts + 1 WHERE id IN ({', '.join(['%s'] * len(recipients))})",
+        recipients
+    )
+    conn.commit()
     cursor.close()
     conn.close()
     return alert_id
 
 
 def get_alerts_for_user(user_id, limit=20):
-    """Get alerts for a user or their caretaker."""
+    """Get alerts for a user or their caretaker (newest first)."""
+    return get_alerts_page(user_id, limit)[0]
+
+
+@request_cached
+def get_alerts_page(user_id, limit=20, after=None):
+    """
+    One page of the user's alert inbox, newest first, starting after the
+    page cursor `after`: a range read on the alert_deliveries primary key.
+    Returns (alerts, next_cursor); next_cursor is None on the last page.
+    """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
+
+    keyset, params = '', []
+    if after:
+        (alert_id,) = decode_cursor(after, 1)
+        keyset, params = "AND d.alert_id < %s", [alert_id]
     cursor.execute(
-        """SELECT * FROM alerts
-           WHERE user_id = %s OR caretaker_id = %s
-           ORDER BY created_at DESC
-           LIMIT %s""",
-        (user_id, user_id, limit)
+        f"""SELECT a.id, a.user_id, a.caretaker_id, a.type, a.title, a.description,
+                   d.is_read, a.created_at
+            FROM alert_deliveries d
+            JOIN alerts a ON a.id = d.alert_id
+            WHERE d.recipient_id = %s {keyset}
+            ORDER BY d.alert_id DESC
+            LIMIT %s""",
+        (user_id, *params, limit + 1)
     )
     alerts = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    next_cursor = None
+    if len(alerts) > limit:
+        alerts = alerts[:limit]
+        next_cursor = encode_cursor(alerts[-1]['id'])
     for a in alerts:
+        a['is_read'] = bool(a['is_read'])
         if a.get('created_at'):
             a['time_ago'] = format_time_ago(a['created_at'])
             a['created_at'] = str(a['created_at'])
+    return alerts, next_cursor
+
+
+def get_unread_count(user_id):
+    """Unread alerts in the user's inbox (one primary-key read)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT unread_alerts FROM users WHERE id = %s", (user_id,))
+    row = cursor.fetchone()
     cursor.close()
     conn.close()
-    return alerts
+    return row[0] if row else 0
 
 
 def mark_alert_read(alert_id, user_id):
-    """Mark an alert as read."""
+    """Mark an alert in the user's inbox as read."""
+    _mark_read(user_id, "AND alert_id = %s", [alert_id])
+
+
+def mark_all_alerts_read(user_id):
+    """Mark every alert in the user's inbox as read."""
+    _mark_read(user_id)
+
+
+def _mark_read(user_id, condition='', params=()):
+    """Flip unread deliveries to read and take exactly that many off the counter."""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "UPDATE alerts SET is_read = TRUE WHERE id = %s AND (user_id = %s OR caretaker_id = %s)",
-        (alert_id, user_id, user_id)
+        f"UPDATE alert_deliveries SET is_read = TRUE WHERE recipient_id = %s {condition} AND is_read = FALSE",
+        (user_id, *params)
     )
+    if cursor.rowcount:
+        cursor.execute(
+            f"UPDATE users SET unread_alerts = {get_dialect().greatest('0', 'unread_alerts - %s')} WHERE id = %s",
+            (cursor.rowcount, user_id)
+        )
     conn.commit()
     cursor.close()
     conn.close()
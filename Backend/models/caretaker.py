@@ -1,4 +1,7 @@
 from database.schema import get_connection
+from database.session import request_cached
+from database.router import replica_read
+from database.change_feed import bump_seq
 from utils.helpers import format_time_ago
 
 
@@ -12,8 +15,9 @@ def link_caretaker_patient(caretaker_id, patient_id, relationship='family'):
                VALUES (%s, %s, %s)""",
             (caretaker_id, patient_id, relationship)
         )
-        conn.commit()
         link_id = cursor.lastrowid
+        bump_seq(cursor, caretaker_id)
+        conn.commit()
     except Exception:
         conn.rollback()
         link_id = None
@@ -23,6 +27,8 @@ def link_caretaker_patient(caretaker_id, patient_id, relationship='family'):
     return link_id
 
 
+@request_cached
+@replica_read
 def get_patients_for_caretaker(caretaker_id):
     """Get all patients linked to a caretaker."""
     conn = get_connection()
@@ -43,26 +49,21 @@ def get_patients_for_caretaker(caretaker_id):
     return patients
 
 
+@request_cached
+@replica_read
 def get_patient_detail(caretaker_id, patient_id):
     """Get detailed patient info for a caretaker."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
 
-    # Verify relationship
+    # Patient info, only if linked to this caretaker
     cursor.execute(
-        "SELECT * FROM caretaker_patients WHERE caretaker_id = %s AND patient_id = %s",
+        """SELECT u.id, u.name, u.email, u.avatar_url
+           FROM caretaker_patients cp
+           JOIN users u ON u.id = cp.patient_id
+           WHERE cp.caretaker_id = %s AND cp.patient_id = %s""",
         (caretaker_id, patient_id)
     )
-    if not cursor.fetchone():
-        cursor.close()
-        conn.close()
-        return None
-
-    # Get patient info
-    cursor.execute(
-        "SELECT id, name, email, avatar_url FROM users WHERE id = %s",
-        (patient_id,)
-    )
     patient = cursor.fetchone()
 
     cursor.close()
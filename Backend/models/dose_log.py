@@ -1,83 +1,235 @@
 from database.schema import get_connection
+from database.dialects import get_dialect
+from database.session import request_cached
+from database.router import replica_read
+from database.rollups import refresh_daily_adherence, refresh_daily_adherence_days, refresh_adherence_summary
+from database.dose_instances import record_dose, record_doses
+from database.reminder_horizon import close_reminders
+from database.change_feed import record_changes
+from utils.helpers import to_time, encode_cursor, decode_cursor
+from utils.cache import cached
+import json
 from datetime import datetime, date, timedelta
 
 
 def log_dose(user_id, medicine_id, scheduled_time, status='taken', dose_date=None):
-    """Log a dose as taken or missed."""
+    """Log a dose as taken or missed. `scheduled_time` may be 'HH:MM' or 'h:MM AM/PM'."""
+    t = to_time(scheduled_time)
+    if t is None:
+        raise ValueError(f'Invalid scheduled time: {scheduled_time!r}')
     conn = get_connection()
     cursor = conn.cursor()
+    dialect = get_dialect()
     d = dose_date or date.today()
     taken_at = datetime.utcnow() if status == 'taken' else None
 
-    # Upsert: update if exists for same date+medicine+time, else insert
+    # Upsert on the unique dose key (user, medicine, date, time);
+    # lastrowid is the existing row's id when it updates.
+    upsert = dialect.upsert(
+        ('user_id', 'medicine_id', 'dose_date', 'scheduled_time'),
+        [f"status = {dialect.inserted('status')}", f"taken_at = {dialect.inserted('taken_at')}"],
+        returning_id=True,
+    )
     cursor.execute(
-        """INSERT INTO dose_logs (user_id, medicine_id, scheduled_time, taken_at, status, dose_date)
+        f"""INSERT INTO dose_logs (user_id, medicine_id, scheduled_time, taken_at, status, dose_date)
            VALUES (%s, %s, %s, %s, %s, %s)
-           ON DUPLICATE KEY UPDATE status = VALUES(status), taken_at = VALUES(taken_at)""",
-        (user_id, medicine_id, scheduled_time, taken_at, status, d)
+           {upsert}""",
+        (user_id, medicine_id, t, taken_at, status, d)
     )
-    conn.commit()
     log_id = cursor.lastrowid
+    record_dose(cursor, user_id, medicine_id, d, t, status, taken_at, log_id)
+    close_reminders(cursor, user_id, [(medicine_id, d, t, status)])
+    record_changes(cursor, user_id, 'dose_log', [log_id])
+    refresh_daily_adherence(cursor, user_id, medicine_id, d)
+    refresh_adherence_summary(cursor, user_id, dose_date=d)
+    conn.commit()
     cursor.close()
     conn.close()
     return log_id
 
 
+def log_doses(user_id, doses):
+    """
+    Log many doses in one transaction with multi-row upserts.
+    doses: [(medicine_id, scheduled_time as datetime.time, status, dose_date, taken_at)];
+    taken_at None means now for taken doses. Returns the dose log ids in order.
+    """
+    if not doses:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor()
+    dialect = get_dialect()
+    now = datetime.utcnow()
+    rows = [
+        (user_id, medicine_id, t, (taken_at or now) if status == 'taken' else None, status, d)
+        for medicine_id, t, status, d, taken_at in doses
+    ]
+
+    # Same upsert as log_dose; ids are read back below since a
+    # multi-row INSERT only reports one
+    upsert = dialect.upsert(
+        ('user_id', 'medicine_id', 'dose_date', 'scheduled_time'),
+        [f"status = {dialect.inserted('status')}", f"taken_at = {dialect.inserted('taken_at')}"],
+    )
+    cursor.executemany(
+        f"""INSERT INTO dose_logs (user_id, medicine_id, scheduled_time, taken_at, status, dose_date)
+           VALUES (%s, %s, %s, %s, %s, %s)
+           {upsert}""",
+        rows
+    )
+
+    dates = sorted({r[5] for r in rows})
+    medicine_ids = sorted({r[1] for r in rows})
+    cursor.execute(
+        f"""SELECT id, medicine_id, dose_date, scheduled_time FROM dose_logs
+            WHERE user_id = %s
+              AND dose_date IN ({', '.join(['%s'] * len(dates))})
+              AND medicine_id IN ({', '.join(['%s'] * len(medicine_ids))})""",
+        (user_id, *dates, *medicine_ids)
+    )
+    ids = {(m, d, to_time(t)): log_id for log_id, m, d, t in cursor.fetchall()}
+    log_ids = [ids.get((r[1], r[5], r[2])) for r in rows]
+
+    record_doses(cursor, [
+        (user_id, medicine_id, d, t, status, taken_at, log_id)
+        for (_, medicine_id, t, taken_at, status, d), log_id in zip(rows, log_ids)
+    ])
+    close_reminders(cursor, user_id, [(r[1], r[5], r[2], r[4]) for r in rows])
+    record_changes(cursor, user_id, 'dose_log', log_ids)
+    refresh_daily_adherence_days(cursor, user_id, dates)
+    refresh_adherence_summary(cursor, user_id, dose_date=dates[0])
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return log_ids
+
+
+@request_cached
+@replica_read
 def get_today_doses(user_id):
-    """Get all dose logs for today."""
+    """Get today's expected doses (pending, taken or missed) in schedule order."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
+    start = datetime.combine(date.today(), datetime.min.time())
     cursor.execute(
-        """SELECT dl.*, m.name as medicine_name, m.dosage, m.instruction, m.icon, m.type
-           FROM dose_logs dl
-           JOIN medicines m ON dl.medicine_id = m.id
-           WHERE dl.user_id = %s AND dl.dose_date = CURDATE()
-           ORDER BY dl.scheduled_time ASC""",
-        (user_id,)
+        """SELECT di.dose_log_id AS id, di.id AS instance_id, di.user_id, di.medicine_id,
+                  SUBSTR(di.scheduled_time, 1, 5) AS scheduled_time, di.due_at, di.status, di.taken_at, di.dose_date,
+                  m.name as medicine_name, m.dosage, m.instruction, m.icon, m.type
+           FROM dose_instances di
+           JOIN medicines m ON di.medicine_id = m.id
+           WHERE di.user_id = %s AND di.due_at >= %s AND di.due_at < %s
+           ORDER BY di.due_at ASC""",
+        (user_id, start, start + timedelta(days=1))
     )
     doses = cursor.fetchall()
     for d in doses:
-        if d.get('taken_at'):
-            d['taken_at'] = str(d['taken_at'])
-        if d.get('dose_date'):
-            d['dose_date'] = str(d['dose_date'])
-        if d.get('created_at'):
-            d['created_at'] = str(d['created_at'])
+        for key in ('taken_at', 'due_at', 'dose_date'):
+            if d.get(key):
+                d[key] = str(d[key])
     cursor.close()
     conn.close()
     return doses
 
 
+@request_cached
+@replica_read
+def get_dose_history(user_id, limit=50, after=None, medicine_id=None):
+    """
+    One page of the user's dose logs, newest first, starting after the page
+    cursor `after`; optionally for one medicine. Returns (doses, next_cursor).
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    # (user_id[, medicine_id], dose_date, scheduled_time) are index prefixes,
+    # so every page is a range read past the previous page's last row
+    where, params = ["dl.user_id = %s"], [user_id]
+    if medicine_id is not None:
+        where.append("dl.medicine_id = %s")
+        params.append(medicine_id)
+    if after:
+        d, t, log_id = decode_cursor(after, 3)
+        where.append("""(dl.dose_date < %s OR (dl.dose_date = %s AND (dl.scheduled_time < %s
+                         OR (dl.scheduled_time = %s AND dl.id < %s))))""")
+        params += [d, d, t, t, log_id]
+    cursor.execute(
+        f"""SELECT dl.id, dl.medicine_id, m.name AS medicine_name, m.dosage,
+                   dl.dose_date, SUBSTR(dl.scheduled_time, 1, 5) AS scheduled_time,
+                   dl.scheduled_time AS sort_time, dl.status, dl.taken_at
+            FROM dose_logs dl
+            JOIN medicines m ON dl.medicine_id = m.id
+            WHERE {' AND '.join(where)}
+            ORDER BY dl.dose_date DESC, dl.scheduled_time DESC, dl.id DESC
+            LIMIT %s""",
+        (*params, limit + 1)
+    )
+    doses = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    next_cursor = None
+    if len(doses) > limit:
+        doses = doses[:limit]
+        last = doses[-1]
+        next_cursor = encode_cursor(last['dose_date'], to_time(last['sort_time']).isoformat(), last['id'])
+    for d in doses:
+        del d['sort_time']
+        for key in ('dose_date', 'taken_at'):
+            if d.get(key):
+                d[key] = str(d[key])
+    return doses, next_cursor
+
+
+def get_dose_logs_by_ids(user_id, log_ids):
+    """The user's dose logs among `log_ids` (for the change feed)."""
+    if not log_ids:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        f"""SELECT id, medicine_id, SUBSTR(scheduled_time, 1, 5) AS scheduled_time,
+                   taken_at, status, dose_date, created_at
+            FROM dose_logs
+            WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(log_ids))})""",
+        (user_id, *log_ids)
+    )
+    logs = cursor.fetchall()
+    for log in logs:
+        for key in ('taken_at', 'dose_date', 'created_at'):
+            if log.get(key):
+                log[key] = str(log[key])
+    cursor.close()
+    conn.close()
+    return logs
+
+
+@request_cached
+@cached(tags=('dose_log', 'medicine'))
+@replica_read
 def get_adherence_stats(user_id, days=7):
     """Calculate adherence statistics for the given number of days."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
     start_date = date.today() - timedelta(days=days - 1)
 
     # Total and taken counts
     cursor.execute(
-        """SELECT
-             COUNT(*) as total,
-             SUM(CASE WHEN status = 'taken' THEN 1 ELSE 0 END) as taken,
-             SUM(CASE WHEN status = 'missed' THEN 1 ELSE 0 END) as missed
-           FROM dose_logs
+        """SELECT SUM(total) as total, SUM(taken) as taken, SUM(missed) as missed
+           FROM daily_adherence
            WHERE user_id = %s AND dose_date >= %s""",
         (user_id, start_date)
     )
     stats = cursor.fetchone()
 
-    total = stats['total'] or 0
+    total = int(stats['total'] or 0)
     taken = int(stats['taken'] or 0)
     missed = int(stats['missed'] or 0)
     percentage = round((taken / total * 100) if total > 0 else 0, 1)
 
     # Daily breakdown for chart
     cursor.execute(
-        """SELECT
-             dose_date,
-             COUNT(*) as total,
-             SUM(CASE WHEN status = 'taken' THEN 1 ELSE 0 END) as taken
-           FROM dose_logs
+        """SELECT dose_date, SUM(total) as total, SUM(taken) as taken
+           FROM daily_adherence
            WHERE user_id = %s AND dose_date >= %s
            GROUP BY dose_date
            ORDER BY dose_date ASC""",
@@ -92,7 +244,7 @@ def get_adherence_stats(user_id, days=7):
         if isinstance(d, str):
             d = datetime.strptime(d, '%Y-%m-%d').date()
         day_name = day_names[d.weekday()]
-        day_total = row['total'] or 1
+        day_total = int(row['total'] or 0) or 1
         day_taken = int(row['taken'] or 0)
         day_pct = round(day_taken / day_total * 100)
         weekly_adherence.append({'day': day_name, 'value': day_pct})
@@ -110,47 +262,26 @@ def get_adherence_stats(user_id, days=7):
 
 
 def get_streak(user_id):
-    """Calculate the current adherence streak (consecutive days with all doses taken)."""
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute(
-        """SELECT dose_date,
-                  COUNT(*) as total,
-                  SUM(CASE WHEN status = 'taken' THEN 1 ELSE 0 END) as taken
-           FROM dose_logs
-           WHERE user_id = %s
-           GROUP BY dose_date
-           ORDER BY dose_date DESC
-           LIMIT 60""",
-        (user_id,)
-    )
-    days = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    streak = 0
-    for day in days:
-        if int(day['taken'] or 0) == int(day['total'] or 0) and day['total'] > 0:
-            streak += 1
-        else:
-            break
-
-    return streak
+    """Current adherence streak (consecutive days with all doses taken), from the summary row."""
+    return get_adherence_summary(user_id)['streak']
 
 
+@request_cached
+@cached(tags=('dose_log', 'medicine'))
+@replica_read
 def get_medication_breakdown(user_id, days=7):
     """Get adherence percentage per medicine."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
     start_date = date.today() - timedelta(days=days - 1)
 
     cursor.execute(
         """SELECT m.name, m.color,
-                  COUNT(dl.id) as total,
-                  SUM(CASE WHEN dl.status = 'taken' THEN 1 ELSE 0 END) as taken
+                  SUM(da.total) as total,
+                  SUM(da.taken) as taken
            FROM medicines m
-           LEFT JOIN dose_logs dl ON m.id = dl.medicine_id AND dl.dose_date >= %s
+           LEFT JOIN daily_adherence da
+                  ON da.user_id = m.user_id AND da.medicine_id = m.id AND da.dose_date >= %s
            WHERE m.user_id = %s AND m.is_active = TRUE
            GROUP BY m.id, m.name, m.color""",
         (start_date, user_id)
@@ -159,7 +290,7 @@ def get_medication_breakdown(user_id, days=7):
 
     result = []
     for med in breakdown:
-        total = med['total'] or 0
+        total = int(med['total'] or 0)
         taken = int(med['taken'] or 0)
         pct = round(taken / total * 100) if total > 0 else 0
         result.append({
@@ -171,3 +302,49 @@ def get_medication_breakdown(user_id, days=7):
     cursor.close()
     conn.close()
     return result
+
+
+@replica_read
+def _read_adherence_summary(user_id):
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True, prepared=True)
+    cursor.execute("SELECT * FROM user_adherence_summary WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row
+
+
+@request_cached
+def get_adherence_summary(user_id):
+    """Streaks, 7/30-day adherence and today's doses from the user's summary row."""
+    row = _read_adherence_summary(user_id)
+    if row is None or row['summary_date'] != date.today():
+        # First visit or a new day: roll the row forward on the primary
+        conn = get_connection()
+        cursor = conn.cursor()
+        row = refresh_adherence_summary(cursor, user_id)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def pct(taken, total):
+        return round((taken / total * 100) if total > 0 else 0, 1)
+
+    return {
+        'streak': row['current_streak'],
+        'longestStreak': row['longest_streak'],
+        'adherence7d': pct(row['taken_7d'], row['total_7d']),
+        'adherence30d': pct(row['taken_30d'], row['total_30d']),
+        'taken7d': row['taken_7d'],
+        'missed7d': row['missed_7d'],
+        'total7d': row['total_7d'],
+        'taken30d': row['taken_30d'],
+        'missed30d': row['missed_30d'],
+        'total30d': row['total_30d'],
+        'dosesToday': row['doses_today'],
+        'takenToday': row['taken_today'],
+        'dosesLeft': max(0, row['doses_today'] - row['taken_today']),
+        'schedule': json.loads(row['today_schedule'] or '[]'),
+    }
+
@@ -3,69 +3,38 @@ Emergency Auto Alert System - Hackathon Killer Feature
 Tracks missed critical doses and auto-notifies caretakers via SMS/push.
 """
 from database.schema import get_connection
-from models.alert import create_alert
-from datetime import datetime, timedelta
+from database.session import request_cached
+from models.alert import create_alert, broadcast_alert
+from jobs.notifications import notify
+from datetime import datetime
 
 
+@request_cached
 def check_missed_doses(user_id):
-    """Check for unresponded/missed critical doses in the last 2 hours."""
+    """Doses due earlier today that have not been taken (index range read on dose_instances)."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    two_hours_ago = datetime.now() - timedelta(hours=2)
-
-    # Count missed doses today (scheduled times that passed without a dose log)
-    cursor.execute("""
-        SELECT m.id, m.name, m.dosage, m.frequency, m.instruction, ms.time
-        FROM medicines m
-        JOIN medicine_schedules ms ON m.id = ms.medicine_id
-        WHERE m.user_id = %s AND m.is_active = 1
-        AND ms.time < TIME(NOW())
-        AND NOT EXISTS (
-            SELECT 1 FROM dose_logs dl
-            WHERE dl.medicine_id = m.id
-            AND dl.scheduled_time = ms.time
-            AND DATE(dl.taken_at) = CURDATE()
-        )
-    """, (user_id,))
+    cursor = conn.cursor(dictionary=True, prepared=True)
+    now = datetime.now()
+
+    cursor.execute(
+        """SELECT m.id, m.name, m.dosage, m.frequency, m.instruction, SUBSTR(di.scheduled_time, 1, 5) AS time
+           FROM dose_instances di
+           JOIN medicines m ON di.medicine_id = m.id
+           WHERE di.user_id = %s AND di.due_at >= %s AND di.due_at < %s
+           AND di.status <> 'taken' AND m.is_active = 1
+           ORDER BY di.due_at""",
+        (user_id, datetime.combine(now.date(), datetime.min.time()), now)
+    )
     missed = cursor.fetchall()
 
-    # Serialize time objects
-    for m in missed:
-        if m.get('time'):
-            m['time'] = str(m['time'])
-
     cursor.close()
     conn.close()
     return missed
 
 
 def get_consecutive_misses(user_id):
-    """Get count of consecutive missed doses (no dose logs in recent schedule windows)."""
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Count missed doses today
-    cursor.execute("""
-        SELECT COUNT(*) as miss_count FROM (
-            SELECT m.id, ms.time
-            FROM medicines m
-            JOIN medicine_schedules ms ON m.id = ms.medicine_id
-            WHERE m.user_id = %s AND m.is_active = 1
-            AND ms.time < TIME(NOW())
-            AND NOT EXISTS (
-                SELECT 1 FROM dose_logs dl
-                WHERE dl.medicine_id = m.id
-                AND dl.scheduled_time = ms.time
-                AND DATE(dl.taken_at) = CURDATE()
-            )
-        ) AS missed
-    """, (user_id,))
-    result = cursor.fetchone()
-
-    cursor.close()
-    conn.close()
-    return result['miss_count'] if result else 0
+    """Count of doses missed so far today (shares check_missed_doses' cached read)."""
+    return len(check_missed_doses(user_id))
 
 
 def is_critical_medicine(medicine_name, instruction):
@@ -83,10 +52,17 @@ def is_critical_medicine(medicine_name, instruction):
     return any(kw in name_lower or kw in instr_lower for kw in critical_keywords)
 
 
-def trigger_emergency_alert(user_id, missed_medicines, reason, location=None):
+def delivery_verb(status):
+    """How a notify() outcome reads in an alert: 'sent', 'failed' or 'queued'."""
+    return status if status in ('sent', 'failed') else 'queued'
+
+
+def trigger_emergency_alert(user_id, missed_medicines, reason, location=None, wait=False):
     """
     Trigger emergency alert to all linked caretakers AND manual contacts.
-    Creates alerts, simulates SMS to phone numbers, returns alert data.
+    Creates alerts and queues SMS + calls to phone numbers, returns alert data.
+    With `wait`, the SMS and calls go out concurrently and each contact's
+    delivery status is reported within NOTIFY_DEADLINE_SECONDS.
     """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
@@ -151,22 +127,20 @@ def trigger_emergency_alert(user_id, missed_medicines, reason, location=None):
         description += f'\n📍 Last known location: {location.get("address", "Unknown")}'
         description += f'\n🗺️ Coordinates: {location.get("latitude", "N/A")}, {location.get("longitude", "N/A")}'
 
-    # Create alert for each registered caretaker
+    # One alert, delivered to every registered caretaker's inbox
     alert_ids = []
     sms_sent = []
-    for ct in caretakers:
-        alert_id = create_alert(
+    if caretakers:
+        alert_ids.append(broadcast_alert(
             user_id=user_id,
             alert_type=alert_type,
             title=title,
             description=description,
-            caretaker_id=ct['caretaker_id']
-        )
-        alert_ids.append(alert_id)
-
-    # Send SMS + Voice Call to all manual contacts via Twilio
-    from utils.twilio_service import send_sms, make_call
+            caretaker_ids=[ct['caretaker_id'] for ct in caretakers],
+        ))
 
+    # SMS + voice call to all manual contacts, sent by the notification queue
+    messages = []
     for contact in manual_contacts:
         contact_name = contact.get('name', 'Caretaker')
 
@@ -185,32 +159,31 @@ def trigger_emergency_alert(user_id, missed_medicines, reason, location=None):
             f"Please make sure that they take their medicine as soon as possible. "
             f"Thank you for being a responsible caretaker."
         )
-
-        # Send SMS
-        sms_result = send_sms(contact['phone'], sms_msg)
-
-        # Make voice call
-        call_result = make_call(contact['phone'], call_msg)
+        messages += [('sms', contact['phone'], sms_msg), ('call', contact['phone'], call_msg)]
 
         sms_sent.append({
             'contact_name': contact['name'],
             'phone': contact['phone'],
             'relationship': contact.get('relationship', 'family'),
-            'sms_status': 'sent' if sms_result['success'] else 'failed',
-            'sms_sid': sms_result.get('sid'),
-            'sms_error': sms_result.get('error'),
-            'call_status': 'initiated' if call_result['success'] else 'failed',
-            'call_sid': call_result.get('sid'),
-            'call_error': call_result.get('error'),
             'message_preview': sms_msg[:160],
         })
 
-        # Also create an alert record for this SMS
+    outcomes = notify(user_id, messages, wait=wait)
+    for notification, sms, call in zip(sms_sent, outcomes[::2], outcomes[1::2]):
+        notification.update({
+            'sms_status': sms['status'], 'sms_job_id': sms['job_id'],
+            'sms_sid': sms['sid'], 'sms_error': sms['error'],
+            'call_status': call['status'], 'call_job_id': call['job_id'],
+            'call_sid': call['sid'], 'call_error': call['error'],
+        })
+
+        # Also create an alert record for this SMS, once its outcome is known
+        verb = delivery_verb(sms['status'])
         create_alert(
             user_id=user_id,
             alert_type=alert_type,
-            title=f'SMS sent to {contact["name"]}',
-            description=f'Emergency SMS sent to {contact["phone"]}: {sms_msg[:100]}...',
+            title=f'SMS {verb} to {notification["contact_name"]}',
+            description=f'Emergency SMS {verb} to {notification["phone"]}: {notification["message_preview"][:100]}...',
         )
 
     # Create alert for the patient themselves
@@ -219,7 +192,7 @@ def trigger_emergency_alert(user_id, missed_medicines, reason, location=None):
         user_id=user_id,
         alert_type=alert_type,
         title='🚨 Emergency alert sent to your caretaker(s)',
-        description=f'{total_notified} caretaker(s) notified. SMS sent to: {", ".join([c["name"] + " (" + c["phone"] + ")" for c in manual_contacts]) or "None"}',
+        description=f'{total_notified} caretaker(s) notified. SMS: {", ".join([n["contact_name"] + " (" + n["phone"] + ", " + delivery_verb(n["sms_status"]) + ")" for n in sms_sent]) or "None"}',
     )
 
     cursor.close()
@@ -237,7 +210,7 @@ def trigger_emergency_alert(user_id, missed_medicines, reason, location=None):
     }
 
 
-def auto_check_and_alert(user_id, location=None):
+def auto_check_and_alert(user_id, location=None, wait=False):
     """
     Main function: automatically checks for missed doses and triggers alerts.
     Returns alert data if triggered, None otherwise.
@@ -250,4 +223,4 @@ def auto_check_and_alert(user_id, location=None):
         return None
 
     # Trigger alert for ANY missed dose
-    return trigger_emergency_alert(user_id, missed, 'missed_dose', location)
+    return trigger_emergency_alert(user_id, missed, 'missed_dose', location, wait=wait)
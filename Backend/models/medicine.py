@@ -1,4 +1,13 @@
 from database.schema import get_connection
+from database.dialects import get_dialect
+from database.session import request_cached
+from database.router import replica_read
+from database.rollups import refresh_adherence_summary
+from database.dose_instances import sync_medicines
+from database import reminder_horizon
+from database.change_feed import record_changes
+from utils.helpers import to_time
+from datetime import date, datetime
 
 
 def generate_default_schedules(frequency, instruction=''):
@@ -48,59 +57,106 @@ def generate_default_schedules(frequency, instruction=''):
     return times
 
 
+def normalize_schedules(schedules):
+    """Schedule times as datetime.time (for the TIME column), dropping duplicates and unparseable ones."""
+    times = []
+    for value in schedules or []:
+        t = to_time(value)
+        if t is not None and t not in times:
+            times.append(t)
+    return times
+
+
+MEDICINE_DEFAULTS = {
+    'med_type': 'Oral Tablet', 'quantity': '30 Tabs', 'frequency': 'Once daily',
+    'instruction': '', 'notes': '', 'color': '#4CAF50', 'icon': 'pill',
+    'pill_count': 1, 'schedules': None, 'pills_remaining': 30,
+}
+
+
 def create_medicine(user_id, name, dosage, med_type='Oral Tablet', quantity='30 Tabs',
                     frequency='Once daily', instruction='', notes='', color='#4CAF50',
-                    icon='pill', pill_count=1, schedules=None):
+                    icon='pill', pill_count=1, schedules=None, pills_remaining=30):
     """Create a new medicine with its schedules and auto-create reminders."""
+    return create_medicines(user_id, [{
+        'name': name, 'dosage': dosage, 'med_type': med_type, 'quantity': quantity,
+        'frequency': frequency, 'instruction': instruction, 'notes': notes, 'color': color,
+        'icon': icon, 'pill_count': pill_count, 'schedules': schedules,
+        'pills_remaining': pills_remaining,
+    }])[0]
+
+
+def create_medicines(user_id, medicines):
+    """
+    Create several medicines (dicts of create_medicine's arguments) with their
+    schedules and today's reminders in one transaction. Returns the new ids in order.
+    """
     conn = get_connection()
     cursor = conn.cursor()
+    today = date.today()
+    medicine_ids, schedule_rows, reminder_rows = [], [], []
 
-    cursor.execute(
-        """INSERT INTO medicines
-           (user_id, name, dosage, type, quantity, frequency, instruction, notes, color, icon, pill_count)
-           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-        (user_id, name, dosage, med_type, quantity, frequency, instruction, notes, color, icon, pill_count)
-    )
-    medicine_id = cursor.lastrowid
-
-    # Auto-generate schedules from frequency if none provided
-    if not schedules:
-        schedules = generate_default_schedules(frequency, instruction)
-
-    # Add schedules and auto-create reminders
-    if schedules:
-        from datetime import datetime, date
-        today = date.today()
-        for time_str in schedules:
-            cursor.execute(
-                "INSERT INTO medicine_schedules (medicine_id, time) VALUES (%s, %s)",
-                (medicine_id, time_str)
-            )
-            # Auto-create a reminder for today
-            try:
-                t = datetime.strptime(time_str, '%H:%M')
-                reminder_dt = datetime.combine(today, t.time())
-                cursor.execute(
-                    """INSERT INTO reminders (user_id, medicine_id, scheduled_time, status)
-                       VALUES (%s, %s, %s, 'upcoming')""",
-                    (user_id, medicine_id, reminder_dt)
-                )
-            except ValueError:
-                pass
+    for med in medicines:
+        m = {**MEDICINE_DEFAULTS, **med}
+        # One INSERT per medicine: lastrowid of a multi-row INSERT only gives the first id
+        cursor.execute(
+            """INSERT INTO medicines
+               (user_id, name, dosage, type, quantity, frequency, instruction, notes, color, icon,
+                pill_count, pills_remaining)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            (user_id, m['name'], m['dosage'], m['med_type'], m['quantity'], m['frequency'],
+             m['instruction'], m['notes'], m['color'], m['icon'], m['pill_count'],
+             m['pills_remaining'])
+        )
+        medicine_id = cursor.lastrowid
+        medicine_ids.append(medicine_id)
+
+        # Auto-generate schedules from frequency if none provided
+        times = normalize_schedules(m['schedules']) or normalize_schedules(
+            generate_default_schedules(m['frequency'], m['instruction']))
+        schedule_rows += [(medicine_id, t) for t in times]
+        # Today's reminders (earlier slots too); reminder_horizon fills in the days ahead
+        reminder_rows += [(user_id, medicine_id, datetime.combine(today, t)) for t in times]
+
+    # Schedules and reminders for every medicine go in one batched INSERT each
+    if schedule_rows:
+        cursor.executemany(
+            "INSERT INTO medicine_schedules (medicine_id, time) VALUES (%s, %s)",
+            schedule_rows
+        )
+    if reminder_rows:
+        cursor.executemany(
+            """INSERT INTO reminders (user_id, medicine_id, scheduled_time, status)
+               VALUES (%s, %s, %s, 'upcoming')""",
+            reminder_rows
+        )
 
+    if medicine_ids:
+        cursor.execute(
+            f"SELECT id FROM reminders WHERE medicine_id IN ({', '.join(['%s'] * len(medicine_ids))})",
+            medicine_ids
+        )
+        reminder_ids = [row[0] for row in cursor.fetchall()]
+        record_changes(cursor, user_id, 'medicine', medicine_ids)
+        record_changes(cursor, user_id, 'reminder', reminder_ids)
+        sync_medicines(cursor, user_id, medicine_ids)
+        reminder_horizon.sync_medicines(cursor, user_id, medicine_ids)
+        refresh_adherence_summary(cursor, user_id)
     conn.commit()
     cursor.close()
     conn.close()
-    return medicine_id
+    return medicine_ids
 
 
+@request_cached
+@replica_read
 def get_medicines_by_user(user_id):
     """Get all active medicines for a user with their schedules."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
 
     cursor.execute(
-        """SELECT m.*, GROUP_CONCAT(ms.time ORDER BY ms.time) as schedule_times
+        f"""SELECT m.*, {get_dialect().group_concat('SUBSTR(ms.time, 1, 5)', order_by='ms.time')} as schedule_times
            FROM medicines m
            LEFT JOIN medicine_schedules ms ON m.id = ms.medicine_id
            WHERE m.user_id = %s AND m.is_active = TRUE
@@ -128,13 +184,14 @@ def get_medicines_by_user(user_id):
     return medicines
 
 
+@request_cached
 def get_medicine_by_id(medicine_id, user_id):
     """Get a specific medicine by ID."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
 
     cursor.execute(
-        """SELECT m.*, GROUP_CONCAT(ms.time ORDER BY ms.time) as schedule_times
+        f"""SELECT m.*, {get_dialect().group_concat('SUBSTR(ms.time, 1, 5)', order_by='ms.time')} as schedule_times
            FROM medicines m
            LEFT JOIN medicine_schedules ms ON m.id = ms.medicine_id
            WHERE m.id = %s AND m.user_id = %s
@@ -156,11 +213,48 @@ def get_medicine_by_id(medicine_id, user_id):
     return med
 
 
+def get_medicines_by_ids(user_id, medicine_ids):
+    """The user's medicines among `medicine_ids`, inactive ones included (for the change feed)."""
+    if not medicine_ids:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    cursor.execute(
+        f"""SELECT m.*, {get_dialect().group_concat('SUBSTR(ms.time, 1, 5)', order_by='ms.time')} as schedule_times
+           FROM medicines m
+           LEFT JOIN medicine_schedules ms ON m.id = ms.medicine_id
+           WHERE m.user_id = %s AND m.id IN ({', '.join(['%s'] * len(medicine_ids))})
+           GROUP BY m.id""",
+        (user_id, *medicine_ids)
+    )
+    medicines = cursor.fetchall()
+
+    for med in medicines:
+        med['schedule'] = med['schedule_times'].split(',') if med['schedule_times'] else []
+        del med['schedule_times']
+        if med.get('created_at'):
+            med['created_at'] = str(med['created_at'])
+        if med.get('updated_at'):
+            med['updated_at'] = str(med['updated_at'])
+
+    cursor.close()
+    conn.close()
+    return medicines
+
+
 def update_medicine(medicine_id, user_id, **kwargs):
-    """Update medicine fields."""
+    """Update medicine fields. Returns False if the user has no such medicine."""
     conn = get_connection()
     cursor = conn.cursor()
 
+    # Verify ownership first
+    cursor.execute("SELECT 1 FROM medicines WHERE id = %s AND user_id = %s", (medicine_id, user_id))
+    if not cursor.fetchone():
+        cursor.close()
+        conn.close()
+        return False
+
     allowed_fields = ['name', 'dosage', 'type', 'quantity', 'frequency',
                       'instruction', 'notes', 'color', 'icon', 'pill_count', 'is_active']
 
@@ -181,19 +275,24 @@ def update_medicine(medicine_id, user_id, **kwargs):
     # Update schedules if provided
     if 'schedules' in kwargs and kwargs['schedules'] is not None:
         cursor.execute("DELETE FROM medicine_schedules WHERE medicine_id = %s", (medicine_id,))
-        for time_str in kwargs['schedules']:
+        for t in normalize_schedules(kwargs['schedules']):
             cursor.execute(
                 "INSERT INTO medicine_schedules (medicine_id, time) VALUES (%s, %s)",
-                (medicine_id, time_str)
+                (medicine_id, t)
             )
 
+    record_changes(cursor, user_id, 'medicine', [medicine_id])
+    sync_medicines(cursor, user_id, [medicine_id])
+    reminder_horizon.sync_medicines(cursor, user_id, [medicine_id])
+    refresh_adherence_summary(cursor, user_id)
     conn.commit()
     cursor.close()
     conn.close()
+    return True
 
 
 def delete_medicine(medicine_id, user_id):
-    """Hard delete a medicine and all related data (schedules, reminders, dose logs)."""
+    """Hard delete a medicine and all related data (schedules, reminders, dose logs, instances)."""
     conn = get_connection()
     cursor = conn.cursor()
 
@@ -206,12 +305,18 @@ def delete_medicine(medicine_id, user_id):
 
     # Cascade delete related data
     cursor.execute("DELETE FROM dose_logs WHERE medicine_id = %s", (medicine_id,))
+    cursor.execute(
+        "DELETE FROM daily_adherence WHERE user_id = %s AND medicine_id = %s", (user_id, medicine_id)
+    )
+    cursor.execute("DELETE FROM dose_instances WHERE medicine_id = %s", (medicine_id,))
     cursor.execute("DELETE FROM reminders WHERE medicine_id = %s", (medicine_id,))
     cursor.execute("DELETE FROM medicine_schedules WHERE medicine_id = %s", (medicine_id,))
     cursor.execute("DELETE FROM medicines WHERE id = %s AND user_id = %s", (medicine_id, user_id))
+    affected = cursor.rowcount
+    record_changes(cursor, user_id, 'medicine', [medicine_id], deleted=True)
+    refresh_adherence_summary(cursor, user_id)
 
     conn.commit()
-    affected = cursor.rowcount
     cursor.close()
     conn.close()
     return affected > 0
@@ -1,47 +1,89 @@
+import uuid
+from collections import defaultdict
+from config import Config
 from database.schema import get_connection
+from database.dialects import get_dialect
+from database.session import request_cached
+from database.change_feed import record_changes
+from ml.smart_reminder import track_behaviors
+from utils.helpers import encode_cursor, decode_cursor
 from datetime import datetime, date, timedelta
 
+# Misses older than this are expired without a behavior event
+MISS_BEHAVIOR_WINDOW = timedelta(hours=24)
+
 
 def create_reminder(user_id, medicine_id, scheduled_time, voice_enabled=True):
     """Create a new reminder."""
     conn = get_connection()
     cursor = conn.cursor()
+    dialect = get_dialect()
+    # A slot the horizon job already generated is reused, not duplicated
+    upsert = dialect.upsert(('medicine_id', 'scheduled_time'),
+                            [f"voice_enabled = {dialect.inserted('voice_enabled')}"], returning_id=True)
     cursor.execute(
-        """INSERT INTO reminders (user_id, medicine_id, scheduled_time, voice_enabled)
-           VALUES (%s, %s, %s, %s)""",
+        f"""INSERT INTO reminders (user_id, medicine_id, scheduled_time, voice_enabled)
+            VALUES (%s, %s, %s, %s)
+            {upsert}""",
         (user_id, medicine_id, scheduled_time, voice_enabled)
     )
-    conn.commit()
     reminder_id = cursor.lastrowid
+    record_changes(cursor, user_id, 'reminder', [reminder_id])
+    conn.commit()
     cursor.close()
     conn.close()
     return reminder_id
 
 
-def get_reminders(user_id):
-    """Get upcoming and completed reminders for a user."""
+REMINDER_COLUMNS = "r.*, m.name as medicine_name, m.dosage, m.instruction, m.icon, m.pill_count, m.type"
+
+
+@request_cached
+def get_reminders(user_id, limit=50, after=None):
+    """
+    Upcoming/snoozed reminders in scheduled order (one page of `limit`,
+    starting after the page cursor `after`) and today's completed ones.
+    Returns {'upcoming', 'completed', 'next_cursor'}.
+    """
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
 
-    # Upcoming
-    cursor.execute("""
-        SELECT r.*, m.name as medicine_name, m.dosage, m.instruction, m.icon, m.pill_count, m.type
-        FROM reminders r
+    # Upcoming: one (user_id, status, scheduled_time, id) range per status
+    keyset, params = '', []
+    if after:
+        scheduled_time, reminder_id = decode_cursor(after, 2)
+        keyset = "AND (scheduled_time > %s OR (scheduled_time = %s AND id > %s))"
+        params = [scheduled_time, scheduled_time, reminder_id]
+    branches = ' UNION ALL '.join(
+        f"""SELECT * FROM (
+                SELECT * FROM reminders WHERE user_id = %s AND status = '{status}' {keyset}
+                ORDER BY scheduled_time ASC, id ASC LIMIT %s
+            ) AS {status}"""
+        for status in ('upcoming', 'snoozed')
+    )
+    cursor.execute(f"""
+        SELECT {REMINDER_COLUMNS}
+        FROM ({branches}) r
         JOIN medicines m ON r.medicine_id = m.id
-        WHERE r.user_id = %s AND r.status IN ('upcoming', 'snoozed')
-        ORDER BY r.scheduled_time ASC
-    """, (user_id,))
+        ORDER BY r.scheduled_time ASC, r.id ASC
+        LIMIT %s
+    """, (user_id, *params, limit + 1) * 2 + (limit + 1,))
     upcoming = cursor.fetchall()
+    next_cursor = None
+    if len(upcoming) > limit:
+        upcoming = upcoming[:limit]
+        next_cursor = encode_cursor(upcoming[-1]['scheduled_time'], upcoming[-1]['id'])
 
-    # Completed (today)
-    cursor.execute("""
-        SELECT r.*, m.name as medicine_name, m.dosage, m.instruction, m.icon, m.pill_count, m.type
+    # Completed (today), as a range on the same index
+    start = datetime.combine(date.today(), datetime.min.time())
+    cursor.execute(f"""
+        SELECT {REMINDER_COLUMNS}
         FROM reminders r
         JOIN medicines m ON r.medicine_id = m.id
         WHERE r.user_id = %s AND r.status = 'completed'
-              AND DATE(r.scheduled_time) = CURDATE()
+              AND r.scheduled_time >= %s AND r.scheduled_time < %s
         ORDER BY r.scheduled_time DESC
-    """, (user_id,))
+    """, (user_id, start, start + timedelta(days=1)))
     completed = cursor.fetchall()
 
     for r in upcoming + completed:
@@ -54,7 +96,31 @@ def get_reminders(user_id):
 
     cursor.close()
     conn.close()
-    return {'upcoming': upcoming, 'completed': completed}
+    return {'upcoming': upcoming, 'completed': completed, 'next_cursor': next_cursor}
+
+
+def get_reminders_by_ids(user_id, reminder_ids):
+    """The user's reminders among `reminder_ids`, any status (for the change feed)."""
+    if not reminder_ids:
+        return []
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT {REMINDER_COLUMNS}
+        FROM reminders r
+        JOIN medicines m ON r.medicine_id = m.id
+        WHERE r.user_id = %s AND r.id IN ({', '.join(['%s'] * len(reminder_ids))})
+    """, (user_id, *reminder_ids))
+    reminders = cursor.fetchall()
+
+    for r in reminders:
+        for key in ('scheduled_time', 'snooze_until', 'created_at'):
+            if r.get(key):
+                r[key] = str(r[key])
+
+    cursor.close()
+    conn.close()
+    return reminders
 
 
 # Alias for backward compatibility
@@ -87,8 +153,141 @@ def update_reminder_status(reminder_id, user_id, status, snooze_until=None):
         "UPDATE reminders SET status = %s, snooze_until = %s WHERE id = %s AND user_id = %s",
         (status, snooze_until, reminder_id, user_id)
     )
-    conn.commit()
     affected = cursor.rowcount
+    if affected:
+        record_changes(cursor, user_id, 'reminder', [reminder_id])
+    conn.commit()
     cursor.close()
     conn.close()
     return affected > 0
+
+
+def get_reminder_medicines(user_id, reminder_ids):
+    """{reminder_id: medicine_id} for those of `reminder_ids` the user owns."""
+    if not reminder_ids:
+        return {}
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""SELECT id, medicine_id FROM reminders
+            WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(reminder_ids))})""",
+        (user_id, *reminder_ids)
+    )
+    owned = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return owned
+
+
+def update_reminder_statuses(user_id, reminder_ids, status, snooze_until=None):
+    """Set the same status on many reminders with one UPDATE. Returns rows changed."""
+    if not reminder_ids:
+        return 0
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""UPDATE reminders SET status = %s, snooze_until = %s
+            WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(reminder_ids))})""",
+        (status, snooze_until, user_id, *reminder_ids)
+    )
+    affected = cursor.rowcount
+    if affected:
+        record_changes(cursor, user_id, 'reminder', reminder_ids)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return affected
+
+
+def sweep_missed_reminders(now=None, chunk_size=500):
+    """
+    Move reminders still upcoming (or snoozed) REMINDER_MISS_GRACE_MINUTES
+    past their time to 'missed', oldest first, one chunk per transaction,
+    and feed the misses to the behavior tracker in one batch per chunk.
+    A reminder whose dose was logged taken is completed instead, and one
+    created after its own time (see create_medicines) expires without a
+    behavior event.
+    Reminders older than MISS_BEHAVIOR_WINDOW are expired without a
+    behavior event, so a first sweep does not replay weeks of escalations.
+    Returns {'missed', 'completed', 'events'}.
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(minutes=Config.REMINDER_MISS_GRACE_MINUTES)
+    result = {'missed': 0, 'completed': 0, 'events': 0}
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for status in ('upcoming', 'snoozed'):
+            while True:
+                # Range read on (status, scheduled_time); `taken` is a dose_logs key lookup
+                cursor.execute(
+                    """SELECT r.id, r.user_id, r.medicine_id, r.scheduled_time, r.created_at,
+                              EXISTS (SELECT 1 FROM dose_logs dl
+                                      WHERE dl.user_id = r.user_id AND dl.medicine_id = r.medicine_id
+                                        AND dl.dose_date = DATE(r.scheduled_time)
+                                        AND dl.scheduled_time = TIME(r.scheduled_time)
+                                        AND dl.status = 'taken') AS taken
+                       FROM reminders r
+                       WHERE r.status = %s AND r.scheduled_time < %s
+                         AND (r.snooze_until IS NULL OR r.snooze_until < %s)
+                       ORDER BY r.scheduled_time, r.id
+                       LIMIT %s""",
+                    (status, cutoff, cutoff, chunk_size)
+                )
+                candidates = cursor.fetchall()
+                if not candidates:
+                    break
+                changed = defaultdict(list)
+
+                # Doses logged on a path that did not close the reminder
+                completed = [row for row in candidates if row[5]]
+                if completed:
+                    cursor.execute(
+                        f"""UPDATE reminders SET status = 'completed'
+                            WHERE id IN ({', '.join(['%s'] * len(completed))}) AND status = %s""",
+                        (*[row[0] for row in completed], status)
+                    )
+                    result['completed'] += cursor.rowcount
+                    for reminder_id, user_id, *_ in completed:
+                        changed[user_id].append(reminder_id)
+
+                rows = [row for row in candidates if not row[5]]
+                if rows:
+                    # The token marks exactly the rows this UPDATE moved, not ones
+                    # /miss or another sweep moved to 'missed' in between
+                    token = uuid.uuid4().hex
+                    placeholders = ', '.join(['%s'] * len(rows))
+                    cursor.execute(
+                        f"""UPDATE reminders SET status = 'missed', sweep_token = %s
+                            WHERE id IN ({placeholders}) AND status = %s""",
+                        (token, *[row[0] for row in rows], status)
+                    )
+                    if cursor.rowcount != len(rows):
+                        cursor.execute(
+                            f"SELECT id FROM reminders WHERE id IN ({placeholders}) AND sweep_token = %s",
+                            (*[row[0] for row in rows], token)
+                        )
+                        moved = {row[0] for row in cursor.fetchall()}
+                        rows = [row for row in rows if row[0] in moved]
+                    for reminder_id, user_id, *_ in rows:
+                        changed[user_id].append(reminder_id)
+
+                for user_id, reminder_ids in changed.items():
+                    record_changes(cursor, user_id, 'reminder', reminder_ids)
+                conn.commit()
+
+                # A slot that was already past when its reminder was created (today's
+                # earlier doses of a new medicine) is expired, but was never missable
+                events = [(user_id, medicine_id, 'miss', 0)
+                          for _, user_id, medicine_id, scheduled_time, created_at, _ in rows
+                          if scheduled_time >= now - MISS_BEHAVIOR_WINDOW
+                          and (created_at is None or created_at <= scheduled_time)]
+                track_behaviors(events)
+                result['missed'] += len(rows)
+                result['events'] += len(events)
+                if len(candidates) < chunk_size:
+                    break
+    finally:
+        cursor.close()
+        conn.close()
+    return result
@@ -0,0 +1,258 @@
+"""
+Batch Sync
+==========
+Applies the offline queue the app replays on reconnect in one request:
+
+    {"items": [
+        {"id": "<client id>", "type": "dose", "medicine_id": 3,
+         "scheduled_time": "08:00", "status": "taken",
+         "dose_date": "2024-05-01", "taken_at": "2024-05-01T08:04:00"},
+        {"id": "<client id>", "type": "reminder", "reminder_id": 41,
+         "action": "snooze", "delay_mins": 0}
+    ]}
+
+Dose logs go in with one multi-row upsert (models.dose_log.log_doses),
+reminder changes with one UPDATE per resulting status and one behavior
+upsert. Every item gets a code: applied, duplicate, invalid, not_found.
+
+Applied items leave a receipt in `sync_receipts` keyed by the client id;
+replaying an item returns `duplicate` with the original result instead
+of applying it again (receipts are kept SYNC_RECEIPT_RETENTION_DAYS).
+
+`get_changes()` is the pull side: the medicines, reminders and dose logs
+changed since a cursor, read from the change feed (database.change_feed).
+"""
+import json
+from datetime import date, datetime, timedelta
+
+from config import Config
+from database.schema import get_connection
+from database.change_feed import changes_since, current_seq
+from ml.smart_reminder import track_behaviors
+from models.dose_log import log_doses, get_dose_logs_by_ids
+from models.medicine import get_medicines_by_ids
+from models.reminder import get_reminder_medicines, get_reminders_by_ids, update_reminder_statuses
+from utils.helpers import to_time
+
+DOSE_STATUSES = ('taken', 'missed', 'snoozed')
+REMINDER_ACTIONS = {
+    # action -> (reminder status, behavior event)
+    'take': ('completed', 'take'),
+    'snooze': ('snoozed', 'snooze'),
+    'miss': ('missed', 'miss'),
+}
+SNOOZE_MINUTES = 10
+
+
+def _outcome(client_id, code, result=None, error=None):
+    outcome = {'id': client_id, 'code': code}
+    if result is not None:
+        outcome['result'] = result
+    if error:
+        outcome['error'] = error
+    return outcome
+
+
+def _parse_dose(item):
+    """(medicine_id, time, status, dose_date, taken_at) or raises ValueError."""
+    medicine_id = int(item['medicine_id'])
+    t = to_time(item.get('scheduled_time'))
+    if t is None:
+        raise ValueError('scheduled_time must be HH:MM or h:MM AM/PM')
+    status = item.get('status', 'taken')
+    if status not in DOSE_STATUSES:
+        raise ValueError('status must be taken, missed or snoozed')
+    d = date.fromisoformat(item['dose_date']) if item.get('dose_date') else date.today()
+    taken_at = datetime.fromisoformat(item['taken_at']) if item.get('taken_at') else None
+    return medicine_id, t, status, d, taken_at
+
+
+def _parse_reminder(item):
+    """(reminder_id, action, delay_mins) or raises ValueError."""
+    reminder_id = int(item['reminder_id'])
+    action = item.get('action')
+    if action not in REMINDER_ACTIONS:
+        raise ValueError('action must be take, snooze or miss')
+    return reminder_id, action, int(item.get('delay_mins') or 0)
+
+
+def get_sync_receipts(user_id, client_ids):
+    """{client_id: (code, result)} for items already applied."""
+    if not client_ids:
+        return {}
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""SELECT client_id, code, result FROM sync_receipts
+            WHERE user_id = %s AND client_id IN ({', '.join(['%s'] * len(client_ids))})""",
+        (user_id, *client_ids)
+    )
+    receipts = {cid: (code, json.loads(result) if result else None)
+                for cid, code, result in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return receipts
+
+
+def save_sync_receipts(user_id, outcomes):
+    """One multi-row INSERT; a concurrent replay of the same items fails on the key."""
+    rows = [(user_id, o['id'], o['code'], json.dumps(o.get('result'))) for o in outcomes]
+    if not rows:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO sync_receipts (user_id, client_id, code, result) VALUES (%s, %s, %s, %s)",
+        rows
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def purge_sync_receipts(days=None):
+    """Forget receipts older than `days` (SYNC_RECEIPT_RETENTION_DAYS). Returns rows deleted."""
+    days = Config.SYNC_RECEIPT_RETENTION_DAYS if days is None else days
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM sync_receipts WHERE created_at < %s",
+        (datetime.utcnow() - timedelta(days=days),)
+    )
+    conn.commit()
+    deleted = cursor.rowcount
+    cursor.close()
+    conn.close()
+    return deleted
+
+
+def apply_sync_batch(user_id, items):
+    """Apply a batch of offline actions; returns one outcome per item, in order."""
+    outcomes = [None] * len(items)
+    client_ids = []
+    for i, item in enumerate(items):
+        client_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(client_id, str) or not 0 < len(client_id) <= 64:
+            outcomes[i] = _outcome(client_id, 'invalid', error='id must be a string of 1-64 characters')
+        else:
+            client_ids.append(client_id)
+
+    # Replays (from an earlier batch, or repeated within this one)
+    receipts = get_sync_receipts(user_id, sorted(set(client_ids)))
+    seen = set()
+    doses, reminders = [], []
+    for i, item in enumerate(items):
+        if outcomes[i] is not None:
+            continue
+        client_id = item['id']
+        if client_id in receipts:
+            outcomes[i] = _outcome(client_id, 'duplicate', receipts[client_id][1])
+            continue
+        if client_id in seen:
+            outcomes[i] = _outcome(client_id, 'duplicate')
+            continue
+        seen.add(client_id)
+        try:
+            if item.get('type') == 'dose':
+                doses.append((i, _parse_dose(item)))
+            elif item.get('type') == 'reminder':
+                reminders.append((i, _parse_reminder(item)))
+            else:
+                raise ValueError('type must be dose or reminder')
+        except (KeyError, TypeError, ValueError) as e:
+            message = f'missing {e}' if isinstance(e, KeyError) else str(e)
+            outcomes[i] = _outcome(client_id, 'invalid', error=message)
+
+    applied = []
+    if doses:
+        conn = get_connection()
+        cursor = conn.cursor()
+        medicine_ids = sorted({dose[0] for _, dose in doses})
+        cursor.execute(
+            f"""SELECT id FROM medicines
+                WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(medicine_ids))})""",
+            (user_id, *medicine_ids)
+        )
+        owned = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        conn.close()
+
+        valid = []
+        for i, dose in doses:
+            if dose[0] in owned:
+                valid.append((i, dose))
+            else:
+                outcomes[i] = _outcome(items[i]['id'], 'not_found', error='medicine not found')
+        log_ids = log_doses(user_id, [dose for _, dose in valid])
+        for (i, dose), log_id in zip(valid, log_ids):
+            outcomes[i] = _outcome(items[i]['id'], 'applied', {'dose_log_id': log_id, 'status': dose[2]})
+            applied.append(outcomes[i])
+
+    if reminders:
+        owned = get_reminder_medicines(user_id, sorted({r[0] for _, r in reminders}))
+        final_action = {}
+        events = []
+        for i, (reminder_id, action, delay) in reminders:
+            if reminder_id not in owned:
+                outcomes[i] = _outcome(items[i]['id'], 'not_found', error='reminder not found')
+                continue
+            final_action[reminder_id] = action   # later items win
+            events.append((user_id, owned[reminder_id], REMINDER_ACTIONS[action][1], delay))
+            outcomes[i] = _outcome(items[i]['id'], 'applied', {'reminder_id': reminder_id, 'action': action})
+            applied.append(outcomes[i])
+
+        for action in REMINDER_ACTIONS:
+            ids = sorted(rid for rid, a in final_action.items() if a == action)
+            snooze_until = datetime.now() + timedelta(minutes=SNOOZE_MINUTES) if action == 'snooze' else None
+            update_reminder_statuses(user_id, ids, REMINDER_ACTIONS[action][0], snooze_until)
+        track_behaviors(events)
+
+    save_sync_receipts(user_id, applied)
+    return outcomes
+
+
+# entity -> (response key, loader of the user's rows by id)
+CHANGE_LOADERS = {
+    'medicine': ('medicines', get_medicines_by_ids),
+    'reminder': ('reminders', get_reminders_by_ids),
+    'dose_log': ('dose_logs', get_dose_logs_by_ids),
+}
+
+
+def get_changes(user_id, since, limit=None):
+    """
+    Rows changed after cursor `since`, at most `limit` (SYNC_CHANGES_PAGE_SIZE)
+    changes per page. Returns the rows per entity, deleted ids per entity,
+    the next cursor and whether more pages follow. A cursor ahead of the
+    server (e.g. after a restore) comes back with `reset` so the client
+    starts over from 0.
+    """
+    limit = limit or Config.SYNC_CHANGES_PAGE_SIZE
+    conn = get_connection()
+    cursor = conn.cursor()
+    latest = current_seq(cursor, user_id)
+    reset = since > latest
+    changes = changes_since(cursor, user_id, 0 if reset else since, limit + 1)
+    cursor.close()
+    conn.close()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    result = {'deleted': {}}
+    for entity, (key, load) in CHANGE_LOADERS.items():
+        changed = [entity_id for _, e, entity_id, deleted in changes if e == entity and not deleted]
+        rows = load(user_id, changed)
+        found = {row['id'] for row in rows}
+        result[key] = rows
+        # Tombstones, plus rows removed along with their medicine
+        result['deleted'][key] = sorted(
+            {entity_id for _, e, entity_id, deleted in changes if e == entity and deleted}
+            | (set(changed) - found)
+        )
+
+    result.update({
+        'cursor': changes[-1][0] if changes else (0 if reset else since),
+        'has_more': has_more,
+        'reset': reset,
+    })
+    return result
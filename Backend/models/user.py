@@ -1,4 +1,5 @@
 from database.schema import get_connection
+from database.session import request_cached
 
 
 def create_user(name, email, phone, password_hash, role='patient'):
@@ -27,10 +28,11 @@ def find_user_by_email(email):
     return user
 
 
+@request_cached
 def find_user_by_id(user_id):
     """Find a user by ID."""
     conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor(dictionary=True, prepared=True)
     cursor.execute(
         "SELECT id, name, email, phone, role, avatar_url, created_at FROM users WHERE id = %s",
         (user_id,)
@@ -1,5 +1,7 @@
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
+from utils.conditional import conditional_get
+from utils.cache import cached
 from utils.helpers import success_response, error_response
 from models.dose_log import get_adherence_stats, get_medication_breakdown
 from ml.ai_insights import generate_insight
@@ -10,6 +12,8 @@ analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
 @analytics_bp.route('', methods=['GET'])
 @token_required
+@conditional_get()
+@cached(tags=('dose_log', 'medicine'))
 def get_analytics():
     """Get adherence analytics (default 7 days)."""
     days = request.args.get('days', 7, type=int)
@@ -28,6 +32,7 @@ def get_analytics():
 
 @analytics_bp.route('/insights', methods=['GET'])
 @token_required
+@cached(tags=('dose_log', 'medicine', 'behavior'))
 def get_insights():
     """Get AI-generated insights."""
     insight = generate_insight(request.user_id)
@@ -36,6 +41,7 @@ def get_insights():
 
 @analytics_bp.route('/risk', methods=['GET'])
 @token_required
+@cached(tags=('dose_log', 'medicine', 'behavior'))
 def get_risk():
     """Get predictive risk score for missed doses."""
     risk = get_risk_score(request.user_id)
@@ -44,6 +50,7 @@ def get_risk():
 
 @analytics_bp.route('/monthly', methods=['GET'])
 @token_required
+@cached(tags=('dose_log', 'medicine'))
 def get_monthly():
     """Get 30-day daily adherence breakdown."""
     daily = get_monthly_breakdown(request.user_id)
@@ -1,10 +1,14 @@
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
-from utils.helpers import success_response, error_response
+from utils.conditional import conditional_get
+from utils.helpers import success_response, error_response, page_limit
 from models.caretaker import get_patients_for_caretaker, link_caretaker_patient, get_patient_detail
-from models.alert import get_alerts_for_user, mark_alert_read, create_alert
-from models.dose_log import get_adherence_stats, get_streak
+from models.alert import get_alerts_page, get_unread_count, mark_alert_read, mark_all_alerts_read, create_alert
+from models.dose_log import get_adherence_stats, get_streak, get_adherence_summary
 from database.schema import get_connection
+from database.router import replica_read
+from models.emergency_alert import delivery_verb
+from jobs.notifications import notify
 
 caretaker_bp = Blueprint('caretaker', __name__, url_prefix='/api/caretaker')
 
@@ -125,7 +129,8 @@ def update_contact(contact_id):
 @token_required
 def background_auto_sms():
     """Called by background task when patient misses 3+ doses.
-    Sends real SMS + voice call via Twilio to all caretaker contacts."""
+    Queues a Twilio SMS + voice call to every caretaker contact; poll /api/notifications for delivery,
+    or pass "wait": true to send them concurrently and get per-contact results within the deadline."""
     data = request.get_json()
     missed = data.get('missed_medicines', [])
     reason = data.get('reason', 'background_auto_check')
@@ -162,10 +167,7 @@ def background_auto_sms():
     # Build alert info
     med_names = ', '.join([m.get('name', 'Unknown') for m in missed[:5]])
 
-    # Send real SMS + Call via Twilio
-    from utils.twilio_service import send_sms, make_call
-
-    notifications = []
+    notifications, messages = [], []
     for contact in contacts:
         contact_name = contact.get('name', 'Caretaker')
 
@@ -185,29 +187,31 @@ def background_auto_sms():
             f"Thank you for being a responsible caretaker."
         )
 
-        # Log the alert in DB
-        create_alert(
-            user_id=request.user_id,
-            alert_type='emergency',
-            title=f'🚨 Auto alert to {contact_name}',
-            description=f'Background alert: missed {med_names}. SMS + Call sent to {contact["phone"]}.',
-        )
-
-        # Send SMS
-        sms_result = send_sms(contact['phone'], sms_text)
-
-        # Make voice call
-        call_result = make_call(contact['phone'], call_text)
+        messages += [('sms', contact['phone'], sms_text), ('call', contact['phone'], call_text)]
 
+    # Queued for the notification workers, or with "wait" sent to everyone at once
+    outcomes = notify(request.user_id, messages, wait=bool(data.get('wait')))
+    for contact, sms, call in zip(contacts, outcomes[::2], outcomes[1::2]):
         notifications.append({
             'contact_name': contact['name'],
             'phone': contact['phone'],
-            'sms_status': 'sent' if sms_result['success'] else 'failed',
-            'sms_error': sms_result.get('error'),
-            'call_status': 'initiated' if call_result['success'] else 'failed',
-            'call_error': call_result.get('error'),
+            'sms_status': sms['status'],
+            'sms_job_id': sms['job_id'],
+            'sms_error': sms['error'],
+            'call_status': call['status'],
+            'call_job_id': call['job_id'],
+            'call_error': call['error'],
         })
 
+        # Log the alert in DB, with what actually happened to the SMS and call
+        create_alert(
+            user_id=request.user_id,
+            alert_type='emergency',
+            title=f'🚨 Auto alert to {contact.get("name", "Caretaker")}',
+            description=f'Background alert: missed {med_names}. '
+                        f'SMS {delivery_verb(sms["status"])}, call {delivery_verb(call["status"])} to {contact["phone"]}.',
+        )
+
     cursor.close()
     conn.close()
 
@@ -216,13 +220,14 @@ def background_auto_sms():
         'missed_count': len(missed),
         'sms_triggered': len(contacts) > 0,
         'total_notified': len(contacts),
-    }, f'Auto SMS + Call triggered for {len(contacts)} contact(s)')
+    }, f'Auto SMS + Call queued for {len(contacts)} contact(s)')
 
 
 # ─── Original Caretaker Routes ──────────────────────────────────
 
 @caretaker_bp.route('/patients', methods=['GET'])
 @token_required
+@conditional_get()
 def list_patients():
     """Get all linked patients for caretaker."""
     patients = get_patients_for_caretaker(request.user_id)
@@ -266,26 +271,30 @@ def patient_detail(patient_id):
     if not patient:
         return error_response('Patient not found or not linked', 404)
 
-    # Add adherence stats
-    stats = get_adherence_stats(patient_id, 30)
-    streak = get_streak(patient_id)
+    # Add adherence stats (30-day window from the patient's summary row)
+    summary = get_adherence_summary(patient_id)
 
     return success_response({
         'patient': patient,
-        'adherence': stats['adherencePercentage'],
-        'streak': streak,
-        'taken': stats['taken'],
-        'missed': stats['missed'],
-        'total': stats['total'],
+        'adherence': summary['adherence30d'],
+        'streak': summary['streak'],
+        'longestStreak': summary['longestStreak'],
+        'taken': summary['taken30d'],
+        'missed': summary['missed30d'],
+        'total': summary['total30d'],
     })
 
 
 @caretaker_bp.route('/alerts', methods=['GET'])
 @token_required
 def list_alerts():
-    """Get alerts for caretaker's patients."""
-    alerts = get_alerts_for_user(request.user_id)
-    return success_response(alerts)
+    """The user's alert inbox, newest first; ?cursor= pages further back."""
+    try:
+        alerts, next_cursor = get_alerts_page(request.user_id, limit=page_limit(request.args.get('limit')),
+                                              after=request.args.get('cursor'))
+    except ValueError as e:
+        return error_response(str(e))
+    return success_response({'alerts': alerts, 'next_cursor': next_cursor})
 
 
 @caretaker_bp.route('/alerts/<int:alert_id>/read', methods=['PUT'])
@@ -296,8 +305,24 @@ def read_alert(alert_id):
     return success_response(None, 'Alert marked as read')
 
 
+@caretaker_bp.route('/alerts/unread', methods=['GET'])
+@token_required
+def unread_alerts():
+    """Unread alert count for the badge."""
+    return success_response({'unread': get_unread_count(request.user_id)})
+
+
+@caretaker_bp.route('/alerts/read-all', methods=['PUT'])
+@token_required
+def read_all_alerts():
+    """Mark every alert in the inbox as read."""
+    mark_all_alerts_read(request.user_id)
+    return success_response(None, 'All alerts marked as read')
+
+
 @caretaker_bp.route('/report/<int:patient_id>', methods=['GET'])
 @token_required
+@replica_read
 def get_report(patient_id):
     """Generate weekly/monthly report for a patient."""
     period = request.args.get('period', 'weekly')
@@ -357,7 +382,7 @@ def emergency_check():
     data = request.get_json() or {}
     location = data.get('location', None)  # {latitude, longitude, address}
 
-    result = auto_check_and_alert(request.user_id, location)
+    result = auto_check_and_alert(request.user_id, location, wait=bool(data.get('wait')))
     if result is None:
         return success_response({'triggered': False, 'missed_count': 0, 'message': 'All doses taken!'})
 
@@ -378,7 +403,7 @@ def emergency_trigger():
     if not missed:
         missed = [{'name': 'Unknown', 'dosage': '', 'time': ''}]
 
-    result = trigger_emergency_alert(request.user_id, missed, reason, location)
+    result = trigger_emergency_alert(request.user_id, missed, reason, location, wait=bool(data.get('wait')))
     return success_response(result, 'Emergency alert sent!')
 
 
@@ -1,8 +1,9 @@
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
+from utils.conditional import conditional_get
+from utils.cache import cached
 from utils.helpers import success_response, error_response
-from models.medicine import get_medicines_by_user
-from models.dose_log import get_adherence_stats, get_streak, get_today_doses
+from models.dose_log import get_adherence_summary
 from datetime import datetime
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
@@ -10,77 +11,47 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
 @dashboard_bp.route('', methods=['GET'])
 @token_required
+# nextDose is relative to the clock, so the ETag also turns over every minute
+@conditional_get(vary=lambda: datetime.now().strftime('%H:%M'))
+@cached(tags=('dose_log', 'medicine'), vary=lambda: datetime.now().strftime('%H:%M'))
 def get_dashboard():
     """Get dashboard data: adherence, streak, doses left, next dose."""
     user_id = request.user_id
 
-    # Get adherence stats
-    stats = get_adherence_stats(user_id, 7)
-    streak = get_streak(user_id)
-
-    # Get today's doses to calculate doses left
-    today_doses = get_today_doses(user_id)
-    medicines = get_medicines_by_user(user_id)
-
-    # Calculate doses left today
-    taken_today = len([d for d in today_doses if d['status'] == 'taken'])
-    total_today = sum(len(m.get('schedule', [])) for m in medicines)
-    doses_left = max(0, total_today - taken_today)
+    # One row: maintained as doses are logged (see database.rollups)
+    summary = get_adherence_summary(user_id)
+    adherence = summary['adherence7d']
 
     # Determine status
-    if stats['adherencePercentage'] >= 90:
+    if adherence >= 90:
         status = 'Excellent'
-    elif stats['adherencePercentage'] >= 70:
+    elif adherence >= 70:
         status = 'On Track'
-    elif stats['adherencePercentage'] >= 50:
+    elif adherence >= 50:
         status = 'Needs Attention'
     else:
         status = 'Critical'
 
-    # Find next dose
+    # Find next dose (schedule is sorted by 24h time)
     now = datetime.now()
     next_dose = None
-    for med in medicines:
-        for schedule_time in med.get('schedule', []):
-            try:
-                # Parse schedule time
-                t = datetime.strptime(schedule_time, '%H:%M')
-                dose_time = now.replace(hour=t.hour, minute=t.minute, second=0)
-                if dose_time > now:
-                    if next_dose is None or dose_time < next_dose['_dt']:
-                        next_dose = {
-                            'medicine': med['name'],
-                            'dosage': med['dosage'],
-                            'instruction': med.get('instruction', ''),
-                            'target_time': dose_time.isoformat(),
-                            '_dt': dose_time,
-                        }
-            except ValueError:
-                # Try 12-hour format
-                try:
-                    t = datetime.strptime(schedule_time, '%I:%M %p')
-                    dose_time = now.replace(hour=t.hour, minute=t.minute, second=0)
-                    if dose_time > now:
-                        if next_dose is None or dose_time < next_dose['_dt']:
-                            next_dose = {
-                                'medicine': med['name'],
-                                'dosage': med['dosage'],
-                                'instruction': med.get('instruction', ''),
-                                'target_time': dose_time.isoformat(),
-                                '_dt': dose_time,
-                            }
-                except ValueError:
-                    continue
-
-    # Remove internal _dt key before returning
-    if next_dose:
-        next_dose.pop('_dt', None)
+    for slot in summary['schedule']:
+        hour, minute = map(int, slot['time'].split(':'))
+        dose_time = now.replace(hour=hour, minute=minute, second=0)
+        if dose_time > now:
+            next_dose = {
+                'medicine': slot['medicine'],
+                'dosage': slot['dosage'],
+                'instruction': slot['instruction'],
+                'target_time': dose_time.isoformat(),
+            }
+            break
 
     return success_response({
-        'adherencePercentage': stats['adherencePercentage'],
-        'streak': streak,
+        'adherencePercentage': adherence,
+        'streak': summary['streak'],
+        'longestStreak': summary['longestStreak'],
         'status': status,
-        'dosesLeft': doses_left,
+        'dosesLeft': summary['dosesLeft'],
         'nextDose': next_dose,
-        'todayDoses': today_doses,
     })
@@ -1,7 +1,7 @@
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
-from utils.helpers import success_response, error_response
-from models.dose_log import log_dose, get_today_doses
+from utils.helpers import success_response, error_response, to_time, page_limit
+from models.dose_log import log_dose, get_today_doses, get_dose_history
 
 dose_bp = Blueprint('dose', __name__, url_prefix='/api/doses')
 
@@ -19,6 +19,9 @@ def log_dose_taken():
     if not medicine_id or not scheduled_time:
         return error_response('Medicine ID and scheduled time are required')
 
+    if to_time(scheduled_time) is None:
+        return error_response('Scheduled time must be HH:MM or h:MM AM/PM')
+
     if status not in ('taken', 'missed', 'snoozed'):
         return error_response('Status must be taken, missed, or snoozed')
 
@@ -32,3 +35,19 @@ def today_doses():
     """Get all dose logs for today."""
     doses = get_today_doses(request.user_id)
     return success_response(doses)
+
+
+@dose_bp.route('/history', methods=['GET'])
+@token_required
+def dose_history():
+    """Dose log history, newest first. Pass `next_cursor` back as ?cursor= for the next page."""
+    try:
+        doses, next_cursor = get_dose_history(
+            request.user_id,
+            limit=page_limit(request.args.get('limit'), default=50),
+            after=request.args.get('cursor'),
+            medicine_id=request.args.get('medicine_id', type=int),
+        )
+    except ValueError as e:
+        return error_response(str(e))
+    return success_response({'doses': doses, 'next_cursor': next_cursor})
@@ -2,6 +2,7 @@ from flask import Blueprint, request
 from utils.auth_middleware import token_required
 from utils.helpers import success_response, error_response
 from database.schema import get_connection
+from database.dialects import get_dialect
 from datetime import date
 
 health_bp = Blueprint('health', __name__, url_prefix='/api/health')
@@ -17,13 +18,16 @@ def log_health():
     sleep_mins = data.get('sleep_mins', 0)
     insight_date = data.get('date', str(date.today()))
 
+    dialect = get_dialect()
+    upsert = dialect.upsert(('user_id', 'insight_date'), [
+        f"{col} = {dialect.inserted(col)}" for col in ('steps', 'sleep_hours', 'sleep_mins')
+    ])
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        """INSERT INTO health_insights (user_id, steps, sleep_hours, sleep_mins, insight_date)
+        f"""INSERT INTO health_insights (user_id, steps, sleep_hours, sleep_mins, insight_date)
            VALUES (%s, %s, %s, %s, %s)
-           ON DUPLICATE KEY UPDATE steps = VALUES(steps), sleep_hours = VALUES(sleep_hours),
-           sleep_mins = VALUES(sleep_mins)""",
+           {upsert}""",
         (request.user_id, steps, sleep_hours, sleep_mins, insight_date)
     )
     conn.commit()
@@ -40,7 +44,7 @@ def today_health():
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute(
-        "SELECT * FROM health_insights WHERE user_id = %s AND insight_date = CURDATE()",
+        f"SELECT * FROM health_insights WHERE user_id = %s AND insight_date = {get_dialect().today()}",
         (request.user_id,)
     )
     data = cursor.fetchone()
@@ -1,9 +1,9 @@
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
+from utils.conditional import conditional_get
 from utils.helpers import success_response, error_response
 from models.medicine import get_medicines_by_user, create_medicine, get_medicine_by_id, update_medicine, delete_medicine
 from ml.drug_interactions import check_new_medicine
-from database.schema import get_connection
 import os
 import json
 
@@ -12,6 +12,7 @@ medicine_bp = Blueprint('medicines', __name__, url_prefix='/api/medicines')
 
 @medicine_bp.route('', methods=['GET'])
 @token_required
+@conditional_get()
 def list_medicines():
     """Get all active medicines for the user."""
     medicines = get_medicines_by_user(request.user_id)
@@ -45,17 +46,9 @@ def add_medicine():
         icon=data.get('icon', 'pill'),
         pill_count=data.get('pill_count', 1),
         schedules=data.get('schedules', []),
+        pills_remaining=int(data.get('pills_remaining', 30)),
     )
 
-    # Set initial pills_remaining
-    conn = get_connection()
-    cursor = conn.cursor()
-    pills_qty = int(data.get('pills_remaining', 30))
-    cursor.execute("UPDATE medicines SET pills_remaining = %s WHERE id = %s", (pills_qty, medicine_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
-
     result = {'medicine_id': medicine_id}
     if interactions:
         result['interactions'] = interactions
@@ -79,7 +72,8 @@ def get_medicine(medicine_id):
 def edit_medicine(medicine_id):
     """Update a medicine."""
     data = request.get_json()
-    update_medicine(medicine_id, request.user_id, **data)
+    if not update_medicine(medicine_id, request.user_id, **data):
+        return error_response('Medicine not found', 404)
     return success_response(None, 'Medicine updated')
 
 
@@ -0,0 +1,31 @@
+from flask import Blueprint, request
+from utils.auth_middleware import token_required
+from utils.helpers import success_response, error_response
+from jobs.notifications import get_jobs
+
+notification_bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
+
+MAX_POLL_IDS = 100
+
+
+@notification_bp.route('', methods=['GET'])
+@token_required
+def list_jobs():
+    """Status of queued SMS / call jobs: ?ids=1,2,3 (as returned when they were queued)."""
+    try:
+        job_ids = sorted({int(i) for i in request.args.get('ids', '').split(',') if i.strip()})
+    except ValueError:
+        return error_response('ids must be a comma-separated list of job ids')
+    if len(job_ids) > MAX_POLL_IDS:
+        return error_response(f'At most {MAX_POLL_IDS} ids per request')
+    return success_response(get_jobs(request.user_id, job_ids))
+
+
+@notification_bp.route('/<int:job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """Status of one SMS / call job."""
+    jobs = get_jobs(request.user_id, [job_id])
+    if not jobs:
+        return error_response('Notification job not found', 404)
+    return success_response(jobs[0])
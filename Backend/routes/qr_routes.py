@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from utils.auth_middleware import token_required
 from utils.helpers import success_response, error_response
 from database.schema import get_connection
+from database.dialects import get_dialect
+from database.change_feed import record_changes
 import hashlib
 import json
 
@@ -37,6 +39,9 @@ def generate_qr(medicine_id):
 
     # Store QR code in DB
     cursor.execute("UPDATE medicines SET qr_code = %s WHERE id = %s", (qr_code, medicine_id))
+    feed_cursor = conn.cursor()
+    record_changes(feed_cursor, request.user_id, 'medicine', [medicine_id])
+    feed_cursor.close()
     conn.commit()
     cursor.close()
     conn.close()
@@ -83,9 +88,12 @@ def scan_qr():
 
     # Decrement pills_remaining
     cursor.execute(
-        "UPDATE medicines SET pills_remaining = GREATEST(0, pills_remaining - %s) WHERE id = %s",
+        f"UPDATE medicines SET pills_remaining = {get_dialect().greatest('0', 'pills_remaining - %s')} WHERE id = %s",
         (med.get('pill_count', 1) or 1, med['id'])
     )
+    feed_cursor = conn.cursor()
+    record_changes(feed_cursor, request.user_id, 'medicine', [med['id']])
+    feed_cursor.close()
     conn.commit()
     cursor.close()
     conn.close()
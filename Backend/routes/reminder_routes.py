@@ -1,7 +1,8 @@
 from flask import Blueprint, request
 from utils.auth_middleware import token_required
-from utils.helpers import success_response, error_response
-from models.reminder import get_reminders, create_reminder, take_reminder, snooze_reminder
+from utils.conditional import conditional_get
+from utils.helpers import success_response, error_response, page_limit
+from models.reminder import get_reminders, create_reminder, take_reminder, snooze_reminder, update_reminder_status
 from ml.smart_reminder import track_behavior, get_adaptive_schedule
 
 reminder_bp = Blueprint('reminders', __name__, url_prefix='/api/reminders')
@@ -9,9 +10,14 @@ reminder_bp = Blueprint('reminders', __name__, url_prefix='/api/reminders')
 
 @reminder_bp.route('', methods=['GET'])
 @token_required
+@conditional_get()
 def list_reminders():
-    """Get upcoming and completed reminders."""
-    data = get_reminders(request.user_id)
+    """Get upcoming (paged by ?limit= and ?cursor=) and today's completed reminders."""
+    try:
+        data = get_reminders(request.user_id, limit=page_limit(request.args.get('limit'), default=50, maximum=200),
+                             after=request.args.get('cursor'))
+    except ValueError as e:
+        return error_response(str(e))
     return success_response(data)
 
 
@@ -63,6 +69,9 @@ def snooze(reminder_id):
 @token_required
 def miss(reminder_id):
     """Mark reminder as missed and trigger escalation if needed."""
+    # Marked here so the missed-reminder sweep does not count it again
+    update_reminder_status(reminder_id, request.user_id, 'missed')
+
     data = request.get_json() or {}
     medicine_id = data.get('medicine_id')
     if medicine_id:
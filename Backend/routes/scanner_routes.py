@@ -2,7 +2,7 @@ from flask import Blueprint, request
 from utils.auth_middleware import token_required
 from utils.helpers import success_response, error_response
 from ml.ocr_scanner import scan_prescription, KNOWN_MEDICINES
-from models.medicine import create_medicine
+from models.medicine import create_medicines
 
 scanner_bp = Blueprint('scanner', __name__, url_prefix='/api/scanner')
 
@@ -67,6 +67,22 @@ def validate_scan():
     return success_response({'medicines': validated}, 'Validation complete')
 
 
+def _scanned_medicine(med, name, dosage):
+    """create_medicines() fields for one confirmed scan result."""
+    return {
+        'name': name, 'dosage': dosage,
+        'med_type': med.get('type', 'Oral Tablet'),
+        'quantity': med.get('quantity', '30 Tabs'),
+        'frequency': med.get('frequency', 'Once daily'),
+        'instruction': med.get('timing', med.get('instruction', '')),
+        'notes': med.get('notes', 'Added via prescription scan'),
+        'color': med.get('color', '#4CAF50'),
+        'icon': med.get('icon', 'pill'),
+        'pill_count': med.get('pillCount', 1),
+        'schedules': med.get('schedules', []),
+    }
+
+
 @scanner_bp.route('/confirm', methods=['POST'])
 @token_required
 def confirm_scan():
@@ -78,18 +94,7 @@ def confirm_scan():
     if not name or not dosage:
         return error_response('Medicine name and dosage are required')
 
-    medicine_id = create_medicine(
-        user_id=request.user_id, name=name, dosage=dosage,
-        med_type=data.get('type', 'Oral Tablet'),
-        quantity=data.get('quantity', '30 Tabs'),
-        frequency=data.get('frequency', 'Once daily'),
-        instruction=data.get('timing', data.get('instruction', '')),
-        notes=data.get('notes', 'Added via prescription scan'),
-        color=data.get('color', '#4CAF50'),
-        icon=data.get('icon', 'pill'),
-        pill_count=data.get('pillCount', 1),
-        schedules=data.get('schedules', []),
-    )
+    medicine_id, = create_medicines(request.user_id, [_scanned_medicine(data, name, dosage)])
     return success_response({'medicine_id': medicine_id}, 'Medicine added from scan', 201)
 
 
@@ -103,25 +108,15 @@ def confirm_batch():
     if not medicines:
         return error_response('No medicines to add')
 
-    added = []
+    # Skip incomplete entries, then add the rest in one transaction
+    scanned = []
     for med in medicines:
         name = med.get('name', '').strip()
         dosage = med.get('dosage', '').strip()
-        if not name or not dosage:
-            continue
-
-        mid = create_medicine(
-            user_id=request.user_id, name=name, dosage=dosage,
-            med_type=med.get('type', 'Oral Tablet'),
-            quantity=med.get('quantity', '30 Tabs'),
-            frequency=med.get('frequency', 'Once daily'),
-            instruction=med.get('timing', med.get('instruction', '')),
-            notes=med.get('notes', 'Added via prescription scan'),
-            color=med.get('color', '#4CAF50'),
-            icon=med.get('icon', 'pill'),
-            pill_count=med.get('pillCount', 1),
-            schedules=med.get('schedules', []),
-        )
-        added.append({'medicine_id': mid, 'name': name})
+        if name and dosage:
+            scanned.append(_scanned_medicine(med, name, dosage))
+
+    ids = create_medicines(request.user_id, scanned) if scanned else []
+    added = [{'medicine_id': mid, 'name': med['name']} for mid, med in zip(ids, scanned)]
 
     return success_response({'added': added, 'count': len(added)}, f'{len(added)} medicines added', 201)
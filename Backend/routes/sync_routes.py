@@ -0,0 +1,52 @@
+from flask import Blueprint, request
+from config import Config
+from database.dialects import get_dialect
+from database.schema import get_connection
+from utils.auth_middleware import token_required
+from utils.helpers import success_response, error_response
+from models.sync import apply_sync_batch, get_changes
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/api/sync')
+
+
+@sync_bp.route('/batch', methods=['POST'])
+@token_required
+def sync_batch():
+    """Apply queued offline dose logs and reminder actions in one transaction."""
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+
+    if not isinstance(items, list) or not items:
+        return error_response('items must be a non-empty list')
+    if len(items) > Config.SYNC_BATCH_MAX_ITEMS:
+        return error_response(f'At most {Config.SYNC_BATCH_MAX_ITEMS} items per batch', 413)
+
+    try:
+        outcomes = apply_sync_batch(request.user_id, items)
+    except Exception as e:
+        if not get_dialect().is_duplicate_key(e):
+            raise
+        # Another request is applying the same items right now: undo ours
+        get_connection().rollback()
+        return error_response('This batch is already being applied, retry shortly', 409)
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome['code']] = counts.get(outcome['code'], 0) + 1
+    return success_response({'results': outcomes, 'counts': counts},
+                            f"{counts.get('applied', 0)} of {len(items)} items applied")
+
+
+@sync_bp.route('/changes', methods=['GET'])
+@token_required
+def sync_changes():
+    """Medicines, reminders and dose logs changed since `?since=<cursor>` (0 for everything)."""
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', Config.SYNC_CHANGES_PAGE_SIZE))
+    except ValueError:
+        return error_response('since and limit must be integers')
+    if since < 0 or not 0 < limit <= Config.SYNC_CHANGES_PAGE_SIZE:
+        return error_response(f'since must be >= 0 and limit between 1 and {Config.SYNC_CHANGES_PAGE_SIZE}')
+
+    return success_response(get_changes(request.user_id, since, limit))
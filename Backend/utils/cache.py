@@ -0,0 +1,432 @@
+"""
+Two-Tier Cache
+==============
+Per-user cache for read paths that are pure functions of one user's data.
+One decorator works for model and ml functions (they take `user_id`) and
+for route views (the user comes from the request). Put it below
+`@token_required` / `@conditional_get` on routes, and below
+`@request_cached` on model functions:
+
+    @analytics_bp.route('', methods=['GET'])
+    @token_required
+    @conditional_get()
+    @cached(tags=('dose_log', 'medicine'))
+    def get_analytics(): ...
+
+    @request_cached
+    @cached(tags=('dose_log', 'medicine'))
+    @replica_read
+    def get_adherence_stats(user_id, days=7): ...
+
+Tiers:
+
+- L1 is an LRU in each worker process, bounded by CACHE_L1_MAX_ENTRIES
+  and CACHE_L1_MAX_BYTES. Sizes are the pickled value plus its key.
+  Values are stored pickled, so every hit hands out a fresh copy.
+- L2 is shared by all workers. It is a Redis-protocol server at
+  CACHE_REDIS_URL, or an in-process stand-in when that is empty (tests,
+  single-worker installs). L2 keys embed the current version of each of
+  the entry's tags, so a tag bump orphans older entries everywhere.
+
+Invalidation:
+
+- Tags name what a value is built from. A tag is a change-feed entity
+  ('medicine', 'reminder', 'dose_log') or 'behavior'.
+- `invalidate(user_id, *tags)` runs at write time and again after the
+  writer commits. Each run bumps the tag versions in L2, drops the tags
+  from this worker's L1, and publishes the tags on CACHE_NAMESPACE's
+  invalidation channel.
+- Every worker's listener drops the published tags from its own L1.
+  After a lost subscription, the listener empties L1, since messages may
+  have been missed.
+- A fill that overlapped an invalidation is not kept in L1.
+- A fill for a user who wrote within the read-your-writes window reads
+  from the primary (database.router.primary_reads), so a lagging
+  replica's answer is never stored under the new tag versions.
+
+On a miss in both tiers, concurrent callers of one key are coalesced in
+each worker. One computes the value; the others wait up to
+CACHE_WAIT_SECONDS. If L2 is unreachable, values are computed and not
+cached, because other workers could not be told to drop them. Entries
+live CACHE_TTL_SECONDS (0 disables the cache). Counters are served at
+/api/cache/stats when DB_DEBUG_ENDPOINTS is on.
+"""
+import hashlib
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from config import Config
+from database.router import get_router, primary_reads
+from database.session import after_commit
+
+INVALIDATION_CHANNEL = 'cache-invalidate'
+
+
+class LocalSharedCache:
+    """In-process stand-in for the shared tier: same interface as RedisSharedCache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}            # key -> (expires_at, value)
+        self._subscribers = []
+        self._sets = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                entry = self._data.get(key)
+                values.append(entry[1] if entry and entry[0] > now else None)
+            return values
+
+    def set(self, key, value, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + ttl, value)
+            self._sets += 1
+            if self._sets % 1000 == 0:
+                for k in [k for k, (expires, _) in self._data.items() if expires <= now]:
+                    del self._data[k]
+
+    def incr_many(self, keys, ttl):
+        now = time.monotonic()
+        with self._lock:
+            counts = []
+            for key in keys:
+                entry = self._data.get(key)
+                count = (int(entry[1]) if entry and entry[0] > now else 0) + 1
+                self._data[key] = (now + ttl, str(count).encode())
+                counts.append(count)
+            return counts
+
+    def publish(self, messages):
+        for message in messages:
+            for callback, _ in list(self._subscribers):
+                callback(message)
+
+    def subscribe(self, callback, on_reset):
+        self._subscribers.append((callback, on_reset))
+
+
+class RedisSharedCache:
+    """Shared tier on a Redis-protocol server (Redis, Valkey, KeyDB...)."""
+
+    def __init__(self, url, namespace):
+        import redis
+        self._redis = redis.Redis.from_url(url, socket_timeout=Config.CACHE_REDIS_TIMEOUT,
+                                           socket_connect_timeout=Config.CACHE_REDIS_TIMEOUT)
+        # The listener blocks on its socket between messages, so no read timeout
+        self._listener = redis.Redis.from_url(url, socket_connect_timeout=Config.CACHE_REDIS_TIMEOUT,
+                                              health_check_interval=30)
+        self._channel = f'{namespace}:{INVALIDATION_CHANNEL}'
+
+    def get_many(self, keys):
+        return self._redis.mget(keys)
+
+    def set(self, key, value, ttl):
+        self._redis.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def incr_many(self, keys, ttl):
+        pipe = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+            pipe.expire(key, int(ttl))
+        return pipe.execute()[::2]
+
+    def publish(self, messages):
+        pipe = self._redis.pipeline(transaction=False)
+        for message in messages:
+            pipe.publish(self._channel, message)
+        pipe.execute()
+
+    def subscribe(self, callback, on_reset):
+        def listen():
+            while True:
+                try:
+                    pubsub = self._listener.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self._channel)
+                    on_reset()
+                    for message in pubsub.listen():
+                        callback(message['data'].decode())
+                except Exception as e:
+                    print(f"⚠️  Cache invalidation listener lost Redis: {e}")
+                    time.sleep(1)
+
+        threading.Thread(target=listen, name='cache-invalidation', daemon=True).start()
+
+
+class _Flight:
+    """One in-progress fill that concurrent misses wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.payload = None
+        self.value = None
+
+
+class TwoTierCache:
+    """Per-process LRU (L1) in front of a shared tier (L2), with tag invalidation."""
+
+    def __init__(self, shared, namespace, ttl, l1_max_entries, l1_max_bytes, wait):
+        self.shared = shared
+        self.namespace = namespace
+        self.ttl = ttl
+        self.l1_max_entries = l1_max_entries
+        self.l1_max_bytes = l1_max_bytes
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._l1 = OrderedDict()        # key -> (expires_at, payload, tag keys, size)
+        self._l1_bytes = 0
+        self._by_tag = {}               # (user_id, tag) -> set of L1 keys
+        self._generations = {}          # (user_id, tag) -> local invalidation count
+        self._flights = {}              # key -> _Flight
+        self.counters = dict.fromkeys(
+            ('l1_hits', 'l2_hits', 'misses', 'coalesced', 'stale_fills', 'invalidations',
+             'l1_evictions', 'messages', 'l2_errors'), 0)
+        shared.subscribe(self._on_message, self.clear_l1)
+
+    # ── Lookups ───────────────────────────────────────────────
+
+    def get_or_compute(self, key, user_id, tags, compute, ttl=None):
+        """
+        Cached value for `key`, else `compute()` -> (value, cacheable), run once
+        per worker for all concurrent callers.
+        """
+        tag_keys = [(user_id, tag) for tag in tags]
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._l1.move_to_end(key)
+                self.counters['l1_hits'] += 1
+                payload = entry[1]
+                flight = None
+            else:
+                payload = None
+                if entry is not None:
+                    self._drop(key)
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                else:
+                    self.counters['coalesced'] += 1
+                generations = [self._generations.get(t, 0) for t in tag_keys]
+        if payload is not None:
+            return pickle.loads(payload)
+
+        if not leader:
+            if flight.done.wait(self.wait) and flight.ok:
+                return pickle.loads(flight.payload) if flight.payload is not None else flight.value
+            return compute()[0]   # the leader failed or is too slow
+
+        try:
+            flight.payload, flight.value = self._fill(key, tag_keys, generations, compute, ttl or self.ttl)
+            flight.ok = True
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def _fill(self, key, tag_keys, generations, compute, ttl):
+        """Read L2, else compute and write both tiers. Returns (payload or None, value)."""
+        shared_ok = True
+        payload = None
+        try:
+            versions = self.shared.get_many([self._version_key(t) for t in tag_keys])
+            l2_key = f"{key}:v{'.'.join(str(int(v or 0)) for v in versions)}"
+            payload = self.shared.get_many([l2_key])[0]
+        except Exception as e:
+            shared_ok = False
+            self._l2_error('read', e)
+
+        if payload is not None:
+            with self._lock:
+                self.counters['l2_hits'] += 1
+            value = pickle.loads(payload)
+        else:
+            with self._lock:
+                self.counters['misses'] += 1
+            value, cacheable = compute()
+            if not cacheable or not shared_ok:
+                return None, value
+            payload = pickle.dumps(value)
+            try:
+                self.shared.set(l2_key, payload, ttl)
+            except Exception as e:
+                self._l2_error('write', e)
+                return payload, value
+
+        self._store_l1(key, payload, tag_keys, generations, ttl)
+        return payload, value
+
+    def _store_l1(self, key, payload, tag_keys, generations, ttl):
+        size = len(payload) + len(key)
+        with self._lock:
+            if generations != [self._generations.get(t, 0) for t in tag_keys]:
+                # A write landed while we filled: the value may predate it
+                self.counters['stale_fills'] += 1
+                return
+            if size > self.l1_max_bytes:
+                return
+            if key in self._l1:
+                self._drop(key)
+            self._l1[key] = (time.monotonic() + ttl, payload, tag_keys, size)
+            self._l1_bytes += size
+            for t in tag_keys:
+                self._by_tag.setdefault(t, set()).add(key)
+            while len(self._l1) > self.l1_max_entries or self._l1_bytes > self.l1_max_bytes:
+                self._drop(next(iter(self._l1)))
+                self.counters['l1_evictions'] += 1
+
+    # ── Invalidation ──────────────────────────────────────────
+
+    def invalidate(self, user_id, tags):
+        """Bump the tags' L2 versions, drop them from L1 and tell the other workers."""
+        self._invalidate_local(user_id, tags)
+        try:
+            self.shared.incr_many([self._version_key((user_id, tag)) for tag in tags],
+                                  max(self.ttl * 2, 86400))
+            self.shared.publish([f'{user_id}:{tag}' for tag in tags])
+        except Exception as e:
+            self._l2_error('invalidate', e)
+
+    def _on_message(self, message):
+        user_id, _, tag = message.rpartition(':')
+        with self._lock:
+            self.counters['messages'] += 1
+        self._invalidate_local(int(user_id) if user_id.isdigit() else user_id, [tag])
+
+    def _invalidate_local(self, user_id, tags):
+        with self._lock:
+            for tag in tags:
+                t = (user_id, tag)
+                self._generations[t] = self._generations.get(t, 0) + 1
+                for key in self._by_tag.pop(t, ()):
+                    if key in self._l1:
+                        self._drop(key)
+                        self.counters['invalidations'] += 1
+
+    def clear_l1(self):
+        """Forget every L1 entry (invalidation messages may have been missed)."""
+        with self._lock:
+            for t in self._by_tag:
+                self._generations[t] = self._generations.get(t, 0) + 1
+            self._l1.clear()
+            self._by_tag.clear()
+            self._l1_bytes = 0
+
+    # ── Internals ─────────────────────────────────────────────
+
+    def _version_key(self, tag_key):
+        user_id, tag = tag_key
+        return f'{self.namespace}:tagv:{user_id}:{tag}'
+
+    def _drop(self, key):
+        _, _, tag_keys, size = self._l1.pop(key)
+        self._l1_bytes -= size
+        for t in tag_keys:
+            keys = self._by_tag.get(t)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[t]
+
+    def _l2_error(self, action, error):
+        with self._lock:
+            self.counters['l2_errors'] += 1
+        print(f"⚠️  Shared cache {action} failed: {error}")
+
+    def stats(self):
+        with self._lock:
+            c = dict(self.counters)
+            lookups = c['l1_hits'] + c['l2_hits'] + c['misses'] + c['coalesced']
+            c.update({
+                'l1_entries': len(self._l1),
+                'l1_bytes': self._l1_bytes,
+                'hit_rate': round((c['l1_hits'] + c['l2_hits']) / lookups, 3) if lookups else 0.0,
+                'shared_tier': type(self.shared).__name__,
+            })
+            return c
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                shared = (RedisSharedCache(Config.CACHE_REDIS_URL, Config.CACHE_NAMESPACE)
+                          if Config.CACHE_REDIS_URL else LocalSharedCache())
+                _cache = TwoTierCache(shared, Config.CACHE_NAMESPACE, Config.CACHE_TTL_SECONDS,
+                                      Config.CACHE_L1_MAX_ENTRIES, Config.CACHE_L1_MAX_BYTES,
+                                      Config.CACHE_WAIT_SECONDS)
+    return _cache
+
+
+def invalidate(user_id, *tags):
+    """Drop the user's cached values built from `tags`, now and after the writer commits."""
+    if Config.CACHE_TTL_SECONDS <= 0:
+        return
+    cache = get_cache()
+    cache.invalidate(user_id, tags)
+    after_commit(lambda: cache.invalidate(user_id, tags))
+
+
+def cache_stats():
+    return get_cache().stats()
+
+
+def cached(tags, vary=None, ttl=None):
+    """Cache a per-user function (it takes `user_id`) or a route view's 200 responses."""
+    def decorator(f):
+        signature = inspect.signature(f)
+        is_view = 'user_id' not in signature.parameters
+        name = f'{f.__module__}.{f.__qualname__}'
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if Config.CACHE_TTL_SECONDS <= 0:
+                return f(*args, **kwargs)
+            if is_view:
+                user_id, scope = request.user_id, request.full_path
+            else:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                user_id, scope = bound.arguments['user_id'], repr(sorted(bound.arguments.items()))
+            digest = hashlib.sha1(
+                f"{scope}|{date.today().isoformat()}|{vary() if vary else ''}".encode()
+            ).hexdigest()[:20]
+            key = f'{Config.CACHE_NAMESPACE}:{name}:{user_id}:{digest}'
+
+            def call():
+                router = get_router()
+                if router.enabled and router.is_sticky(user_id):
+                    with primary_reads():
+                        return f(*args, **kwargs)
+                return f(*args, **kwargs)
+
+            if not is_view:
+                return get_cache().get_or_compute(key, user_id, tags, lambda: (call(), True), ttl)
+
+            def compute():
+                response = make_response(call())
+                body = (response.get_data(), response.status_code, response.mimetype)
+                return body, response.status_code == 200
+
+            data, status, mimetype = get_cache().get_or_compute(key, user_id, tags, compute, ttl)
+            return current_app.response_class(data, status=status, mimetype=mimetype)
+        return decorated
+    return decorator
@@ -0,0 +1,60 @@
+"""
+Conditional GET
+===============
+`@conditional_get()` lets a polled read route answer `304 Not Modified`
+without running its queries. The ETag is built from the user's
+`change_seq` (database.change_feed), which every write to their
+medicines, reminders, dose logs and caretaker links bumps, plus today's
+date (summaries and "today" lists roll over at midnight), the URL with
+its query string, and whatever the route's `vary` callable returns.
+
+A matching `If-None-Match` costs one primary-key read. Opt in per route,
+below `@token_required`:
+
+    @dashboard_bp.route('', methods=['GET'])
+    @token_required
+    @conditional_get(vary=lambda: datetime.now().strftime('%H:%M'))
+    def get_dashboard(): ...
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import make_response, request
+
+from database.change_feed import current_seq
+from database.schema import get_connection
+
+
+def user_version(user_id):
+    """The user's data version: their change_seq, read on the primary."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    version = current_seq(cursor, user_id)
+    cursor.close()
+    conn.close()
+    return version
+
+
+def conditional_get(vary=None):
+    """Answer 304 when the client's ETag matches the user's current version."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            # Read before the view runs: a write landing in between leaves
+            # the ETag older than the body, which only costs one more 200
+            parts = [request.user_id, user_version(request.user_id), date.today().isoformat(),
+                     request.full_path, vary() if vary else '']
+            etag = hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
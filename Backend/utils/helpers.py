@@ -1,5 +1,7 @@
 from flask import jsonify
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+import base64
+import json
 
 
 def success_response(data=None, message='Success', status=200):
@@ -52,3 +54,54 @@ def format_time_12h(time_str):
         return t.strftime('%I:%M %p')
     except Exception:
         return time_str
+
+
+def to_time(value):
+    """
+    datetime.time from a TIME column (time, or timedelta from mysql.connector)
+    or a legacy '08:00' / '08:00:00' / '8:00 PM' string. None if unparseable.
+    """
+    if isinstance(value, time):
+        return value
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        if not 0 <= seconds < 86400:
+            return None
+        return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+    text = str(value or '').strip()
+    try:
+        return time.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in ('%H:%M', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p'):
+        try:
+            return datetime.strptime(text.upper(), fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def encode_cursor(*values):
+    """Opaque page cursor from the last row's sort key and id."""
+    raw = json.dumps([str(v) if not isinstance(v, int) else v for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """The `size` values packed by encode_cursor; raises ValueError for a malformed cursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_limit(value, default=20, maximum=100):
+    """Clamp a ?limit= query value to 1..maximum."""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
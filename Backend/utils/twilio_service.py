@@ -7,24 +7,37 @@ when a patient misses consecutive medicine doses.
 Note: Trial accounts can only send to verified numbers.
 """
 import os
+import threading
 from config import Config
 
 # Lazy-load the Twilio client (only created once)
 _client = None
+_client_lock = threading.Lock()
 
 
 def _get_client():
-    """Get or create the Twilio client (singleton)."""
+    """
+    Get or create the Twilio client (singleton, shared by all sender threads).
+    Its HTTP session keeps connections to the Twilio API alive, with a pool
+    large enough for every notification worker and fan-out thread, and
+    each REST call gives up after TWILIO_TIMEOUT_SECONDS.
+    """
     global _client
-    if _client is None:
-        from twilio.rest import Client
-        sid = Config.TWILIO_ACCOUNT_SID
-        token = Config.TWILIO_AUTH_TOKEN
-        if not sid or not token:
-            print("⚠️  Twilio credentials not set in .env — SMS/calls disabled.")
-            return None
-        _client = Client(sid, token)
-        print("✅ Twilio client initialized.")
+    with _client_lock:
+        if _client is None:
+            from requests.adapters import HTTPAdapter
+            from twilio.http.http_client import TwilioHttpClient
+            from twilio.rest import Client
+            sid = Config.TWILIO_ACCOUNT_SID
+            token = Config.TWILIO_AUTH_TOKEN
+            if not sid or not token:
+                print("⚠️  Twilio credentials not set in .env — SMS/calls disabled.")
+                return None
+            http_client = TwilioHttpClient(pool_connections=True, timeout=Config.TWILIO_TIMEOUT_SECONDS)
+            http_client.session.mount('https://', HTTPAdapter(
+                pool_maxsize=Config.NOTIFY_WORKERS + Config.NOTIFY_FANOUT_THREADS))
+            _client = Client(sid, token, http_client=http_client)
+            print("✅ Twilio client initialized.")
     return _client
 
 